@@ -0,0 +1,83 @@
+"""
+Benchmarks converting JobInfo objects to/from DataFrames and loading all snapshots from the
+database, with 100k+ jobs.
+
+    python -m benchmarks.benchmark_job_info --num-jobs 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+import pandas as pd
+from helpsk.database import Sqlite
+
+from source.entities.job_info import JobInfo, from_dataframe, to_dataframe
+from source.service.database import load_job_infos, save_job_infos
+
+
+def row_wise_from_dataframe(df: pd.DataFrame) -> list[JobInfo]:
+    """The previous implementation of `from_dataframe` (i.e. `df.apply(..., axis=1)`)."""
+    def to_info(row):
+        return JobInfo(
+            company=row.company,
+            title=row.title,
+            location=row.location,
+            url=row.url,
+            description=row.description,
+        )
+    return df.apply(to_info, axis=1).tolist()
+
+
+def create_jobs(num_jobs: int) -> list[JobInfo]:
+    return [
+        JobInfo(
+            company=f'company {i % 50}',
+            title=f'title {i}',
+            location='location',
+            url=f'https://example.com/careers/{i}',
+            description=f'<p>description {i % 1000}</p>' * 20,
+        )
+        for i in range(num_jobs)
+    ]
+
+
+def timeit(name: str, function: Callable, repeat: int = 3) -> float:
+    """Prints and returns the fastest of `repeat` runs of the function (in seconds)."""
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed.append(time.perf_counter() - start)
+    print(f'{name:<40} {min(elapsed):8.3f}s')
+    return min(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-jobs', type=int, default=100_000)
+    args = parser.parse_args()
+
+    jobs = create_jobs(args.num_jobs)
+    df = to_dataframe(jobs)
+    assert from_dataframe(df) == row_wise_from_dataframe(df) == jobs
+    print(f'{args.num_jobs:,} jobs')
+    timeit('to_dataframe', lambda: to_dataframe(jobs))
+    new = timeit('from_dataframe', lambda: from_dataframe(df))
+    old = timeit('from_dataframe (row-wise apply)', lambda: row_wise_from_dataframe(df), repeat=1)
+    print(f'from_dataframe speedup: {old / new:.0f}x')
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Sqlite(path=os.path.join(directory, 'jobs.db'))
+        # i.e. 10 snapshots
+        for snapshot in range(10):
+            save_job_infos(database=db, jobs=jobs[snapshot::10], snapshot=str(snapshot))
+        timeit('load_job_infos(latest_snapshots=False)',
+               lambda: load_job_infos(db, latest_snapshots=False))
+        timeit('  include_descriptions=False',
+               lambda: load_job_infos(db, latest_snapshots=False, include_descriptions=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+This module contains the list of resources (by type and by domain) that the headless browsers in
+`html_scraper.render` don't download, since only the DOM of a page is needed (and not e.g. its
+images, fonts, videos or analytics scripts).
+"""
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+
+# the (puppeteer) resource types that aren't needed to render the DOM
+DEFAULT_BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font'})
+# analytics/advertising/session-recording domains commonly embedded in careers pages
+DEFAULT_BLOCKED_DOMAINS = frozenset({
+    'doubleclick.net',
+    'facebook.net',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'hotjar.com',
+    'linkedin.com',
+    'segment.com',
+    'segment.io',
+    'twitter.com',
+})
+# Selenium can only block requests by url, so resource types are approximated by file extension
+RESOURCE_TYPE_EXTENSIONS = {
+    'image': ('png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp'),
+    'media': ('mp4', 'webm', 'ogg', 'mp3', 'wav', 'mov'),
+    'font': ('woff', 'woff2', 'ttf', 'otf', 'eot'),
+    'stylesheet': ('css',),
+}
+
+
+@dataclass(frozen=True)
+class BlockList:
+    """
+    Determines which requests made by a page are blocked when rendering it.
+
+    Args:
+        resource_types:
+            the resource types that are blocked (e.g. 'image', 'media', 'font', 'stylesheet',
+            'script'; see puppeteer's `Request.resourceType`)
+        domains: the domains (including their subdomains) whose requests are blocked
+    """
+    resource_types: frozenset[str] = DEFAULT_BLOCKED_RESOURCE_TYPES
+    domains: frozenset[str] = DEFAULT_BLOCKED_DOMAINS
+
+    def blocks(self, url: str, resource_type: str | None = None) -> bool:
+        """Returns True if a request for the url (of the resource type) should be blocked."""
+        if resource_type in self.resource_types:
+            return True
+        host = urlparse(url).hostname or ''
+        return any(host == domain or host.endswith('.' + domain) for domain in self.domains)
+
+    def url_patterns(self) -> list[str]:
+        """
+        Returns the url patterns (with `*` wildcards, e.g. for Chrome's `Network.setBlockedURLs`)
+        corresponding to the block list.
+        """
+        patterns = []
+        for domain in sorted(self.domains):
+            patterns += [f'*://{domain}/*', f'*://*.{domain}/*']
+        for resource_type in sorted(self.resource_types):
+            for extension in RESOURCE_TYPE_EXTENSIONS.get(resource_type, ()):
+                patterns += [f'*.{extension}', f'*.{extension}?*']
+        return patterns
+
+
+DEFAULT_BLOCK_LIST = BlockList()
+NO_BLOCKING = BlockList(resource_types=frozenset(), domains=frozenset())
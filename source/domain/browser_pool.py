@@ -0,0 +1,401 @@
+"""
+This module contains pools of long-lived headless browsers used by `html_scraper.render` to
+render JavaScript, so that the cost of starting a browser (seconds) is paid once per run rather
+than once per call (or per url).
+
+`BrowserPool` manages a fixed number of (pyppeteer) Chromium processes, each serving a number of
+pages (tabs) that are checked out for a single url and returned afterwards:
+
+    with BrowserPool(size=2, pages_per_browser=4) as pool:
+        html = html_scraper.render(url, browser_pool=pool)
+
+`DriverPool` does the same for Selenium's `webdriver.Chrome` (used with `use_selenium=True`):
+
+    with DriverPool(size=2) as pool:
+        html = html_scraper.render(url, use_selenium=True, driver_pool=pool)
+
+Browsers/drivers that have crashed are replaced, and each browser/driver is recycled after it
+has served `max_pages_per_browser`/`max_pages_per_driver` pages, which bounds the memory that
+long-lived browser processes accumulate.
+
+Typical usage is to rely on the default pools, which are created on first use and closed via
+`close_default_pools` (or automatically when the interpreter exits).
+"""
+import asyncio
+import atexit
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+import threading
+from typing import Any, Awaitable, Callable, Coroutine
+
+import pyppeteer
+
+from source.domain.event_loop import BackgroundEventLoop
+
+
+async def launch_browser():
+    """
+    Launches a headless (pyppeteer) Chromium browser.
+
+    pyppeteer's default signal handlers can only be installed from the main thread; disabling
+    them allows the browser to be launched from the pool's background thread.
+    """
+    return await pyppeteer.launch(
+        headless=True,
+        args=['--no-sandbox'],
+        handleSIGINT=False,
+        handleSIGTERM=False,
+        handleSIGHUP=False,
+    )
+
+
+def create_driver():
+    """Creates a headless Selenium Chrome driver. Chrome must be installed."""
+    from selenium import webdriver  # noqa
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument("--disable-setuid-sandbox")
+    # html_scraper waits for pages to be ready explicitly, so the driver doesn't wait implicitly
+    return webdriver.Chrome(options=options)
+
+
+def _is_alive(browser) -> bool:
+    """Returns True if the browser's process is still running."""
+    process = getattr(browser, 'process', None)
+    return process is None or process.poll() is None
+
+
+class _PooledBrowser:
+    """A browser managed by a BrowserPool along with its bookkeeping."""
+    def __init__(self, browser):
+        self.browser = browser
+        # pages that have been returned to the pool and can be reused
+        self.idle_pages = []
+        # the number of pages currently checked out
+        self.in_use = 0
+        # the number of pages served since the browser was launched
+        self.pages_served = 0
+        # retired browsers don't serve new pages and are closed once all pages are returned
+        self.retired = False
+
+
+class BrowserPool:
+    """
+    A pool of long-lived headless (pyppeteer) browsers running on a background event loop.
+
+    Pages are checked out with `page()` by coroutines running on the pool's event loop (i.e. via
+    `run` or `submit`) and returned to the pool when the context exits.
+    """
+    def __init__(
+            self,
+            size: int = 2,
+            pages_per_browser: int = 4,
+            max_pages_per_browser: int = 100,
+            launch: Callable[[], Awaitable] = launch_browser):
+        """
+        Args:
+            size: the maximum number of browsers
+            pages_per_browser:
+                the maximum number of pages (tabs) open at the same time in each browser; i.e. at
+                most `size * pages_per_browser` pages are rendered concurrently
+            max_pages_per_browser:
+                the number of pages a browser serves before it is closed and replaced by a new
+                browser
+            launch: the coroutine function used to launch a browser
+        """
+        if size < 1 or pages_per_browser < 1 or max_pages_per_browser < 1:
+            raise ValueError(
+                'size, pages_per_browser and max_pages_per_browser must be at least 1'
+            )
+        self.size = size
+        self.pages_per_browser = pages_per_browser
+        self.max_pages_per_browser = max_pages_per_browser
+        self.launch = launch
+        self._loop = BackgroundEventLoop(name='browser-pool')
+        self._browsers = []
+        # created on the pool's event loop when the pool is opened
+        self._pages_semaphore = None
+        self._browsers_lock = None
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """Returns True if the pool is open."""
+        return self._loop.is_running()
+
+    def open(self) -> None:
+        """Starts the background event loop. Browsers are launched when pages are checked out."""
+        with self._lock:
+            if self.is_open():
+                return
+            self._loop.start()
+
+            async def create_primitives():
+                self._pages_semaphore = asyncio.Semaphore(self.size * self.pages_per_browser)
+                self._browsers_lock = asyncio.Lock()
+
+            self._loop.run(create_primitives())
+
+    def close(self) -> None:
+        """Closes all browsers and stops the background event loop."""
+        with self._lock:
+            if not self.is_open():
+                return
+            self._loop.run(self._close_browsers())
+            self._loop.stop()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Schedules the coroutine on the pool's event loop and returns a concurrent.futures.Future.
+        This method can be called from any thread.
+        """
+        if not self.is_open():
+            self.open()
+        return self._loop.submit(coroutine)
+
+    def run(self, coroutine: Coroutine) -> Any:
+        """
+        Runs the coroutine on the pool's event loop and blocks until it completes, returning the
+        result (or raising the exception). This method can be called from any thread.
+        """
+        return self.submit(coroutine).result()
+
+    @property
+    def browsers(self) -> list:
+        """The browsers currently in the pool (including retired browsers with pages in use)."""
+        return [x.browser for x in self._browsers]
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator:
+        """
+        Checks out a page, waiting if `size * pages_per_browser` pages are already in use. The
+        page is returned to the pool (and reused) when the context exits, or closed if an
+        exception was raised while it was in use.
+        """
+        async with self._pages_semaphore:
+            pooled, page = await self._checkout()
+            healthy = False
+            try:
+                yield page
+                healthy = True
+            finally:
+                await self._checkin(pooled, page, healthy=healthy)
+
+    async def _checkout(self) -> tuple[_PooledBrowser, Any]:
+        async with self._browsers_lock:
+            await self._remove_dead_browsers()
+            available = [x for x in self._browsers if not x.retired]
+            # launch another browser (up to `size`) rather than sharing a browser that is in use
+            if len(available) < self.size and all(x.in_use > 0 for x in available):
+                pooled = _PooledBrowser(await self.launch())
+                self._browsers.append(pooled)
+            else:
+                pooled = min(available, key=lambda x: x.in_use)
+            pooled.in_use += 1
+            pooled.pages_served += 1
+            if pooled.pages_served >= self.max_pages_per_browser:
+                pooled.retired = True
+        try:
+            page = pooled.idle_pages.pop() if pooled.idle_pages else await pooled.browser.newPage()
+        except Exception:
+            await self._checkin(pooled, page=None, healthy=False)
+            raise
+        return pooled, page
+
+    async def _checkin(self, pooled: _PooledBrowser, page, healthy: bool) -> None:
+        # the page is reset outside the lock, so that other pages can be checked out (and in)
+        # in the meantime
+        reusable = healthy and not pooled.retired and _is_alive(pooled.browser)
+        if reusable:
+            try:
+                await self._reset_page(page)
+            except Exception:
+                reusable = False
+        async with self._browsers_lock:
+            pooled.in_use -= 1
+            # the browser may have been retired (or removed) while the page was being reset
+            if reusable and not pooled.retired and pooled in self._browsers:
+                pooled.idle_pages.append(page)
+                page = None
+            if pooled.retired and pooled.in_use == 0:
+                await self._close_browser(pooled)
+        if page is not None:
+            await _close_quietly(page)
+
+    async def _reset_page(self, page) -> None:
+        """Clears the state of a page before it is reused."""
+        await page.goto('about:blank')
+
+    async def _remove_dead_browsers(self) -> None:
+        for pooled in [x for x in self._browsers if not _is_alive(x.browser)]:
+            await self._close_browser(pooled)
+
+    async def _close_browser(self, pooled: _PooledBrowser) -> None:
+        if pooled in self._browsers:
+            self._browsers.remove(pooled)
+        await _close_quietly(pooled.browser)
+
+    async def _close_browsers(self) -> None:
+        for pooled in list(self._browsers):
+            await self._close_browser(pooled)
+
+
+async def _close_quietly(closeable) -> None:
+    """Closes the page/browser, ignoring errors (e.g. if the browser has already crashed)."""
+    try:
+        await closeable.close()
+    except Exception:  # noqa
+        pass
+
+
+class DriverPool:
+    """
+    A thread-safe pool of long-lived Selenium drivers. Drivers are checked out with `driver()`
+    and returned to the pool when the context exits.
+    """
+    def __init__(
+            self,
+            size: int = 4,
+            max_pages_per_driver: int = 50,
+            create_driver: Callable[[], Any] = create_driver):
+        """
+        Args:
+            size: the maximum number of drivers (i.e. pages rendered at the same time)
+            max_pages_per_driver:
+                the number of pages a driver serves before it is quit and replaced by a new driver
+            create_driver: the function used to create a driver
+        """
+        if size < 1 or max_pages_per_driver < 1:
+            raise ValueError('size and max_pages_per_driver must be at least 1')
+        self.size = size
+        self.max_pages_per_driver = max_pages_per_driver
+        self.create_driver = create_driver
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle_drivers = []
+        # id(driver) -> the number of pages served by the driver
+        self._pages_served = {}
+        self._closed = False
+
+    def close(self) -> None:
+        """
+        Quits all idle drivers; drivers that are checked out are quit when they are returned.
+        """
+        with self._lock:
+            self._closed = True
+            drivers, self._idle_drivers = self._idle_drivers, []
+        for driver in drivers:
+            self._quit(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    @contextmanager
+    def driver(self) -> Iterator:
+        """
+        Checks out a driver, blocking if `size` drivers are already in use. The driver is
+        returned to the pool (and reused) when the context exits, or quit if an exception was
+        raised while it was in use.
+        """
+        with self._semaphore:
+            driver = self._checkout()
+            healthy = False
+            try:
+                yield driver
+                healthy = True
+            finally:
+                self._checkin(driver, healthy=healthy)
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError('DriverPool is closed.')
+                driver = self._idle_drivers.pop() if self._idle_drivers else None
+            if driver is None:
+                driver = self.create_driver()
+                with self._lock:
+                    self._pages_served[id(driver)] = 0
+                return driver
+            if self._is_healthy(driver):
+                return driver
+            self._quit(driver)
+
+    def _checkin(self, driver, healthy: bool) -> None:
+        with self._lock:
+            self._pages_served[id(driver)] += 1
+            recycle = self._closed or not healthy \
+                or self._pages_served[id(driver)] >= self.max_pages_per_driver
+            if not recycle:
+                self._idle_drivers.append(driver)
+        if recycle:
+            self._quit(driver)
+
+    @staticmethod
+    def _is_healthy(driver) -> bool:
+        """Returns True if the driver (and browser) still responds."""
+        try:
+            driver.current_url
+            return True
+        except Exception:  # noqa
+            return False
+
+    def _quit(self, driver) -> None:
+        with self._lock:
+            self._pages_served.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:  # noqa
+            pass
+
+
+_default_browser_pool = None
+_default_driver_pool = None
+_default_pools_lock = threading.Lock()
+
+
+def get_default_browser_pool() -> BrowserPool:
+    """Returns the shared BrowserPool, opening it if necessary."""
+    global _default_browser_pool
+    with _default_pools_lock:
+        if _default_browser_pool is None:
+            _default_browser_pool = BrowserPool()
+        _default_browser_pool.open()
+        return _default_browser_pool
+
+
+def get_default_driver_pool() -> DriverPool:
+    """Returns the shared DriverPool."""
+    global _default_driver_pool
+    with _default_pools_lock:
+        if _default_driver_pool is None:
+            _default_driver_pool = DriverPool()
+        return _default_driver_pool
+
+
+def close_default_pools() -> None:
+    """Closes the shared pools; new pools will be created on next use."""
+    global _default_browser_pool, _default_driver_pool
+    with _default_pools_lock:
+        if _default_browser_pool is not None:
+            _default_browser_pool.close()
+            _default_browser_pool = None
+        if _default_driver_pool is not None:
+            _default_driver_pool.close()
+            _default_driver_pool = None
+
+
+atexit.register(close_default_pools)
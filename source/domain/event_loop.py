@@ -0,0 +1,75 @@
+"""
+This module contains a helper that runs an asyncio event loop in a background thread.
+
+Long-lived async resources (e.g. aiohttp sessions and pyppeteer browsers) are bound to the event
+loop they were created in, so they can't be shared across calls that each create their own loop
+(e.g. via `asyncio.run`). Instead, the resources live on a BackgroundEventLoop and synchronous
+callers (from any thread) submit coroutines to it.
+"""
+import asyncio
+from concurrent.futures import Future
+import threading
+from typing import Any, Coroutine
+
+
+class BackgroundEventLoop:
+    """An asyncio event loop running in a (daemon) background thread."""
+    def __init__(self, name: str):
+        """
+        Args:
+            name: the name of the background thread
+        """
+        self.name = name
+        self._loop = None
+        self._thread = None
+
+    def is_running(self) -> bool:
+        """Returns True if the loop has been started (and not stopped)."""
+        return self._loop is not None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The underlying event loop."""
+        return self._loop
+
+    def start(self) -> None:
+        """Starts the event loop in a background thread."""
+        if self.is_running():
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_forever,
+            name=self.name,
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run_forever(self) -> None:
+        # some libraries (e.g. pyppeteer) look up the thread's event loop
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def stop(self) -> None:
+        """Stops the event loop and waits for the background thread to finish."""
+        if not self.is_running():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Schedules the coroutine on the event loop and returns a concurrent.futures.Future. This
+        method can be called from any thread.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine: Coroutine) -> Any:
+        """
+        Runs the coroutine on the event loop and blocks until it completes, returning the result
+        (or raising the exception). This method can be called from any thread (other than the
+        background thread itself).
+        """
+        return self.submit(coroutine).result()
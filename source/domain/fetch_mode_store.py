@@ -0,0 +1,117 @@
+"""
+This module contains an on-disk store of whether a site's pages can be scraped from the html
+returned by `html_scraper.get` (i.e. 'static') or need JavaScript to be rendered by
+`html_scraper.render` (i.e. 'javascript').
+
+If `detect_javascript` is enabled, `JobScraperBase` detects the mode by trying `get` first and
+only rendering the page if the jobs (or job description) can't be extracted from the static html.
+The decision is stored per site so that subsequent runs go straight to the cheapest path that
+works. Decisions expire after `ttl` seconds and are detected again, so a site that stops needing
+JavaScript goes back to `get`.
+
+    store = FetchModeStore(path='data/fetch_modes.db')
+    store.set('careers.chime.com:job_objects', JAVASCRIPT)
+    store.get('careers.chime.com:job_objects')  # 'javascript'
+
+The ETL configures a shared store via `set_default_fetch_mode_store`, which scrapers use by
+default (see `JobScraperBase.fetch_mode_store`).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+STATIC = 'static'
+JAVASCRIPT = 'javascript'
+FETCH_MODES = (STATIC, JAVASCRIPT)
+
+
+class FetchModeStore:
+    """
+    An on-disk (SQLite) store of the fetch mode (STATIC or JAVASCRIPT) of each site. The store is
+    thread-safe.
+    """
+    def __init__(self, path: str = 'data/fetch_modes.db', ttl: float = 7 * 24 * 60 * 60):
+        """
+        Args:
+            path: the path of the SQLite database containing the store
+            ttl: the number of seconds a decision is used before it is detected again
+        """
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS FETCH_MODES (
+                    key TEXT PRIMARY KEY,
+                    mode TEXT NOT NULL,
+                    detected_at REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self) -> None:
+        """Closes the connection to the underlying database."""
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the fetch mode corresponding to the key (e.g. the site's host), or None if there
+        is no decision or the decision has expired.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT mode, detected_at FROM FETCH_MODES WHERE key = ?',
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        mode, detected_at = row
+        if time.time() - detected_at >= self.ttl:
+            return None
+        return mode
+
+    def set(self, key: str, mode: str) -> None:
+        """Stores the fetch mode (STATIC or JAVASCRIPT) corresponding to the key."""
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Invalid fetch mode '{mode}'; expected one of {FETCH_MODES}")
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO FETCH_MODES (key, mode, detected_at) VALUES (?, ?, ?)',
+                (key, mode, time.time()),
+            )
+
+    def clear(self) -> None:
+        """Removes all decisions."""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM FETCH_MODES')
+
+
+_default_store = None
+
+
+def get_default_fetch_mode_store() -> FetchModeStore | None:
+    """
+    Returns the store used by scrapers by default (None if decisions aren't persisted across
+    runs).
+    """
+    return _default_store
+
+
+def set_default_fetch_mode_store(store: FetchModeStore | None) -> None:
+    """Sets the store used by scrapers by default; None disables persisting decisions."""
+    global _default_store
+    _default_store = store
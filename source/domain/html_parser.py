@@ -0,0 +1,77 @@
+"""
+This module wraps the logic for parsing HTML into BeautifulSoup objects so that the underlying
+parser (i.e. BeautifulSoup's "features"/tree-builder) can be swapped out either globally (via
+`set_default_backend`) or per scraper (via `JobScraperBase.parser_backend`).
+
+The C-based `lxml` parser is several times faster than Python's built-in `html.parser`. If the
+requested backend is not installed, `parse` falls back to `html.parser`.
+
+Job descriptions are the exception: they are stored as serialized html and identified by its hash
+(see `database.hash_description`), and the serialization depends on the parser. Descriptions are
+parsed with DESCRIPTION_BACKEND (see `JobScraperBase.description_parser_backend`), so that the
+descriptions of jobs that haven't changed keep their hashes.
+"""
+from functools import cache
+import warnings
+from bs4 import BeautifulSoup, FeatureNotFound
+
+
+LXML = 'lxml'
+HTML5LIB = 'html5lib'
+HTML_PARSER = 'html.parser'
+PARSER_BACKENDS = (LXML, HTML5LIB, HTML_PARSER)
+FALLBACK_BACKEND = HTML_PARSER
+# the parser that descriptions have always been parsed with; changing it changes the serialized
+# html (and hash) of every stored description, i.e. every job is recorded as changed
+DESCRIPTION_BACKEND = HTML_PARSER
+
+_default_backend = LXML
+
+
+def get_default_backend() -> str:
+    """Returns the name of the backend used when a backend isn't explicitly specified."""
+    return _default_backend
+
+
+def set_default_backend(backend: str) -> None:
+    """
+    Sets the backend used when a backend isn't explicitly specified.
+
+    Args:
+        backend: one of the values in PARSER_BACKENDS (e.g. `'lxml'` or `'html.parser'`)
+    """
+    global _default_backend
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f'backend={backend}. Only values in {PARSER_BACKENDS} are permitted.')
+    _default_backend = backend
+
+
+@cache
+def resolve_backend(backend: str) -> str:
+    """
+    Returns `backend` if it is installed, otherwise returns FALLBACK_BACKEND. The result is cached
+    so the check only happens once per backend.
+    """
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f'backend={backend}. Only values in {PARSER_BACKENDS} are permitted.')
+    try:
+        BeautifulSoup('', backend)
+    except FeatureNotFound:
+        warnings.warn(f"HTML parser '{backend}' is not installed; using '{FALLBACK_BACKEND}'.")
+        return FALLBACK_BACKEND
+    return backend
+
+
+def parse(html: str, backend: str | None = None) -> BeautifulSoup:
+    """
+    Parses a string containing HTML and returns the corresponding BeautifulSoup object.
+
+    Args:
+        html: the HTML to parse
+        backend:
+            the parser to use (one of PARSER_BACKENDS); if None, the default backend is used (see
+            `set_default_backend`).
+    """
+    # resolve the default before calling the cached function so that changing the default takes
+    # effect
+    return BeautifulSoup(html, resolve_backend(backend or _default_backend))
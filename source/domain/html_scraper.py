@@ -1,16 +1,554 @@
-from collections.abc import Iterable
-import requests
-from requests_html import HTMLSession, AsyncHTMLSession
+from collections.abc import Callable, Iterable, Iterator
 
 import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import count
+import time
 import aiohttp
+from pyppeteer.errors import PageError
+
+from source.domain.block_list import BlockList
+from source.domain.browser_pool import BrowserPool, DriverPool, get_default_browser_pool, \
+    get_default_driver_pool
+from source.domain.http_cache import CacheEntry, HttpCache
+from source.domain.http_client import HttpClient, get_default_client
+from source.domain.rate_limiter import RateLimiter, parse_retry_after
+from source.domain.retry import DEFAULT_RETRY_POLICY, RetryPolicy
+
+
+# the maximum number of requests in flight at the same time when scraping multiple urls
+DEFAULT_MAX_CONCURRENCY = 10
+# rendered html is cached separately from the html returned by `get` for the same url
+RENDER_CACHE_PREFIX = 'render:'
+# the number of seconds rendered html is served from the cache; rendered html can't be revalidated
+# via conditional requests (the content of JavaScript pages is loaded by requests that the
+# document's validators don't cover), so it is only cached for a short time
+RENDER_CACHE_TTL = 10 * 60
+# the number of seconds without network activity after which a rendered page is considered loaded
+NETWORK_IDLE_TIME = 0.5
+# the number of seconds between checks of whether a rendered page is ready
+READY_POLL_INTERVAL = 0.05
 
 
 class RequestException(Exception):
     pass
 
 
-def get(url) -> object:
+@dataclass
+class BatchResult:
+    """
+    The results of scraping multiple urls with `partial=True` (see `get` and `render`), where
+    some urls may have failed. Both dictionaries retain the order of the urls passed in.
+    """
+    # url -> html
+    successes: dict[str, str] = field(default_factory=dict)
+    # url -> exception raised when scraping the url
+    failures: dict[str, Exception] = field(default_factory=dict)
+
+
+def _retry_delay(retry_policy: RetryPolicy, status: int, headers: dict, attempt: int) -> float:
+    """
+    Returns the number of seconds to wait before re-sending a request that failed with `status`,
+    or raises a RequestException if the request shouldn't be re-sent.
+    """
+    retry_after = parse_retry_after(headers.get('Retry-After'))
+    delay = retry_policy.delay(status=status, retry_after=retry_after, attempt=attempt)
+    if delay is None:
+        raise RequestException(f"status-code: {status}")
+    return delay
+
+
+def _connection_error_delay(
+        retry_policy: RetryPolicy,
+        url: str,
+        exception: Exception,
+        attempt: int) -> float:
+    """
+    Returns the number of seconds to wait before re-sending a request that failed because of a
+    connection error or timeout, or raises a RequestException if the request shouldn't be re-sent.
+    """
+    if not retry_policy.can_retry(attempt):
+        raise RequestException(f"{url}: {exception!r}") from exception
+    return retry_policy.backoff(attempt)
+
+
+def _cached_entry(cache: HttpCache | None, key: str) -> CacheEntry | None:
+    """Returns the cache entry corresponding to the key, or None if there is no cache/entry."""
+    return cache.get(key) if cache else None
+
+
+def _conditional_headers(entry: CacheEntry | None) -> dict:
+    """Returns the headers for a conditional request that revalidates the cache entry."""
+    return entry.conditional_headers() if entry else {}
+
+
+def _cache_response(cache: HttpCache | None, key: str, body: str, headers: dict) -> None:
+    """Caches the body along with the validators (`ETag`/`Last-Modified`) in the headers."""
+    if cache:
+        cache.put(
+            key,
+            body,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+        )
+
+
+def _cached_render(cache: HttpCache | None, url: str) -> str | None:
+    """Returns the cached rendered html of the url if it was cached within `RENDER_CACHE_TTL`."""
+    entry = _cached_entry(cache, RENDER_CACHE_PREFIX + url)
+    return entry.body if entry and entry.is_fresh(RENDER_CACHE_TTL) else None
+
+
+def _cache_render(cache: HttpCache | None, url: str, html: str) -> None:
+    """Caches the rendered html of the url (without validators; see `RENDER_CACHE_TTL`)."""
+    if cache:
+        cache.put(RENDER_CACHE_PREFIX + url, html)
+
+
+async def _cache_io(cache: HttpCache | None, function: Callable, *args) -> object:
+    """
+    Runs the function (which reads from/writes to the cache) in the event loop's default executor,
+    so that the (blocking) SQLite I/O doesn't block the other requests on the loop. Returns None
+    if there is no cache.
+    """
+    if not cache:
+        return None
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+def _batch_result(urls: list[str], results: list) -> BatchResult:
+    """
+    Creates a BatchResult from the list of results (either the html or the exception raised) of
+    each url.
+    """
+    batch = BatchResult()
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            batch.failures[url] = result
+        else:
+            batch.successes[url] = result
+    return batch
+
+
+async def _wait(
+        rate_limiter: RateLimiter | None,
+        url: str,
+        seconds: float = 0,
+        block_host: bool = False) -> None:
+    """
+    Waits until a request to url can be made (i.e. after `seconds` and according to the rate
+    limiter, if provided). If `block_host` is True (i.e. the server asked for requests to be
+    paused via `Retry-After`), the rate limiter also holds back the other requests to the host;
+    otherwise only the calling request waits.
+    """
+    if rate_limiter and block_host:
+        rate_limiter.block(url, seconds)
+    elif seconds > 0:
+        await asyncio.sleep(seconds)
+    if rate_limiter:
+        await rate_limiter.acquire(url)
+
+
+@dataclass
+class _Response:
+    """The status, headers and (for 200 responses) body returned by `_fetch`."""
+    status: int
+    headers: dict
+    body: str | None = None
+
+
+async def _fetch(
+        session: aiohttp.ClientSession,
+        url: str,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        headers: dict | None = None,
+        method: str = 'GET') -> _Response:
+    """
+    Sends a GET (or `method`) request, retrying according to retry_policy, and returns the
+    response if the status is 200 (or 304 for conditional requests); otherwise raises a
+    RequestException. For HEAD requests, responses from servers that don't support the method
+    (405/501) or that block clients that aren't browsers (403) are returned as is, since the
+    status of the document is unknown rather than failed.
+    """
+    timeout = aiohttp.ClientTimeout(total=retry_policy.timeout)
+    delay = 0
+    block_host = False
+    for attempt in count():
+        await _wait(rate_limiter, url, delay, block_host=block_host)
+        try:
+            async with session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    timeout=timeout) as response:
+                # 304 (Not Modified) is only returned for conditional requests (i.e. the caller
+                # has the html cached)
+                if response.status == 304 and headers:
+                    return _Response(status=304, headers=response.headers)
+                if method == 'HEAD' and response.status in (403, 405, 501):
+                    return _Response(status=response.status, headers=response.headers)
+                if response.status == 200:
+                    return _Response(
+                        status=200,
+                        headers=response.headers,
+                        body=await response.text(),
+                    )
+                delay = _retry_delay(retry_policy, response.status, response.headers, attempt)
+                # other requests to the host are only paused if the server asked for it
+                block_host = 'Retry-After' in response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+            delay = _connection_error_delay(retry_policy, url, exception, attempt)
+            block_host = False
+
+
+async def _get_html(
+        session: aiohttp.ClientSession,
+        url: str,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        cache: HttpCache | None = None) -> str:
+    """This function takes the HTML from an web-page and extracts the HTML."""
+    entry = await _cache_io(cache, _cached_entry, cache, url)
+    if entry and entry.is_fresh(cache.ttl):
+        return entry.body
+    response = await _fetch(
+        session,
+        url,
+        rate_limiter=rate_limiter,
+        retry_policy=retry_policy,
+        headers=_conditional_headers(entry),
+    )
+    if response.status == 304 and entry:
+        await _cache_io(cache, cache.touch, url)
+        return entry.body
+    await _cache_io(cache, _cache_response, cache, url, response.body, response.headers)
+    return response.body
+
+
+class _NetworkTracker:
+    """
+    Tracks the requests of a (pyppeteer) page, in order to detect when the network is idle.
+    Similar to puppeteer's `networkidle2`, the network is considered idle when there are no more
+    than `max_in_flight` requests in flight (e.g. long-polling/analytics connections that never
+    complete) and no request has started or finished for `idle_time` seconds. The idle clock
+    only starts once `start` is called (i.e. after the navigation has committed).
+    """
+    def __init__(self, page, max_in_flight: int = 2):
+        self.page = page
+        self.max_in_flight = max_in_flight
+        self._in_flight = set()
+        self._started = False
+        self._last_activity = time.monotonic()
+        self._listeners = {
+            'request': self._on_request,
+            'requestfinished': self._on_request_done,
+            'requestfailed': self._on_request_done,
+        }
+        for event, listener in self._listeners.items():
+            page.on(event, listener)
+
+    def detach(self) -> None:
+        """Removes the listeners from the page (e.g. before the page is returned to the pool)."""
+        for event, listener in self._listeners.items():
+            self.page.remove_listener(event, listener)
+
+    def start(self) -> None:
+        """Starts the idle clock (e.g. once the page's navigation has committed)."""
+        self._started = True
+        self._last_activity = time.monotonic()
+
+    def _on_request(self, request) -> None:
+        self._in_flight.add(request)
+        self._last_activity = time.monotonic()
+
+    def _on_request_done(self, request) -> None:
+        self._in_flight.discard(request)
+        self._last_activity = time.monotonic()
+
+    def is_idle(self, idle_time: float = NETWORK_IDLE_TIME) -> bool:
+        """Returns True if the network has been idle for at least `idle_time` seconds."""
+        return self._started \
+            and len(self._in_flight) <= self.max_in_flight \
+            and time.monotonic() - self._last_activity >= idle_time
+
+
+class _RequestBlocker:
+    """Aborts the requests of a (pyppeteer) page that are blocked by the block list."""
+    def __init__(self, page, block_list: BlockList):
+        self.page = page
+        self.block_list = block_list
+
+    async def attach(self) -> None:
+        await self.page.setRequestInterception(True)
+        self.page.on('request', self._on_request)
+
+    async def detach(self) -> None:
+        self.page.remove_listener('request', self._on_request)
+        await self.page.setRequestInterception(False)
+
+    def _on_request(self, request) -> None:
+        # the page itself is never blocked
+        if not request.isNavigationRequest() \
+                and self.block_list.blocks(request.url, request.resourceType):
+            asyncio.ensure_future(request.abort())
+        else:
+            asyncio.ensure_future(request.continue_())
+
+
+async def _goto(
+        page,
+        url: str,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY) -> None:
+    """
+    Navigates the (pyppeteer) page to the url, retrying according to retry_policy (as `_fetch`
+    does). The status of the document is taken from the response of the navigation, since the
+    browser itself doesn't raise on e.g. 404s; raises a RequestException if the status isn't 200.
+    """
+    timeout = (retry_policy.timeout or 0) * 1000
+    delay = 0
+    block_host = False
+    for attempt in count():
+        await _wait(rate_limiter, url, delay, block_host=block_host)
+        try:
+            response = await page.goto(url, waitUntil='domcontentloaded', timeout=timeout)
+        except (PageError, asyncio.TimeoutError) as exception:
+            delay = _connection_error_delay(retry_policy, url, exception, attempt)
+            block_host = False
+            continue
+        # there is no response for e.g. navigations to the same document (different anchor)
+        if response is None or response.status == 200:
+            return
+        # pyppeteer's header names are lower case
+        headers = {name.title(): value for name, value in response.headers.items()}
+        delay = _retry_delay(retry_policy, response.status, headers, attempt)
+        block_host = 'Retry-After' in headers
+
+
+async def _load_page(
+        page,
+        url: str,
+        ready_selector: str | None,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        block_list: BlockList | None = None) -> str:
+    """
+    Navigates the (pyppeteer) page to the url (see `_goto`) and returns the html as soon as the
+    page is ready, i.e. when `ready_selector` matches an element or, if no selector is provided,
+    when the network is idle. Raises a RequestException if the page isn't ready within
+    `retry_policy.timeout` seconds.
+
+    Requests blocked by `block_list` are aborted.
+    """
+    timeout = retry_policy.timeout
+    blocker = _RequestBlocker(page, block_list) if block_list else None
+    if blocker:
+        await blocker.attach()
+    network = _NetworkTracker(page)
+
+    async def is_ready():
+        # an idle network doesn't mean the content has rendered (e.g. the jobs are loaded by a
+        # request that starts after a delay), so the selector is waited for if provided
+        if ready_selector:
+            return await page.evaluate(
+                '(selector) => document.querySelector(selector) !== null',
+                ready_selector,
+            )
+        return network.is_idle()
+
+    async def wait_until_ready():
+        while not await is_ready():
+            await asyncio.sleep(READY_POLL_INTERVAL)
+
+    try:
+        await _goto(page, url, rate_limiter=rate_limiter, retry_policy=retry_policy)
+        network.start()
+        try:
+            await asyncio.wait_for(wait_until_ready(), timeout=timeout)
+        except asyncio.TimeoutError as exception:
+            raise RequestException(
+                f"{url}: page not ready after {timeout} seconds"
+            ) from exception
+        return await page.content()
+    finally:
+        network.detach()
+        if blocker:
+            await blocker.detach()
+
+
+class _SeleniumPageReady:
+    """
+    A `WebDriverWait` condition that is met when `ready_selector` matches an element or, if no
+    selector is provided, when no new resources have been loaded for `idle_time` seconds.
+    """
+    def __init__(self, ready_selector: str | None, idle_time: float = NETWORK_IDLE_TIME):
+        self.ready_selector = ready_selector
+        self.idle_time = idle_time
+        self._resources = None
+        self._changed_at = time.monotonic()
+
+    def __call__(self, driver) -> bool:
+        from selenium.webdriver.common.by import By
+        if self.ready_selector:
+            return len(driver.find_elements(By.CSS_SELECTOR, self.ready_selector)) > 0
+        resources = driver.execute_script(
+            "return performance.getEntriesByType('resource').length"
+        )
+        now = time.monotonic()
+        if resources != self._resources:
+            self._resources = resources
+            self._changed_at = now
+        return now - self._changed_at >= self.idle_time
+
+
+def _wait_until_ready_selenium(
+        driver,
+        url: str,
+        ready_selector: str | None,
+        timeout: float | None) -> None:
+    """
+    Blocks until the page loaded by the driver is ready (see `_SeleniumPageReady`). Raises a
+    RequestException if the page isn't ready within `timeout` seconds.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+    try:
+        WebDriverWait(
+            driver,
+            timeout=timeout if timeout else float('inf'),
+            poll_frequency=READY_POLL_INTERVAL,
+        ).until(_SeleniumPageReady(ready_selector))
+    except TimeoutException as exception:
+        raise RequestException(f"{url}: page not ready after {timeout} seconds") from exception
+
+
+async def _render_html(
+        browser_pool: BrowserPool,
+        url: str,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        cache: HttpCache | None = None,
+        ready_selector: str | None = None,
+        block_list: BlockList | None = None) -> str:
+    """
+    Renders the url in a page checked out from the browser pool and returns the html. This
+    coroutine runs on the browser pool's event loop.
+
+    The page is only downloaded once (by the browser); the status of the document is checked, and
+    failed navigations are retried, via the browser's response (see `_goto`).
+    """
+    html = await _cache_io(cache, _cached_render, cache, url)
+    if html is not None:
+        return html
+    async with browser_pool.page() as page:
+        html = await _load_page(
+            page,
+            url,
+            ready_selector,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            block_list=block_list,
+        )
+    await _cache_io(cache, _cache_render, cache, url, html)
+    return html
+
+
+def _render_html_selenium(
+        driver_pool: DriverPool,
+        client: HttpClient,
+        url: str,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        cache: HttpCache | None = None,
+        ready_selector: str | None = None,
+        block_list: BlockList | None = None) -> str:
+    """
+    Renders the url with a driver checked out from the driver pool and returns the html.
+
+    Selenium doesn't expose the status of the document, so the status is first checked with a
+    HEAD request via the HttpClient (which retries failed requests), so that a driver is only used
+    for pages that exist.
+    """
+    html = _cached_render(cache, url)
+    if html is not None:
+        return html
+    client.run(_fetch(
+        client.session,
+        url,
+        rate_limiter=rate_limiter,
+        retry_policy=retry_policy,
+        method='HEAD',
+    ))
+    with driver_pool.driver() as driver:
+        # drivers are shared across scrapers, so the blocked urls are set for every page
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd(
+            'Network.setBlockedURLs',
+            {'urls': block_list.url_patterns() if block_list else []},
+        )
+        driver.get(url)
+        _wait_until_ready_selenium(driver, url, ready_selector, timeout=retry_policy.timeout)
+        html = driver.page_source
+    _cache_render(cache, url, html)
+    return html
+
+
+def _iter_completed(futures: dict[Future, str]) -> Iterator[tuple[str, str | Exception]]:
+    """
+    Yields a tuple containing the url (the value of `futures`) and the result (or the exception
+    raised) of each future as soon as it completes. Futures that haven't completed are cancelled
+    if the iterator is closed early.
+
+    Completed futures are removed from `futures` before their result is yielded, so that the html
+    isn't kept in memory after it has been consumed.
+    """
+    try:
+        for future in as_completed(futures):
+            url = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as exception:
+                result = exception
+            del future
+            yield url, result
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _collect(
+        urls: list[str],
+        results: Iterator[tuple[str, str | Exception]],
+        partial: bool) -> list | BatchResult:
+    """
+    Collects the results yielded by `iter_get`/`iter_render` in the order of the urls. If
+    `partial` is False, the first exception is raised (and the remaining urls are cancelled);
+    otherwise a BatchResult is returned.
+    """
+    collected = {}
+    try:
+        for url, result in results:
+            if isinstance(result, Exception) and not partial:
+                raise result
+            collected[url] = result
+    finally:
+        results.close()
+    ordered = [collected[url] for url in urls]
+    if partial:
+        return _batch_result(urls=urls, results=ordered)
+    return ordered
+
+
+def get(
+        url,
+        client: HttpClient | None = None,
+        max_concurrency: int | None = DEFAULT_MAX_CONCURRENCY,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        partial: bool = False,
+        cache: HttpCache | None = None) -> object:
     """
     This function scrapes the HTML from either a single url (if a single string is passed in) or a
     set of urls (asynchronously) if a list of strings are passed in.
@@ -18,38 +556,102 @@ def get(url) -> object:
     Specifically, `get` scrapes the HTML before any JavaScript has rendered (whereas the `render`
     function loads the Javascript and subsequently scrapes the HTML). `get` is faster and prefered
     when the HTML of interest isn't loaded from JavasScript.
+
+    Args:
+        url: the url (str) or urls (list[str]) to scrape
+        client:
+            the HttpClient used to make the requests; connections are pooled and reused across
+            calls. If None, the shared client is used (see `http_client.get_default_client`).
+        max_concurrency:
+            the maximum number of requests in flight at the same time when scraping multiple urls;
+            if None, all urls are requested at once.
+        rate_limiter:
+            if provided, requests are throttled per host (see `rate_limiter.RateLimiter`).
+        retry_policy:
+            determines which failed requests are re-sent, how many times, and how long to wait in
+            between (see `retry.RetryPolicy`); `retry.NO_RETRY` disables retries.
+        partial:
+            only applicable when scraping multiple urls. If False, a RequestException is raised if
+            any url fails. If True, a BatchResult is returned containing the html of the urls that
+            succeeded and the exceptions of the urls that failed.
+        cache:
+            if provided, responses are cached and revalidated via conditional requests (i.e. the
+            html is only downloaded if it has changed; see `http_cache.HttpCache`).
     """
+    if not isinstance(url, str) and not isinstance(url, Iterable):
+        raise ValueError(f'Type={type(url)}. Only values of type str or list[str] are permitted.')
+    client = client or get_default_client()
     if isinstance(url, str):
-        response = requests.get(url=url)
-        if response.status_code != 200:
-            raise RequestException(f"status-code: {response.status_code}")
-        return response.text
-    elif isinstance(url, Iterable):
-        async def scrape_single(session, url):
-            """This function takes the HTML from an web-page and extracts the HTML."""
-            async with session.get(url) as response:
-                if response.status != 200:
-                    raise RequestException(f"status-code: {response.status}")
-                html = await response.text()
-                return html
-
-        async def get_results(urls):
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for url in urls:
-                    tasks.append(asyncio.ensure_future(scrape_single(session, url)))
-
-                htmls = await asyncio.gather(*tasks)
-                return htmls
-
-        results = asyncio.run(get_results(urls=url))
-        assert len(results) > 0
-        return results
+        return client.run(_get_html(
+            client.session,
+            url,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            cache=cache,
+        ))
     else:
-        raise ValueError(f'Type={type(url)}. Only values of type str or list[str] are permitted.')
+        urls = list(url); del url  # noqa
+        results = _collect(
+            urls,
+            iter_get(
+                urls,
+                client=client,
+                max_concurrency=max_concurrency,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                cache=cache,
+            ),
+            partial=partial,
+        )
+        assert len(urls) > 0
+        return results
 
 
-def render(url: str, use_selenium: bool = False) -> str | list:
+def iter_get(
+        urls: Iterable[str],
+        client: HttpClient | None = None,
+        max_concurrency: int | None = DEFAULT_MAX_CONCURRENCY,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        cache: HttpCache | None = None) -> Iterator[tuple[str, str | Exception]]:
+    """
+    Scrapes the urls concurrently (see `get`) and yields a tuple containing the url and its html
+    (or the exception raised if the url failed) as soon as each url completes, i.e. in the order
+    the urls complete rather than the order they are passed in. Closing the iterator early
+    cancels the urls that haven't completed.
+    """
+    client = client or get_default_client()
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def get_html(url):
+        coroutine = _get_html(
+            client.session,
+            url,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            cache=cache,
+        )
+        if semaphore is None:
+            return await coroutine
+        async with semaphore:
+            return await coroutine
+
+    yield from _iter_completed({client.submit(get_html(url)): url for url in urls})
+
+
+def render(
+        url: str,
+        use_selenium: bool = False,
+        max_concurrency: int | None = DEFAULT_MAX_CONCURRENCY,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        partial: bool = False,
+        cache: HttpCache | None = None,
+        client: HttpClient | None = None,
+        browser_pool: BrowserPool | None = None,
+        driver_pool: DriverPool | None = None,
+        ready_selector: str | None = None,
+        block_list: BlockList | None = None) -> str | list | BatchResult:
     """
     This function scrapes the HTML from either a single url (if a single string is passed in) or a
     set of urls (asynchronously) if a list of strings are passed in.
@@ -58,79 +660,157 @@ def render(url: str, use_selenium: bool = False) -> str | list:
     function scrapes the HTML before any Javascript has rendered). `get` is faster and prefered
     when the HTML of interest isn't loaded from JavasScript.
 
-    TODO: implement Selenium asynchronously
+    Pages are rendered by long-lived headless browsers that are shared across calls (see
+    `browser_pool`), so browsers aren't launched for each call.
 
     Args:
         url: the url to scrape
-        use_selenium: in some cases, HTMLSessions fails to render JavaScript. I'm not sure why. But
-            selenium seems to work, although it seems to be much slower. If possible, avoid using
-            selenium. You also must have Chrome installed.
-
-            Currently only an option when passing a single url.
-    """
-    import warnings
-    with warnings.catch_warnings():
-        warnings.filterwarnings("ignore", category=DeprecationWarning)
-        # https://stackoverflow.com/questions/46727787/runtimeerror-there-is-no-current-event-loop-in-thread-in-async-apscheduler
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        if isinstance(url, str):
-            if use_selenium:
-                from selenium import webdriver  # noqa
-                from selenium.webdriver.chrome.options import Options
-                # from selenium.webdriver.common.by import By
-                # from selenium.webdriver.support import expected_conditions as EC
-                # from selenium.webdriver.support.ui import WebDriverWait
-
-                options = Options()
-                options.add_argument('--headless')
-                options.add_argument('--no-sandbox')
-                options.add_argument("--disable-setuid-sandbox")
-                # options.add_argument('--ignore-ssl-errors=yes')
-                # options.add_argument('--ignore-certificate-errors')
-                driver = webdriver.Chrome(chrome_options=options)
-                driver.implicitly_wait(20)
-                driver.get(url)
-                # wait(driver, 10)
-                # import time
-                # time.sleep(3)
-                html = driver.page_source
-                return html
-            else:
-                with HTMLSession() as session:
-                    response = session.get(url=url)
-                    if response.status_code != 200:
-                        raise RequestException(f"status-code: {response.status_code}")
-                    response.html.render(timeout=90)
-                    return response.html.html
-        elif isinstance(url, Iterable):
-            urls = url; del url  # noqa
-
-            async def arender(session, url: str) -> str:
-                """
-                returns tuple including url and html (url is returned because asession.run does not
-                seem to ensure the same order is returned)
-                """
-                response = await session.get(url=url)
-                if response.status_code != 200:
-                    raise RequestException(f"status-code: {response.status_code}")
-                await response.html.arender(timeout=20)
-                return url, response.html.html
-
-            session = AsyncHTMLSession()
-            assert len(urls) == len(set(urls))  # ensure unique urls
-            # url=url explained in these links
-            # https://stackoverflow.com/questions/67656204/how-can-i-build-a-list-of-async-tasks-with-argument-for-asynchtmlsession-run
-            # https://docs.python.org/3.4/faq/programming.html#why-do-lambdas-defined-in-a-loop-with-different-values-all-return-the-same-result
-            # warning does not return in same order
-            results = session.run(*[lambda url=url: arender(session, url) for url in urls])
-            assert set(urls) == set(x[0] for x in results)
-            # ensure we return the job descriptions in the same order of the urls passed in
-            results = dict(results)  # keys are urls and values are
-            results = [results[x] for x in urls]
-            return results
+        use_selenium: in some cases, the headless browser fails to render JavaScript. I'm not sure
+            why. But selenium seems to work, although it seems to be much slower. If possible,
+            avoid using selenium. You also must have Chrome installed.
 
-        else:
-            raise ValueError(
-                f'Type={type(url)}. Only values of type str or list[str] are permitted.'
+            Multiple urls are rendered concurrently (in threads) by the drivers in `driver_pool`.
+        max_concurrency:
+            the maximum number of pages rendered at the same time when rendering multiple urls; if
+            None, all urls are rendered at once (subject to the size of the browser pool).
+        rate_limiter:
+            if provided, requests are throttled per host (see `rate_limiter.RateLimiter`).
+        retry_policy:
+            determines which failed requests are re-sent (see `get`).
+        partial:
+            only applicable when rendering multiple urls. If True, a BatchResult is returned
+            rather than raising an exception if any url fails (see `get`).
+        cache:
+            if provided, the rendered html is cached for `RENDER_CACHE_TTL` seconds (see
+            `http_cache.HttpCache`); unlike `get`, rendered html isn't revalidated via conditional
+            requests, since the document's validators don't cover the content loaded by JavaScript.
+        client:
+            the HttpClient used to check the status of the document (via a HEAD request) before
+            it is rendered with selenium; the headless browser checks the status itself.
+        browser_pool:
+            the pool of browsers used to render the pages; if None, the shared pool is used (see
+            `browser_pool.get_default_browser_pool`).
+        driver_pool:
+            the pool of Selenium drivers used when `use_selenium` is True; if None, the shared
+            pool is used (see `browser_pool.get_default_driver_pool`).
+        ready_selector:
+            a CSS selector that matches an element on the page once the content of interest has
+            rendered (e.g. the selector of the job listings); the html is returned as soon as the
+            selector matches. If None, the html is returned once the network is idle (see
+            `NETWORK_IDLE_TIME`). Raises a RequestException if the page isn't ready (i.e. the
+            selector doesn't match or the network isn't idle) within `retry_policy.timeout`
+            seconds.
+        block_list:
+            if provided, the requests made by the page that are blocked by the block list (e.g.
+            images, fonts and analytics scripts) aren't sent (see `block_list.BlockList`).
+    """
+    if isinstance(url, str):
+        if use_selenium:
+            return _render_html_selenium(
+                driver_pool or get_default_driver_pool(),
+                client or get_default_client(),
+                url,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                cache=cache,
+                ready_selector=ready_selector,
+                block_list=block_list,
             )
+        browser_pool = browser_pool or get_default_browser_pool()
+        return browser_pool.run(_render_html(
+            browser_pool,
+            url,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            cache=cache,
+            ready_selector=ready_selector,
+            block_list=block_list,
+        ))
+    elif isinstance(url, Iterable):
+        urls = list(url); del url  # noqa
+        return _collect(
+            urls,
+            iter_render(
+                urls,
+                use_selenium=use_selenium,
+                max_concurrency=max_concurrency,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                cache=cache,
+                client=client,
+                browser_pool=browser_pool,
+                driver_pool=driver_pool,
+                ready_selector=ready_selector,
+                block_list=block_list,
+            ),
+            partial=partial,
+        )
+    else:
+        raise ValueError(
+            f'Type={type(url)}. Only values of type str or list[str] are permitted.'
+        )
+
+
+def iter_render(
+        urls: Iterable[str],
+        use_selenium: bool = False,
+        max_concurrency: int | None = DEFAULT_MAX_CONCURRENCY,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        cache: HttpCache | None = None,
+        client: HttpClient | None = None,
+        browser_pool: BrowserPool | None = None,
+        driver_pool: DriverPool | None = None,
+        ready_selector: str | None = None,
+        block_list: BlockList | None = None) -> Iterator[tuple[str, str | Exception]]:
+    """
+    Renders the urls concurrently (see `render`) and yields a tuple containing the url and its
+    html (or the exception raised if the url failed) as soon as each url completes, i.e. in the
+    order the urls complete rather than the order they are passed in. Closing the iterator early
+    cancels the urls that haven't started.
+    """
+    urls = list(urls)
+    if use_selenium:
+        client = client or get_default_client()
+        # Selenium is synchronous, so each url is rendered in a worker thread; at most
+        # `driver_pool.size` urls are rendered at the same time (threads wait for a driver to be
+        # returned to the pool).
+        driver_pool = driver_pool or get_default_driver_pool()
+        max_workers = min(max_concurrency or len(urls), driver_pool.size, len(urls))
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            futures = {
+                executor.submit(
+                    _render_html_selenium,
+                    driver_pool,
+                    client,
+                    url,
+                    rate_limiter=rate_limiter,
+                    retry_policy=retry_policy,
+                    cache=cache,
+                    ready_selector=ready_selector,
+                    block_list=block_list,
+                ): url
+                for url in urls
+            }
+            yield from _iter_completed(futures)
+        return
+
+    browser_pool = browser_pool or get_default_browser_pool()
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def render_html(url):
+        coroutine = _render_html(
+            browser_pool,
+            url,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            cache=cache,
+            ready_selector=ready_selector,
+            block_list=block_list,
+        )
+        if semaphore is None:
+            return await coroutine
+        async with semaphore:
+            return await coroutine
+
+    yield from _iter_completed({browser_pool.submit(render_html(url)): url for url in urls})
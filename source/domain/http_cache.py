@@ -0,0 +1,238 @@
+"""
+This module contains an on-disk HTTP cache used by `html_scraper.get` and `html_scraper.render`.
+
+Each entry stores the (compressed) body of a url along with the `ETag`/`Last-Modified` validators
+returned by the server. Entries younger than `ttl` seconds are served without any request; older
+entries are revalidated with a conditional request (`If-None-Match`/`If-Modified-Since`) and, if
+the server responds with `304 Not Modified`, the cached body is returned without downloading it
+again. Rendered html (see `html_scraper.render`) is stored without validators and is only served
+for `html_scraper.RENDER_CACHE_TTL` seconds. When the cache grows beyond `max_size` bytes, the
+least recently used entries are evicted.
+
+    cache = HttpCache(path='data/http_cache.db')
+    html = html_scraper.get(url, cache=cache)
+
+The ETL configures a shared cache via `set_default_cache`, which scrapers use by default (see
+`JobScraperBase.http_cache`).
+"""
+from dataclasses import dataclass
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+@dataclass
+class CacheEntry:
+    """A cached response."""
+    key: str
+    body: str
+    etag: str | None
+    last_modified: str | None
+    # the time (seconds since epoch) the response was stored or last revalidated
+    stored_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        """Returns True if the entry can be used without revalidating it with the server."""
+        return time.time() - self.stored_at < ttl
+
+    def conditional_headers(self) -> dict:
+        """Returns the headers used to revalidate the entry with the server."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+# the number of reads after which the deferred `accessed_at` updates are written
+ACCESS_FLUSH_SIZE = 1000
+
+
+class HttpCache:
+    """
+    An on-disk (SQLite) cache of HTTP responses keyed by url. The cache is thread-safe.
+
+    Reads don't write to the database: the time each entry is accessed (which determines the
+    least recently used entries) is kept in memory and written in batches, along with the next
+    `put` (i.e. before entries are evicted) or once `ACCESS_FLUSH_SIZE` entries have been read.
+    The total size of the cached bodies is kept in memory, so that storing a response doesn't
+    have to sum the sizes of all entries.
+    """
+    def __init__(
+            self,
+            path: str = 'data/http_cache.db',
+            ttl: float = 0,
+            max_size: int = 500 * 1024 * 1024):
+        """
+        Args:
+            path: the path of the SQLite database containing the cache
+            ttl:
+                the number of seconds a response is used without revalidating it with the server;
+                0 means responses are always revalidated (i.e. via conditional requests)
+            max_size: the maximum size (in bytes, compressed) of the cached bodies
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL commits don't wait for the data to be synced to disk (i.e. an fsync per write);
+        # synchronous=NORMAL is safe in WAL mode (a crash can only lose the latest writes)
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        self._connection.execute('PRAGMA synchronous = NORMAL')
+        # key -> the time the entry was last accessed, not yet written to the database
+        self._accessed = {}
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS HTTP_CACHE (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS HTTP_CACHE_ACCESSED_AT ON HTTP_CACHE (accessed_at)'
+            )
+            self._total_size = self._connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM HTTP_CACHE'
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Writes the deferred access times and closes the connection to the database."""
+        with self._lock:
+            with self._connection:
+                self._flush_accessed()
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Returns the entry corresponding to the key (typically the url) or None if missing."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT body, etag, last_modified, stored_at FROM HTTP_CACHE WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                with self._connection:
+                    self._flush_accessed()
+        body, etag, last_modified, stored_at = row
+        return CacheEntry(
+            key=key,
+            body=zlib.decompress(body).decode('utf-8'),
+            etag=etag,
+            last_modified=last_modified,
+            stored_at=stored_at,
+        )
+
+    def put(
+            self,
+            key: str,
+            body: str,
+            etag: str | None = None,
+            last_modified: str | None = None) -> None:
+        """Stores the response and evicts the least recently used entries if necessary."""
+        compressed = zlib.compress(body.encode('utf-8'))
+        now = time.time()
+        with self._lock, self._connection:
+            previous = self._connection.execute(
+                'SELECT size FROM HTTP_CACHE WHERE key = ?',
+                (key,),
+            ).fetchone()
+            self._connection.execute(
+                """
+                INSERT OR REPLACE INTO HTTP_CACHE
+                    (key, body, etag, last_modified, stored_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, compressed, etag, last_modified, now, now, len(compressed)),
+            )
+            self._accessed.pop(key, None)
+            self._total_size += len(compressed) - (previous[0] if previous else 0)
+            # the access times determine which entries are evicted
+            self._flush_accessed()
+            self._evict()
+
+    def touch(self, key: str) -> None:
+        """
+        Marks the entry as revalidated (e.g. the server responded with `304 Not Modified`), which
+        resets its age.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'UPDATE HTTP_CACHE SET stored_at = ?, accessed_at = ? WHERE key = ?',
+                (now, now, key),
+            )
+            self._accessed.pop(key, None)
+
+    def size(self) -> int:
+        """Returns the total size (in bytes, compressed) of the cached bodies."""
+        with self._lock:
+            return self._total_size
+
+    def _flush_accessed(self) -> None:
+        """Writes the deferred access times (within the caller's transaction)."""
+        if self._accessed:
+            self._connection.executemany(
+                'UPDATE HTTP_CACHE SET accessed_at = ? WHERE key = ?',
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def _evict(self) -> None:
+        """Removes the least recently used entries until the cache is within `max_size`."""
+        excess = self._total_size - self.max_size
+        if excess <= 0:
+            return
+        rows = self._connection.execute(
+            'SELECT key, size FROM HTTP_CACHE ORDER BY accessed_at'
+        )
+        keys = []
+        for key, size in rows:
+            keys.append((key,))
+            excess -= size
+            self._total_size -= size
+            if excess <= 0:
+                break
+        self._connection.executemany('DELETE FROM HTTP_CACHE WHERE key = ?', keys)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM HTTP_CACHE')
+            self._accessed.clear()
+            self._total_size = 0
+
+
+_default_cache = None
+
+
+def get_default_cache() -> HttpCache | None:
+    """Returns the cache used by scrapers by default (None if caching is disabled)."""
+    return _default_cache
+
+
+def set_default_cache(cache: HttpCache | None) -> None:
+    """Sets the cache used by scrapers by default; None disables caching."""
+    global _default_cache
+    _default_cache = cache
@@ -0,0 +1,147 @@
+"""
+This module contains a long-lived, connection-pooled HTTP client that is shared across calls to
+`html_scraper.get` (and therefore across scrapers) so that TCP/TLS connections and DNS lookups are
+reused rather than re-established for every request.
+
+aiohttp sessions are bound to the event loop they were created in, so the client runs its own
+event loop in a background thread; synchronous callers (from any thread) submit coroutines to that
+loop via `HttpClient.run`.
+
+Typical usage is to rely on the default client, which is created on first use and closed via
+`close_default_client` (or automatically when the interpreter exits):
+
+    try:
+        html = html_scraper.get(url)
+        ...
+    finally:
+        close_default_client()
+
+Or to manage the lifecycle explicitly:
+
+    with HttpClient(limit_per_host=5) as client:
+        html = html_scraper.get(url, client=client)
+"""
+import atexit
+from concurrent.futures import Future
+import threading
+from typing import Any, Coroutine
+import aiohttp
+
+from source.domain.event_loop import BackgroundEventLoop
+
+
+class HttpClient:
+    """
+    Wraps an aiohttp.ClientSession (running on a background event loop) that pools connections
+    and keeps them alive across requests.
+    """
+    def __init__(
+            self,
+            limit: int = 100,
+            limit_per_host: int = 10,
+            ttl_dns_cache: int = 300,
+            keepalive_timeout: float = 30):
+        """
+        Args:
+            limit: the maximum number of simultaneous connections (across all hosts)
+            limit_per_host: the maximum number of simultaneous connections to a single host
+            ttl_dns_cache: the number of seconds DNS lookups are cached
+            keepalive_timeout: the number of seconds idle connections are kept alive for reuse
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self._loop = BackgroundEventLoop(name='http-client')
+        self._session = None
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """Returns True if the client is open (i.e. the session can be used)."""
+        return self._session is not None
+
+    def open(self) -> None:
+        """Starts the background event loop and creates the underlying session."""
+        with self._lock:
+            if self.is_open():
+                return
+            self._loop.start()
+
+            async def create_session():
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.ttl_dns_cache,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+                return aiohttp.ClientSession(connector=connector)
+
+            self._session = self._loop.run(create_session())
+
+    def close(self) -> None:
+        """Closes the underlying session (and connections) and stops the background event loop."""
+        with self._lock:
+            if not self.is_open():
+                return
+            self._loop.run(self._session.close())
+            self._session = None
+            self._loop.stop()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        The underlying aiohttp.ClientSession. The session can only be used by coroutines running
+        on the client's event loop (i.e. via `run` or `submit`).
+        """
+        if not self.is_open():
+            self.open()
+        return self._session
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Schedules the coroutine on the client's event loop and returns a
+        concurrent.futures.Future. This method can be called from any thread.
+        """
+        if not self.is_open():
+            self.open()
+        return self._loop.submit(coroutine)
+
+    def run(self, coroutine: Coroutine) -> Any:
+        """
+        Runs the coroutine on the client's event loop and blocks until it completes, returning
+        the result (or raising the exception). This method can be called from any thread.
+        """
+        return self.submit(coroutine).result()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> HttpClient:
+    """Returns the shared HttpClient, opening it if necessary."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        _default_client.open()
+        return _default_client
+
+
+def close_default_client() -> None:
+    """Closes the shared HttpClient; a new client will be created on next use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is not None:
+            _default_client.close()
+            _default_client = None
+
+
+atexit.register(close_default_client)
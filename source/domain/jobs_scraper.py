@@ -1,5 +1,22 @@
 from abc import ABC, abstractmethod
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from typing import Callable
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup, Tag
+import soupsieve
+import source.domain.html_parser as html_parser
 import source.domain.html_scraper as html_scraper
+from source.domain.block_list import DEFAULT_BLOCK_LIST, BlockList
+from source.domain.browser_pool import BrowserPool, DriverPool
+from source.domain.fetch_mode_store import JAVASCRIPT, STATIC, FetchModeStore, \
+    get_default_fetch_mode_store
+from source.domain.http_cache import HttpCache, get_default_cache
+from source.domain.http_client import HttpClient
+from source.domain.parse_pool import get_default_parse_pool
+from source.domain.rate_limiter import RateLimiter, get_rate_limiter
+from source.domain.retry import DEFAULT_RETRY_POLICY, RetryPolicy
 from source.entities.job_info import JobInfo
 
 
@@ -9,6 +26,10 @@ class JobScraperBase(ABC):
     listing is in an HTML element that can be selected via BeautifulSoup and each job HTML element
     contains a job title, location (optional), and a URL that references the job description.
 
+    The careers page is parsed a single time by `_extract_job_objects`, and the resulting Tags
+    (i.e. the job objects) are passed directly to `_extract_title`, `_extract_location`, and
+    `_extract_url`, so that each job listing doesn't need to be re-parsed for each field.
+
     Child classes specify url and HTML selectors by overriddening the necessary properies. Then the
     class can be used as follows:
 
@@ -27,54 +48,67 @@ class JobScraperBase(ABC):
         """Returns the URL to the careers/jobs page."""
 
     @abstractmethod
-    def _extract_job_objects(self, html: str) -> list[str]:
-        """Takes a string containg HTML of self.url and returns a list of html elements containing
-        the job information (e.g. title, location, job description url)."""
+    def _extract_job_objects(self, html: str) -> list[Tag | str]:
+        """
+        Takes a string containg HTML of self.url and returns a list of html elements (Tags)
+        containing the job information (e.g. title, location, job description url).
+
+        Returning the Tags (rather than `str(tag)`) avoids re-parsing each job in the `_extract_*`
+        methods. Returning a list of strings containing HTML is still supported, in which case
+        the strings are passed to the `_extract_*` methods instead.
+        """
 
     @abstractmethod
-    def _extract_title(self, html: str) -> str:
+    def _extract_title(self, job_object: Tag | str) -> str:
         """
-        Takes a string containing HTML of a job and extracts the job title.
+        Takes a job object (one of the objects returned by `_extract_job_objects`) and extracts
+        the job title.
         """
 
     @abstractmethod
-    def _extract_location(self, html: str) -> str:
+    def _extract_location(self, job_object: Tag | str) -> str:
         """
-        TBD
+        Takes a job object (one of the objects returned by `_extract_job_objects`) and extracts
+        the job location.
         """
 
     @abstractmethod
-    def _extract_url(self, html: str) -> str:
+    def _extract_url(self, job_object: Tag | str) -> str:
         """
-        TBD
+        Takes a job object (one of the objects returned by `_extract_job_objects`) and extracts
+        the url (typically relative) of the job description.
         """
 
     @abstractmethod
     def _extract_job_description(self, html: str) -> str:
         """
-        TBD
+        Takes the html of a job description page and extracts the description (as html). The
+        html should be parsed with `_parse_description_html` (see `description_parser_backend`).
         """
 
     @property
     def job_objects_use_javascript(self):
         """
         If the site uses Javascript to load jobs (e.g. from external site / container) then we
-        need to use requests_html.HTMLSession to load the entire site after rendering JavaScript;
-        whereas requests.get will load the html before JavaScript runs and the page fully renders.
+        need to use a headless browser (html_scraper.render) to load the entire site after
+        rendering JavaScript; whereas html_scraper.get will load the html before JavaScript runs
+        and the page fully renders.
+
+        Unsurprisingly, html_scraper.get is much faster than html_scraper.render
 
-        Unsurprisingly, requests.get is much faster than requests_html.HTMLSession
+        - Returning `False` from this property will use use html_scraper.get
+        - Returning `True` from this property will use use html_scraper.render
 
-        - Returning `False` from this property will use use requests.get
-        - Returning `True` from this property will use use requests_html.HTMLSession
+        Only used if `detect_javascript` is False.
         """
         return False
 
     @property
     def job_objects_use_selenium(self):
         """
-        Occasionally, HTMLSession in html_scraper.render does not properly render the JavaScript,
-        but Selenium seems to work. However, Selenium is much slower and should be avoided when
-        possible.
+        Occasionally, the headless browser in html_scraper.render does not properly render the
+        JavaScript, but Selenium seems to work. However, Selenium is much slower and should be
+        avoided when possible.
         """
         return False
 
@@ -82,26 +116,236 @@ class JobScraperBase(ABC):
     def job_descriptions_use_javascript(self):
         """
         If the job-description web-pages uses Javascript to load information (e.g. from external
-        site / container) then we need to use requests_html.HTMLSession to load the entire site
-        after rendering JavaScript; whereas requests.get will load the html before JavaScript runs
-        and the page fully renders.
+        site / container) then we need to use a headless browser (html_scraper.render) to load the
+        entire site after rendering JavaScript; whereas html_scraper.get will load the html before
+        JavaScript runs and the page fully renders.
+
+        Unsurprisingly, html_scraper.get is much faster than html_scraper.render
 
-        Unsurprisingly, requests.get is much faster than requests_html.HTMLSession
+        - Returning `False` from this property will use use html_scraper.get
+        - Returning `True` from this property will use use html_scraper.render
 
-        - Returning `False` from this property will use use requests.get
-        - Returning `True` from this property will use use requests_html.HTMLSession
+        Only used if `detect_javascript` is False.
         """
         return False
 
     @property
     def job_descriptions_use_selenium(self):
         """
-        Occasionally, HTMLSession in html_scraper.render does not properly render the JavaScript,
-        but Selenium seems to work. However, Selenium is much slower and should be avoided when
-        possible.
+        Occasionally, the headless browser in html_scraper.render does not properly render the
+        JavaScript, but Selenium seems to work. However, Selenium is much slower and should be
+        avoided when possible.
         """
         return False
 
+    @property
+    def http_client(self) -> HttpClient | None:
+        """
+        The HttpClient used to scrape the careers page and job descriptions (when JavaScript isn't
+        required). Returning `None` uses the client shared across all scrapers (see
+        `http_client.get_default_client`), so that connections are reused across the whole run.
+        """
+        return None
+
+    @property
+    def detect_javascript(self) -> bool:
+        """
+        If True, whether the careers page (and job descriptions) need JavaScript to be rendered is
+        detected automatically, rather than using `job_objects_use_javascript` (and
+        `job_descriptions_use_javascript`). The page is first scraped with html_scraper.get and
+        only rendered with html_scraper.render if the jobs (or description) can't be extracted
+        from the html (or the request fails, e.g. with a 403). The decision is persisted per site
+        (see `fetch_mode_store`) so that subsequent runs go straight to the cheapest path that
+        works.
+
+        Detection is opt-in: by default, the `*_use_javascript` properties are used. The
+        `*_use_selenium` properties still determine how pages are rendered.
+        """
+        return False
+
+    @property
+    def detect_javascript_failures(self) -> int:
+        """
+        Only applicable when `detect_javascript` is True. The number of job description pages
+        whose description can't be extracted from the static html before the site's job
+        descriptions are considered to need JavaScript (i.e. all of them are rendered and the
+        decision is persisted). Pages whose description can't be extracted are rendered either
+        way; a single unusual page doesn't change how the site's other pages are scraped.
+        """
+        return 2
+
+    @property
+    def fetch_mode_store(self) -> FetchModeStore | None:
+        """
+        The FetchModeStore used to persist whether the site's pages need JavaScript (see
+        `detect_javascript`). By default, the store shared across all scrapers is used (see
+        `fetch_mode_store.set_default_fetch_mode_store`), which is `None` (i.e. the mode is
+        detected on every run) unless configured (e.g. by the ETL).
+        """
+        return get_default_fetch_mode_store()
+
+    @property
+    def job_objects_ready_selector(self) -> str | None:
+        """
+        Only applicable when the careers page is rendered (i.e. `job_objects_use_javascript` is
+        True or, if `detect_javascript` is True, the page needs JavaScript). A CSS selector
+        (typically the selector used in `_extract_job_objects`) that matches an element once the
+        jobs have rendered; the careers page is returned as soon as the selector matches, and
+        rendering fails if it doesn't match within the retry policy's timeout. Returning `None`
+        waits until the network is idle instead (see `html_scraper.render`).
+        """
+        return None
+
+    @property
+    def job_descriptions_ready_selector(self) -> str | None:
+        """
+        Only applicable when the job descriptions are rendered (i.e.
+        `job_descriptions_use_javascript` is True or, if `detect_javascript` is True, the pages
+        need JavaScript). A CSS selector (typically the selector used in
+        `_extract_job_description`) that matches an element once the job description has rendered
+        (see `job_objects_ready_selector`).
+        """
+        return None
+
+    @property
+    def block_list(self) -> BlockList | None:
+        """
+        The requests (by resource type and domain) that aren't sent when rendering JavaScript,
+        e.g. images, fonts, media and analytics scripts that aren't needed to render the DOM (see
+        `block_list.BlockList`). Returning `None` sends all requests.
+        """
+        return DEFAULT_BLOCK_LIST
+
+    @property
+    def browser_pool(self) -> BrowserPool | None:
+        """
+        The BrowserPool used to render JavaScript. Returning `None` uses the pool shared across
+        all scrapers (see `browser_pool.get_default_browser_pool`), so that browsers are launched
+        once per run rather than once per page.
+        """
+        return None
+
+    @property
+    def driver_pool(self) -> DriverPool | None:
+        """
+        The DriverPool used when rendering with Selenium. Returning `None` uses the pool shared
+        across all scrapers (see `browser_pool.get_default_driver_pool`).
+        """
+        return None
+
+    @property
+    def http_cache(self) -> HttpCache | None:
+        """
+        The HttpCache used to cache the careers page and job descriptions, so that pages that
+        haven't changed aren't downloaded (or rendered) again. Returning `None` disables caching.
+        By default, the cache shared across all scrapers is used (see
+        `http_cache.set_default_cache`), which is `None` unless configured (e.g. by the ETL).
+        """
+        return get_default_cache()
+
+    @property
+    def max_concurrency(self) -> int | None:
+        """
+        The maximum number of job descriptions requested (or rendered) at the same time. Returning
+        `None` requests all job descriptions at once.
+        """
+        return html_scraper.DEFAULT_MAX_CONCURRENCY
+
+    @property
+    def requests_per_second(self) -> float | None:
+        """
+        The maximum (sustained) number of requests per second sent to the site's host. Returning
+        `None` does not rate limit the requests. Scrapers of the same site with the same value
+        share the same limit.
+        """
+        return None
+
+    @property
+    def rate_limiter(self) -> RateLimiter | None:
+        """Returns the RateLimiter corresponding to `requests_per_second`."""
+        if self.requests_per_second is None:
+            return None
+        return get_rate_limiter(requests_per_second=self.requests_per_second)
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """
+        Determines which failed requests are re-sent, how many times, and how long to wait in
+        between (see `retry.RetryPolicy`).
+        """
+        return DEFAULT_RETRY_POLICY
+
+    @property
+    def job_description_attempts(self) -> int:
+        """
+        The number of times the job descriptions that failed (i.e. even after being retried
+        according to `retry_policy`) are scraped again before `scrape` raises an exception. Job
+        descriptions that were successfully scraped are not scraped again.
+        """
+        return 2
+
+    @property
+    def parser_backend(self) -> str | None:
+        """
+        The parser BeautifulSoup uses to parse HTML (one of `html_parser.PARSER_BACKENDS` e.g.
+        'lxml' or 'html.parser'). Returning `None` uses the global default (see
+        `html_parser.set_default_backend`). Falls back to 'html.parser' if the backend is not
+        installed.
+        """
+        return None
+
+    @property
+    def description_parser_backend(self) -> str:
+        """
+        The parser used to parse job description pages (see `_parse_description_html`). The
+        descriptions are stored as serialized html and identified by its hash, which depends on
+        the parser, so this defaults to `html_parser.DESCRIPTION_BACKEND` rather than
+        `parser_backend`; changing it records every job as changed on the next run.
+        """
+        return html_parser.DESCRIPTION_BACKEND
+
+    @property
+    def parse_pool(self) -> Executor | None:
+        """
+        The (process) pool used to extract the job descriptions while other job descriptions are
+        still being downloaded, so that parsing uses all cores and overlaps with the network.
+        By default, the pool shared across all scrapers is used (see
+        `parse_pool.set_default_parse_pool`), which is `None` (i.e. descriptions are extracted
+        in the calling thread) unless configured (e.g. by the ETL). The scraper must be
+        picklable to use a process pool.
+        """
+        return get_default_parse_pool()
+
+    def _parse_html(self, html: str) -> BeautifulSoup:
+        """
+        Parses a string containing HTML and returns the corresponding BeautifulSoup object, using
+        the parser specified by `self.parser_backend`.
+        """
+        return html_parser.parse(html, backend=self.parser_backend)
+
+    def _parse_description_html(self, html: str) -> BeautifulSoup:
+        """
+        Parses the html of a job description page, using the parser specified by
+        `self.description_parser_backend`.
+        """
+        return html_parser.parse(html, backend=self.description_parser_backend)
+
+    def _select(self, job_object: Tag | str, selector: str) -> list[Tag]:
+        """
+        Returns the elements within `job_object` (including `job_object` itself) that match the
+        CSS `selector`. This matches the behavior of `BeautifulSoup(str(job_object)).select()`
+        without re-parsing the job object.
+
+        If `job_object` is a string (i.e. `_extract_job_objects` returned strings containing
+        HTML) then the string is parsed first.
+        """
+        if isinstance(job_object, str):
+            return self._parse_html(job_object).select(selector)
+        matches = job_object.select(selector)
+        if soupsieve.match(selector, job_object):
+            matches.insert(0, job_object)
+        return matches
+
     def _create_job_url(self, job_path: str) -> str:
         """
         This function returns the url to job description. It takes the job_path which is the url
@@ -127,30 +371,149 @@ class JobScraperBase(ABC):
             assert job.title
             assert job.description
 
-    def _scrape_job_objects(self) -> list[str]:
+    def _get(self, url: str) -> str:
+        """Scrapes the url with html_scraper.get using the scraper's configuration."""
+        return html_scraper.get(
+            url=url,
+            client=self.http_client,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            cache=self.http_cache,
+        )
+
+    def _render(self, url: str, use_selenium: bool, ready_selector: str | None) -> str:
+        """Scrapes the url with html_scraper.render using the scraper's configuration."""
+        return html_scraper.render(
+            url=url,
+            use_selenium=use_selenium,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            cache=self.http_cache,
+            client=self.http_client,
+            browser_pool=self.browser_pool,
+            driver_pool=self.driver_pool,
+            ready_selector=ready_selector,
+            block_list=self.block_list,
+        )
+
+    def _iter_get(self, urls: list[str]) -> Iterator[tuple[str, str | Exception]]:
+        """
+        Scrapes the urls with html_scraper.iter_get using the scraper's configuration, yielding
+        the url and html (or exception) of each url as soon as it completes.
+        """
+        return html_scraper.iter_get(
+            urls,
+            client=self.http_client,
+            max_concurrency=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            cache=self.http_cache,
+        )
+
+    def _iter_render(
+            self,
+            urls: list[str],
+            use_selenium: bool,
+            ready_selector: str | None) -> Iterator[tuple[str, str | Exception]]:
+        """
+        Renders the urls with html_scraper.iter_render using the scraper's configuration,
+        yielding the url and html (or exception) of each url as soon as it completes.
+        """
+        return html_scraper.iter_render(
+            urls,
+            use_selenium=use_selenium,
+            max_concurrency=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            cache=self.http_cache,
+            client=self.http_client,
+            browser_pool=self.browser_pool,
+            driver_pool=self.driver_pool,
+            ready_selector=ready_selector,
+            block_list=self.block_list,
+        )
+
+    def _fetch_mode_key(self, url: str, pages: str) -> str:
+        """
+        Returns the key of the fetch mode of the site's pages (i.e. 'job_objects' or
+        'job_descriptions'); e.g. 'careers.chime.com:job_objects'.
+        """
+        return f'{urlparse(url).netloc}:{pages}'
+
+    def _get_fetch_mode(self, key: str) -> str | None:
+        """Returns the stored fetch mode (or None if unknown)."""
+        store = self.fetch_mode_store
+        return store.get(key) if store else None
+
+    def _set_fetch_mode(self, key: str, mode: str, previous_mode: str | None) -> None:
+        """Stores the detected fetch mode (if it has changed)."""
+        store = self.fetch_mode_store
+        if store and mode != previous_mode:
+            store.set(key, mode)
+
+    @staticmethod
+    def _try_extract(extract: Callable[[str], object], html: str) -> object | None:
+        """
+        Returns the information (e.g. job objects or description) extracted from the html, or
+        None if it can't be extracted (i.e. the extract function raises or returns an empty
+        value, e.g. because the information is rendered by JavaScript).
+        """
+        try:
+            return extract(html) or None
+        except Exception:  # noqa
+            return None
+
+    def _scrape_job_objects(self) -> list[Tag | str]:
         """
         This function scrapes the careers/job page (self.url) and extracts and returns the job
         objects (i.e. Tags) returned from BeautifulSoup's .select function. This can be overridden
         by child classes if needed.
         """
-        if self.job_objects_use_javascript:
-            html = html_scraper.render(url=self.url, use_selenium=self.job_objects_use_selenium)
+        if self.detect_javascript:
+            key = self._fetch_mode_key(self.url, pages='job_objects')
+            mode = self._get_fetch_mode(key)
+            if mode != JAVASCRIPT:
+                try:
+                    html = self._get(self.url)
+                except html_scraper.RequestException:
+                    # e.g. a 403 for clients that don't run JavaScript, or a 5xx; the page is
+                    # rendered (the browser's own request decides whether it exists), but the
+                    # mode isn't stored since the failure may be transient
+                    html = None
+                if html is not None:
+                    job_objects = self._try_extract(self._extract_job_objects, html)
+                    if job_objects:
+                        self._set_fetch_mode(key, STATIC, previous_mode=mode)
+                        return job_objects
+                    self._set_fetch_mode(key, JAVASCRIPT, previous_mode=mode)
+            use_javascript = True
         else:
-            html = html_scraper.get(url=self.url)
+            use_javascript = self.job_objects_use_javascript
+
+        if use_javascript:
+            html = self._render(
+                self.url,
+                use_selenium=self.job_objects_use_selenium,
+                ready_selector=self.job_objects_ready_selector,
+            )
+        else:
+            html = self._get(self.url)
 
         job_objects = self._extract_job_objects(html=html)
         assert len(job_objects) > 0
         return job_objects
 
-    def _extract_job_info(self, html: str) -> JobInfo:
+    def _extract_job_info(self, job_object: Tag | str) -> JobInfo:
         """
         This function takes an individual job listing on the careers page (i.e. one of the
         objects in the list returned by _scrape_job_objects) and extracts the job information,
         returning a JobInfo object.
         """
-        title = self._extract_title(html=html)
-        location = self._extract_location(html=html)
-        job_url = self._create_job_url(job_path=self._extract_url(html=html))
+        # job_object is passed positionally so that child classes that name the parameter `html`
+        # (i.e. the original string-based signature) continue to work
+        title = self._extract_title(job_object)
+        location = self._extract_location(job_object)
+        job_url = self._create_job_url(job_path=self._extract_url(job_object))
 
         return JobInfo(
             company=self.company,
@@ -160,41 +523,299 @@ class JobScraperBase(ABC):
             description=None  # we will get descriptions from each job page async
         )
 
+    def _iter_job_description_htmls(
+            self,
+            job_urls: list[str]) -> Iterator[tuple[str, str | Exception]]:
+        """
+        This method scrapes the html of each job description url and yields a tuple containing
+        the url and the html (or the exception raised if the url failed) as soon as each url
+        completes.
+        """
+        def render(urls):
+            return self._iter_render(
+                urls,
+                use_selenium=self.job_descriptions_use_selenium,
+                ready_selector=self.job_descriptions_ready_selector,
+            )
+
+        if not self.detect_javascript:
+            if self.job_descriptions_use_javascript:
+                yield from render(job_urls)
+            else:
+                yield from self._iter_get(job_urls)
+            return
+
+        key = self._fetch_mode_key(job_urls[0], pages='job_descriptions')
+        mode = self._get_fetch_mode(key)
+        if mode == JAVASCRIPT:
+            yield from render(job_urls)
+            return
+        # job description pages of the same site share the same structure, so only the pages up
+        # to the first page that succeeds are checked (rather than parsing every page an extra
+        # time); failures are held back until the mode is known
+        failures = []
+        unextracted = []
+        checked = False
+        results = self._iter_get(job_urls)
+        for url, result in results:
+            if checked:
+                yield url, result
+                continue
+            if isinstance(result, Exception):
+                failures.append((url, result))
+            elif self._try_extract(self._extract_job_description, result):
+                checked = True
+                self._set_fetch_mode(key, STATIC, previous_mode=mode)
+                yield from failures
+                yield url, result
+                continue
+            else:
+                unextracted.append(url)
+            # failed requests (e.g. 403s for clients that don't run JavaScript) count towards
+            # rendering the pages, but only pages without a description are evidence of the
+            # site's mode, since the failures may be transient
+            if len(failures) + len(unextracted) >= self.detect_javascript_failures:
+                results.close()
+                if unextracted:
+                    self._set_fetch_mode(key, JAVASCRIPT, previous_mode=mode)
+                yield from render(job_urls)
+                return
+        # too few pages to decide the site's mode (e.g. an unusual page); they are rendered,
+        # unless the site is known to be static (in which case failures are failures)
+        if not checked:
+            if mode == STATIC:
+                yield from failures
+            else:
+                unextracted.extend(url for url, _ in failures)
+        if unextracted:
+            yield from render(unextracted)
+
+    def _iter_extracted_job_descriptions(
+            self,
+            results: Iterator[tuple[str, str | Exception]],
+            ) -> Iterator[tuple[str, str | Exception]]:
+        """
+        Takes the (url, html or exception) tuples returned by `_iter_job_description_htmls` and
+        yields a tuple containing the url and the extracted description (or the exception if the
+        url failed) as soon as each description has been extracted.
+
+        If `parse_pool` is set, each html is handed to the pool as soon as it has been downloaded,
+        so that descriptions are extracted while the other urls are still being downloaded.
+        """
+        pool = self.parse_pool
+        if pool is None:
+            for url, result in results:
+                if not isinstance(result, Exception):
+                    result = self._extract_job_description(html=result)
+                yield url, result
+            return
+
+        pending = {}
+        try:
+            for url, result in results:
+                if isinstance(result, Exception):
+                    yield url, result
+                else:
+                    pending[pool.submit(self._extract_job_description, html=result)] = url
+                for future in [x for x in pending if x.done()]:
+                    yield pending.pop(future), future.result()
+            for future in as_completed(list(pending)):
+                yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _iter_job_descriptions(self, job_urls: list[str]) -> Iterator[tuple[str, str]]:
+        """
+        This method takes a list of urls that correspond to the job description from individual
+        jobs, and scrapes each url, yielding a tuple containing the url and the extracted
+        description as soon as each url completes.
+
+        If some urls fail (after being retried according to `self.retry_policy`), only the urls
+        that failed are scraped again (up to `self.job_description_attempts` times in total).
+        A RequestException is raised (after the descriptions that succeeded have been yielded)
+        if urls still fail.
+        """
+        remaining_urls = job_urls
+        failures = {}
+        for _ in range(self.job_description_attempts):
+            failures = {}
+            results = self._iter_extracted_job_descriptions(
+                self._iter_job_description_htmls(job_urls=remaining_urls),
+            )
+            for url, result in results:
+                if isinstance(result, Exception):
+                    failures[url] = result
+                else:
+                    yield url, result
+            # retain the order of the urls
+            remaining_urls = [x for x in remaining_urls if x in failures]
+            if not remaining_urls:
+                break
+
+        if remaining_urls:
+            url = remaining_urls[0]
+            raise html_scraper.RequestException(
+                f"{self.company}: failed to scrape {len(remaining_urls)} job description(s) "
+                f"e.g. {url}: {failures[url]!r}"
+            ) from failures[url]
+
     def _scape_job_descriptions(self, job_urls: list[str]) -> list[str]:
         """
         This method takes a list of urls that correspond to the job description from individual
         jobs, and scrapes each url, extracting the description, and returning a list of
-        descriptions.
-        """
-        if self.job_descriptions_use_javascript:
-            if self.job_descriptions_use_selenium:
-                # need to do this syncronously because .render does not yet support selenium when
-                # using multiple urls asynchronously, it calls AsyncHTMLSession.get
-                # it could probably be refactored to work
-                htmls = [
-                    html_scraper.render(url=x, use_selenium=True) for x in job_urls
-                ]
-            else:
-                htmls = html_scraper.render(url=job_urls, use_selenium=False)
-        else:
-            htmls = html_scraper.get(url=job_urls)
-
-        descriptions = [self._extract_job_description(html=html) for html in htmls]
+        descriptions (see `_iter_job_descriptions`).
+        """
+        descriptions = dict(self._iter_job_descriptions(job_urls))
+        descriptions = [descriptions[url] for url in job_urls]
         assert len(descriptions) > 0
         return descriptions
 
-    def scrape(self) -> list[JobInfo]:
+    def _scrape_job_infos(self) -> list[JobInfo]:
         """
-        This function scrapes the job information from self.url and returns a list of JobInfo
-        objects.
+        Scrapes the careers page and returns the JobInfo objects (without descriptions) in the
+        order they are listed.
         """
         job_objects = self._scrape_job_objects()
         jobs = [self._extract_job_info(x) for x in job_objects]
         urls = [x.url for x in jobs]
         assert len(urls) == len(set(urls))  # ensure unique urls
-        descriptions = self._scape_job_descriptions(job_urls=urls)
-        for job, description in zip(jobs, descriptions):
-            job.description = description
+        return jobs
+
+    def _revalidates_job_descriptions(self, job_urls: list[str]) -> bool:
+        """
+        Returns True if the job description pages can be revalidated through the HTTP cache, i.e.
+        a cache is configured and the pages are scraped with html_scraper.get (rendered html
+        can't be revalidated; see `html_scraper.RENDER_CACHE_TTL`).
+        """
+        if self.http_cache is None:
+            return False
+        if self.detect_javascript:
+            key = self._fetch_mode_key(job_urls[0], pages='job_descriptions')
+            return self._get_fetch_mode(key) == STATIC
+        return not self.job_descriptions_use_javascript
+
+    def _iter_revalidated_jobs(
+            self,
+            jobs: dict[str, JobInfo],
+            known_descriptions: dict[str, str]) -> Iterator[JobInfo]:
+        """
+        Revalidates the job description pages of the jobs (key is the url) whose descriptions are
+        known via the HTTP cache and yields each job as soon as its description is set: the known
+        description if the page hasn't changed (or can't be requested or parsed), otherwise the
+        description extracted from the page.
+
+        Only pages whose cache entry has validators (`ETag`/`Last-Modified`) are requested, since
+        revalidating the other pages means downloading them again; their known descriptions are
+        used as is.
+        """
+        # the bodies are captured before the requests, which replace the cached bodies of pages
+        # that have changed
+        cached = {}
+        for url, job in jobs.items():
+            entry = self.http_cache.get(url)
+            if entry and entry.conditional_headers():
+                cached[url] = entry.body
+            else:
+                job.description = known_descriptions[url]
+                yield job
+        if not cached:
+            return
+        for url, result in self._iter_get(list(cached)):
+            description = None
+            if not isinstance(result, Exception) and result != cached[url]:
+                description = self._try_extract(self._extract_job_description, result)
+            job = jobs[url]
+            job.description = description or known_descriptions[url]
+            yield job
+
+    def _iter_described_jobs(
+            self,
+            jobs: list[JobInfo],
+            known_descriptions: dict[str, str] | None) -> Iterator[JobInfo]:
+        """
+        Sets the description of each job and yields the job as soon as its description is known.
+        Jobs with known descriptions are yielded first; the descriptions of the other jobs are
+        scraped and the jobs are yielded in the order the descriptions arrive.
+
+        If the job description pages can be revalidated through the HTTP cache (see
+        `_revalidates_job_descriptions`), the known descriptions of pages that have changed are
+        scraped again (i.e. a 304 response means the description hasn't changed); otherwise the
+        known descriptions are used as is.
+        """
+        known_descriptions = known_descriptions or {}
+        known_jobs = {}
+        new_jobs = {}
+        for job in jobs:
+            if job.url in known_descriptions:
+                known_jobs[job.url] = job
+            else:
+                new_jobs[job.url] = job
+        if known_jobs and self._revalidates_job_descriptions(list(known_jobs)):
+            yield from self._iter_revalidated_jobs(known_jobs, known_descriptions)
+        else:
+            for url, job in known_jobs.items():
+                job.description = known_descriptions[url]
+                yield job
+        if new_jobs:
+            for url, description in self._iter_job_descriptions(job_urls=list(new_jobs)):
+                job = new_jobs[url]
+                job.description = description
+                yield job
+
+    def iter_jobs(self, known_descriptions: dict[str, str] | None = None) -> Iterator[JobInfo]:
+        """
+        This function scrapes the job information from self.url and yields each JobInfo object
+        as soon as its description has been scraped, so that the jobs can be processed (e.g.
+        saved) while the other descriptions are still being downloaded. Jobs are yielded in the
+        order their descriptions arrive rather than the order they are listed (see `scrape`).
+
+        Args:
+            known_descriptions:
+                the descriptions of jobs that have already been scraped (see `scrape`).
+        """
+        for job in self._iter_described_jobs(self._scrape_job_infos(), known_descriptions):
+            self._assert_job_info_values([job])
+            yield job
+
+    async def ascrape(
+            self,
+            known_descriptions: dict[str, str] | None = None) -> AsyncIterator[JobInfo]:
+        """
+        Asynchronous version of `iter_jobs` that can be consumed with `async for` without
+        blocking the event loop; the scraping runs in a worker thread. If the consumer stops
+        early (or is cancelled), the scraping stops once the job being scraped is done.
+        """
+        loop = asyncio.get_running_loop()
+        jobs = self.iter_jobs(known_descriptions=known_descriptions)
+        done = object()
+        # the jobs are iterated (and closed) by a single worker thread, so that the generator
+        # isn't closed while it is still executing (e.g. if the consumer is cancelled)
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            while (job := await loop.run_in_executor(executor, next, jobs, done)) is not done:
+                yield job
+        finally:
+            executor.submit(jobs.close)
+            executor.shutdown(wait=False)
 
+    def scrape(self, known_descriptions: dict[str, str] | None = None) -> list[JobInfo]:
+        """
+        This function scrapes the job information from self.url and returns a list of JobInfo
+        objects (in the order they are listed on the careers page).
+
+        Args:
+            known_descriptions:
+                the descriptions of jobs that have already been scraped (e.g. in a previous
+                snapshot), where the key is the job url and the value is the description. The
+                descriptions of these jobs are carried forward rather than scraped again, so only
+                the descriptions of new jobs are scraped. If `http_cache` is set, the pages of
+                these jobs are revalidated (i.e. via conditional requests) and the descriptions of
+                pages that have changed are scraped again; this isn't possible for pages that are
+                rendered with JavaScript, whose known descriptions are always carried forward.
+        """
+        jobs = self._scrape_job_infos()
+        for _ in self._iter_described_jobs(jobs, known_descriptions):
+            pass
         self._assert_job_info_values(jobs)
         return jobs
@@ -0,0 +1,58 @@
+"""
+This module contains the process pool used to extract job descriptions (i.e.
+`JobScraperBase._extract_job_description`) while other job descriptions are still being
+downloaded.
+
+Parsing HTML with BeautifulSoup is CPU-bound and holds the GIL, so parsing in threads doesn't use
+more than one core; parsing in worker processes does. Each html is handed to the pool as soon as
+it has been downloaded, so network and CPU work overlap:
+
+    with create_parse_pool(workers=4) as pool:
+        set_default_parse_pool(pool)
+        jobs = scraper.scrape()
+
+Scrapers (and the descriptions they extract) are pickled to be sent to the worker processes.
+
+The ETL configures a shared pool via `set_default_parse_pool`, which scrapers use by default (see
+`JobScraperBase.parse_pool`). If no pool is configured, descriptions are extracted in the thread
+consuming the downloads.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+
+# the number of worker processes used by default (i.e. one per core)
+DEFAULT_PARSE_WORKERS = os.cpu_count() or 1
+
+
+def create_parse_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Creates a process pool with `workers` processes (DEFAULT_PARSE_WORKERS if None).
+
+    The worker processes are spawned rather than forked, since the process that scrapes runs
+    background threads (e.g. the HttpClient's event loop) that can't be safely forked.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers or DEFAULT_PARSE_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+    )
+
+
+_default_pool = None
+
+
+def get_default_parse_pool() -> ProcessPoolExecutor | None:
+    """
+    Returns the pool used by scrapers by default (None if descriptions are extracted in the
+    calling thread).
+    """
+    return _default_pool
+
+
+def set_default_parse_pool(pool: ProcessPoolExecutor | None) -> None:
+    """
+    Sets the pool used by scrapers by default; None extracts descriptions in the calling thread.
+    """
+    global _default_pool
+    _default_pool = pool
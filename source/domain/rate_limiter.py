@@ -0,0 +1,106 @@
+"""
+This module contains a per-host token-bucket rate limiter used by `html_scraper.get` and
+`html_scraper.render` so that requests to a careers site can be throttled to the rate the site
+tolerates (and paused when the site responds with `Retry-After`).
+
+The limiter is thread-safe and isn't bound to an event loop, so the same limiter can be shared
+across scrapers, threads, and event loops (e.g. `get` runs on the HttpClient's loop whereas
+`render` runs on its own loop).
+"""
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import cache
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter with one bucket per host. Each host can make `burst` requests
+    immediately, after which requests are spaced out to `requests_per_second`.
+
+        limiter = RateLimiter(requests_per_second=2)
+        await limiter.acquire(url)  # from a coroutine
+        limiter.acquire_sync(url)  # from synchronous code
+    """
+    def __init__(self, requests_per_second: float, burst: int = 1):
+        """
+        Args:
+            requests_per_second: the sustained number of requests per second allowed per host
+            burst: the number of requests per host that can be made without waiting
+        """
+        if requests_per_second <= 0:
+            raise ValueError('requests_per_second must be greater than 0')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        # host -> [tokens, time tokens were last updated, time the host is blocked until]
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _reserve(self, host: str) -> float:
+        """
+        Takes a token from the host's bucket and returns the number of seconds the caller must
+        wait before making the request. Tokens can go negative, which reserves future tokens for
+        callers that are already waiting.
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated, blocked_until = self._buckets.get(host, (self.burst, now, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.requests_per_second) - 1
+            self._buckets[host] = [tokens, now, blocked_until]
+            wait = 0 if tokens >= 0 else -tokens / self.requests_per_second
+            return max(wait, blocked_until - now)
+
+    async def acquire(self, url: str) -> None:
+        """Waits (without blocking the event loop) until a request can be made to url's host."""
+        wait = self._reserve(urlparse(url).netloc)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, url: str) -> None:
+        """Blocks until a request can be made to url's host."""
+        wait = self._reserve(urlparse(url).netloc)
+        if wait > 0:
+            time.sleep(wait)
+
+    def block(self, url: str, seconds: float) -> None:
+        """
+        Prevents any requests to url's host for `seconds` (e.g. in response to `Retry-After`).
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated, blocked_until = self._buckets.get(host, (self.burst, now, now))
+            self._buckets[host] = [tokens, updated, max(blocked_until, now + seconds)]
+
+
+@cache
+def get_rate_limiter(requests_per_second: float, burst: int = 1) -> RateLimiter:
+    """
+    Returns the RateLimiter shared by all callers using the same settings, so that scrapers of
+    the same site (e.g. multiple Chime scrapers) share the same per-host buckets.
+    """
+    return RateLimiter(requests_per_second=requests_per_second, burst=burst)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses the value of a `Retry-After` header (either a number of seconds or an HTTP date) and
+    returns the number of seconds to wait, or None if the value is missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
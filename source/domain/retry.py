@@ -0,0 +1,64 @@
+"""
+This module contains the policy that determines if/when failed requests are re-sent by
+`html_scraper.get` and `html_scraper.render`.
+"""
+from dataclasses import dataclass
+import random
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Determines how requests are retried. Requests that fail with one of `retry_statuses` (or
+    because of a connection error/timeout) are re-sent up to `max_attempts` times in total,
+    waiting an exponentially increasing (and randomly jittered) number of seconds between
+    attempts. If the server sends a `Retry-After` header, that delay is used instead (unless it
+    is longer than `max_retry_after`, in which case the request fails).
+
+    Args:
+        max_attempts: the total number of times a request is sent (1 means no retries)
+        backoff_base: the (maximum) delay in seconds before the first retry
+        backoff_max: the maximum delay in seconds between attempts
+        jitter:
+            if True, the delay is chosen uniformly at random between 0 and the exponential delay
+            (i.e. "full jitter") so that failed requests aren't all re-sent at the same time
+        retry_statuses: the status codes that are retried
+        timeout: the number of seconds before a request times out; None means no timeout
+        max_retry_after: the maximum `Retry-After` delay (in seconds) that will be honored
+    """
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30
+    jitter: bool = True
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+    timeout: float | None = 60
+    max_retry_after: float = 120
+
+    def backoff(self, attempt: int) -> float:
+        """Returns the number of seconds to wait after the `attempt`-th attempt (0-based)."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def can_retry(self, attempt: int) -> bool:
+        """Returns True if another attempt can be made after the `attempt`-th attempt."""
+        return attempt + 1 < self.max_attempts
+
+    def delay(self, status: int, retry_after: float | None, attempt: int) -> float | None:
+        """
+        Returns the number of seconds to wait before re-sending a request whose `attempt`-th
+        attempt (0-based) failed with `status`, or None if the request should not be re-sent.
+
+        Args:
+            status: the status code of the response
+            retry_after: the (parsed) value of the `Retry-After` header, if any
+            attempt: the 0-based index of the attempt that failed
+        """
+        if status not in self.retry_statuses or not self.can_retry(attempt):
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff(attempt)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+NO_RETRY = RetryPolicy(max_attempts=1)
@@ -1,5 +1,5 @@
 from source.domain.jobs_scraper import JobScraperBase
-from bs4 import BeautifulSoup
+from bs4 import Tag
 
 
 class VercelJobScraper(JobScraperBase):
@@ -11,33 +11,30 @@ class VercelJobScraper(JobScraperBase):
     def url(self):
         return 'https://vercel.com/careers'
 
-    def _extract_job_objects(self, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    def _extract_job_objects(self, html: str) -> list[Tag]:
+        soup = self._parse_html(html)
         job_objects = soup.select('a[class^=job-card_]')
         assert len(job_objects) > 0
-        return [str(x) for x in job_objects]
+        return job_objects
 
-    def _extract_title(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        title_object = soup.select('h3')
+    def _extract_title(self, job_object: Tag) -> str:
+        title_object = self._select(job_object, 'h3')
         assert len(title_object) == 1
         return title_object[0].text.strip()
 
-    def _extract_location(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        location_object = soup.select('h4')
+    def _extract_location(self, job_object: Tag) -> str:
+        location_object = self._select(job_object, 'h4')
         assert len(location_object) == 1
         return location_object[0].text.strip()
 
-    def _extract_url(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        tag = soup.select('a')
+    def _extract_url(self, job_object: Tag) -> str:
+        tag = self._select(job_object, 'a')
         assert len(tag) == 1
         return tag[0].attrs['href']
 
     def _extract_job_description(self, html: str) -> str:
-        soup_desc = BeautifulSoup(html, 'html.parser')
-        return str(soup_desc.select('section[class^=details_container]')[0])
+        soup = self._parse_description_html(html)
+        return str(soup.select('section[class^=details_container]')[0])
 
     def _create_job_url(self, job_path: str) -> str:
         return self.url + job_path.replace('/careers', '')
@@ -56,33 +53,34 @@ class AnacondaJobScraper(JobScraperBase):
     def job_objects_use_javascript(self):
         return True
 
-    def _extract_job_objects(self, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    @property
+    def job_objects_ready_selector(self):
+        return '.career-listing-link'
+
+    def _extract_job_objects(self, html: str) -> list[Tag]:
+        soup = self._parse_html(html)
         job_objects = soup.select('.career-listing-link')
         assert len(job_objects) > 0
-        return [str(x) for x in job_objects]
+        return job_objects
 
-    def _extract_title(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        title_object = soup.select('span.title')
+    def _extract_title(self, job_object: Tag) -> str:
+        title_object = self._select(job_object, 'span.title')
         assert len(title_object) == 1
         return title_object[0].text.strip()
 
-    def _extract_location(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        location_object = soup.select('span.location')
+    def _extract_location(self, job_object: Tag) -> str:
+        location_object = self._select(job_object, 'span.location')
         assert len(location_object) == 1
         return location_object[0].text.strip()
 
-    def _extract_url(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        tag = soup.select('a')
+    def _extract_url(self, job_object: Tag) -> str:
+        tag = self._select(job_object, 'a')
         assert len(tag) == 1
         return tag[0].attrs['href']
 
     def _extract_job_description(self, html: str) -> str:
-        soup_desc = BeautifulSoup(html, 'html.parser')
-        return str(soup_desc.select('div#main')[0])
+        soup = self._parse_description_html(html)
+        return str(soup.select('div#main')[0])
 
     def _create_job_url(self, job_path: str) -> str:
         return job_path
@@ -98,33 +96,38 @@ class ChimeJobScraper(JobScraperBase):
     def job_descriptions_use_javascript(self):
         return True
 
-    def _extract_job_objects(self, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    @property
+    def job_objects_ready_selector(self):
+        return 'li.jobs-list-item'
+
+    @property
+    def job_descriptions_ready_selector(self):
+        return 'section[class^=job-description]'
+
+    def _extract_job_objects(self, html: str) -> list[Tag]:
+        soup = self._parse_html(html)
         job_objects = soup.select('li.jobs-list-item')
         assert len(job_objects) > 0
-        return [str(x) for x in job_objects]
+        return job_objects
 
-    def _extract_title(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        title_object = soup.select('a')
+    def _extract_title(self, job_object: Tag) -> str:
+        title_object = self._select(job_object, 'a')
         assert len(title_object) == 1
         return title_object[0].text.strip()
 
-    def _extract_location(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        location_object = soup.select('span.job-location')
+    def _extract_location(self, job_object: Tag) -> str:
+        location_object = self._select(job_object, 'span.job-location')
         assert len(location_object) == 1
         temp = location_object[0].text.strip().split('\n')
         return temp[-1].strip()
 
-    def _extract_url(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        tag = soup.select('a')
+    def _extract_url(self, job_object: Tag) -> str:
+        tag = self._select(job_object, 'a')
         assert len(tag) == 1
         return tag[0].attrs['href']
 
     def _extract_job_description(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = self._parse_description_html(html)
         return str(soup.select('section[class^=job-description]')[0])
 
     def _create_job_url(self, job_path: str) -> str:
@@ -176,29 +179,30 @@ class OtterAIJobScraper(JobScraperBase):
     def job_descriptions_use_selenium(self):
         return True
 
-    def _extract_job_objects(self, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    @property
+    def job_objects_ready_selector(self):
+        return 'a[class^=career__position-item]'
+
+    def _extract_job_objects(self, html: str) -> list[Tag]:
+        soup = self._parse_html(html)
         # job_objects = soup.select('.career__position')
         job_objects = soup.select('a[class^=career__position-item]')
         assert len(job_objects) > 0
-        return [str(x) for x in job_objects]
+        return job_objects
 
-    def _extract_title(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        title_object = soup.find('div', class_='text-md cc-semi')
+    def _extract_title(self, job_object: Tag) -> str:
+        title_object = job_object.find('div', class_='text-md cc-semi')
         assert len(title_object) == 1
         return title_object.text.strip()
 
-    def _extract_location(self, html: str) -> str:
+    def _extract_location(self, job_object: Tag) -> str:
         return 'Location Not in Job Object'
-        # soup = BeautifulSoup(html, 'html.parser')
-        # location_object = soup.select('span.location')
+        # location_object = self._select(job_object, 'span.location')
         # assert len(location_object) == 1
         # return location_object[0].text.strip()
 
-    def _extract_url(self, html: str) -> str:
-        soup = BeautifulSoup(html, 'html.parser')
-        url = soup.find('a').get('href')
+    def _extract_url(self, job_object: Tag) -> str:
+        url = self._select(job_object, 'a')[0].get('href')
         assert len(url) > 0
         return url
 
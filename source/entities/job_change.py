@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+
+
+NEW = 'new'
+REMOVED = 'removed'
+CHANGED = 'changed'
+CHANGE_TYPES = (NEW, REMOVED, CHANGED)
+
+
+@dataclass
+class JobChange:
+    """
+    A job that was added (NEW), removed (REMOVED) or whose description changed (CHANGED) in a
+    snapshot, compared to the previous snapshot containing the company.
+    """
+    snapshot: str = None
+    previous_snapshot: str = None
+    change_type: str = None
+    company: str = None
+    title: str = None
+    location: str = None
+    url: str = None
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from itertools import starmap
 import pandas as pd
 
 
@@ -11,6 +12,9 @@ class JobInfo:
     description: str = None
 
 
+JOB_INFO_COLUMNS = [x.name for x in fields(JobInfo)]
+
+
 def to_dataframe(jobs: list[JobInfo]) -> pd.DataFrame:
     return pd.DataFrame(dict(
         company=[j.company for j in jobs],
@@ -22,13 +26,8 @@ def to_dataframe(jobs: list[JobInfo]) -> pd.DataFrame:
 
 
 def from_dataframe(df: pd.DataFrame) -> list[JobInfo]:
-    def to_info(row):
-        return JobInfo(
-            company=row.company,
-            title=row.title,
-            location=row.location,
-            url=row.url,
-            description=row.description,
-        )
-    x = df.apply(lambda x: to_info(x), axis=1)
-    return x.tolist()
+    # builds the JobInfos from the columns (as lists) rather than row by row (e.g. via
+    # `df.apply(..., axis=1)`, which creates a Series per row); other columns (e.g. snapshot) are
+    # ignored
+    columns = [df[column].tolist() for column in JOB_INFO_COLUMNS]
+    return list(starmap(JobInfo, zip(*columns)))
@@ -1,35 +1,150 @@
+import math
 import streamlit as st
-from helpsk.database import Sqlite
-from source.service.database import load_job_infos
+from source.entities.job_change import CHANGED, NEW, REMOVED, JobChange
+from source.entities.job_info import JobInfo
+from source.service.database import PooledSqlite, count_job_changes, count_job_infos, \
+    load_companies, load_job_changes, load_job_description, load_latest_snapshot, \
+    query_job_infos
+
+# the number of jobs listed at a time
+PAGE_SIZE = 50
+
+
+@st.cache_resource
+def get_database() -> PooledSqlite:
+    """The database (and its pooled connections) is shared across reruns and sessions."""
+    return PooledSqlite(path='data/jobs.db')
+
+
+# Query results are cached per snapshot: the snapshot is part of each cache key, so the cached
+# results are no longer used once the ETL saves a new snapshot. `max_entries` bounds the memory
+# used by each cache.
+@st.cache_data(max_entries=16)
+def get_companies(snapshot: str) -> list[str]:
+    return load_companies(database=get_database(), snapshot=snapshot)
+
+
+@st.cache_data(max_entries=16)
+def get_num_changes(snapshot: str) -> dict[str, int]:
+    return count_job_changes(database=get_database(), snapshot=snapshot)
+
+
+@st.cache_data(max_entries=16)
+def get_removed_jobs(snapshot: str) -> list[JobChange]:
+    return load_job_changes(database=get_database(), snapshot=snapshot, change_types=(REMOVED,))
+
+
+@st.cache_data(max_entries=256)
+def get_num_jobs(
+        snapshot: str,
+        companies: tuple[str],
+        title: str,
+        location: str,
+        search: str,
+        change_types: tuple[str] | None) -> int:
+    return count_job_infos(
+        database=get_database(),
+        snapshot=snapshot,
+        companies=companies,
+        title=title,
+        location=location,
+        search=search,
+        change_types=change_types,
+    )
+
+
+@st.cache_data(max_entries=256)
+def get_jobs(
+        snapshot: str,
+        companies: tuple[str],
+        title: str,
+        location: str,
+        search: str,
+        change_types: tuple[str] | None,
+        page: int) -> list[JobInfo]:
+    return query_job_infos(
+        database=get_database(),
+        snapshot=snapshot,
+        companies=companies,
+        title=title,
+        location=location,
+        search=search,
+        change_types=change_types,
+        limit=PAGE_SIZE,
+        offset=(page - 1) * PAGE_SIZE,
+    )
+
+
+@st.cache_data(max_entries=1000)
+def get_job_description(snapshot: str, url: str) -> str | None:
+    """
+    Loads the description of the selected job on demand; `snapshot` is only used as part of the
+    cache key (a job's description can change in a new snapshot).
+    """
+    return load_job_description(database=get_database(), url=url)
 
-db = Sqlite(path='data/jobs.db')
-jobs = load_job_infos(database=db)
-job_dict = {f"{j.company} - {j.title} - {j.location}": j for j in jobs}
-jobs_to_view = job_dict
 
 st.title('Job Openings')
+# a cheap query that determines whether the cached results can be used
+snapshot = load_latest_snapshot(database=get_database())
+if snapshot is None:
+    st.info('No jobs have been saved.')
+    st.stop()
+
 with st.sidebar:
-    companies_selection = st.sidebar.multiselect(
-        "Companies",
-        set([j.company for j in jobs])
+    # the filters are applied by the database, which only returns the jobs of the current page
+    filters = dict(
+        companies=tuple(st.sidebar.multiselect(
+            "Companies",
+            get_companies(snapshot),
+        )),
+        title=st.sidebar.text_input(
+            "Job Title",
+        ),
+        location=st.sidebar.text_input(
+            "Location",
+        ),
+        search=st.sidebar.text_input(
+            "Search",
+            help="Searches job titles, companies, locations and descriptions.",
+        ),
+        change_types=(NEW, CHANGED) if st.sidebar.checkbox(
+            "Only new or changed since last run",
+        ) else None,
     )
-    if companies_selection:
-        jobs_to_view = {k: v for k, v in jobs_to_view.items() if v.company in companies_selection}
-
-    job_title_search = st.sidebar.text_input(
-        "Job Title",
+    num_jobs = get_num_jobs(snapshot, **filters)
+    num_pages = max(math.ceil(num_jobs / PAGE_SIZE), 1)
+    page = st.sidebar.number_input(
+        f"Page (of {num_pages})",
+        min_value=1,
+        max_value=num_pages,
+        value=1,
+    )
+    jobs_to_view = get_jobs(snapshot, page=page, **filters)
+    st.sidebar.caption(f"{num_jobs} jobs")
+    num_changes = get_num_changes(snapshot)
+    st.sidebar.caption(
+        f"Since last run: {num_changes[NEW]} new, {num_changes[CHANGED]} changed, "
+        f"{num_changes[REMOVED]} removed"
     )
-    if job_title_search:
-        jobs_to_view = {k: v for k, v in jobs_to_view.items() if job_title_search in v.title}
 
-    jobs_selection = st.sidebar.selectbox(
+    selected_job = st.sidebar.selectbox(
         "Jobs",
-        tuple(jobs_to_view.keys())
+        jobs_to_view,
+        format_func=lambda j: f"{j.company} - {j.title} - {j.location}",
     )
 
-selected_job = jobs_to_view[jobs_selection]
+removed_jobs = get_removed_jobs(snapshot)
+if removed_jobs:
+    with st.expander(f"Removed since last run ({len(removed_jobs)})"):
+        for job in removed_jobs:
+            st.markdown(f"{job.company} - [{job.title}]({job.url}) - {job.location}")
+
+if selected_job is None:
+    st.info('No jobs match the filters.')
+    st.stop()
 st.header(f"{selected_job.title}")
 st.subheader(f"{selected_job.company} ({selected_job.location})")
 st.markdown(f'[{selected_job.url}]({selected_job.url})')
 st.markdown("""---""")
-st.markdown(selected_job.description, unsafe_allow_html=True)
+st.markdown(get_job_description(snapshot, selected_job.url), unsafe_allow_html=True)
@@ -1,22 +1,764 @@
+from collections.abc import Collection, Iterable, Iterator
 from datetime import datetime
-from helpsk.database import Database
-from helpsk.pandas import relocate
-from source.entities.job_info import JobInfo, from_dataframe, to_dataframe
+import hashlib
+import html
+from itertools import islice
+import re
+import zlib
+import threading
+from helpsk.database import Database, Sqlite
+from sqlalchemy import create_engine, text
+from source.entities.job_change import CHANGE_TYPES, CHANGED, NEW, REMOVED, JobChange
+from source.entities.job_info import JobInfo
 
 
 def datetime_now_utc() -> str:
     return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
 
 
-def save_job_infos(database: Database, jobs: list[JobInfo], snapshot: datetime):
-    df = to_dataframe(jobs=jobs)
-    df['snapshot'] = snapshot  # datetime.now().strftime('%Y-%m-%d %h:%M:%s')
-    df = relocate(df, column='snapshot', before='company')
+class PooledSqlite(Sqlite):
+    """
+    A Sqlite database that can be shared across threads (e.g. Streamlit sessions) and that reuses
+    connections. Sqlite creates a new engine (and connection) each time it is connected (e.g. by
+    each function in this module); PooledSqlite creates a single engine and checks connections
+    out of (and back into) the engine's pool. Each thread uses its own connection.
+
+        db = PooledSqlite(path='data/jobs.db')
+        jobs = query_job_infos(database=db, limit=50)
+    """
+    def __init__(self, path: str):
+        # the connection object (set by `connect`) is stored per thread
+        self._local = threading.local()
+        super().__init__(path=path)
+        self._engine = create_engine(self._connection_string)
+
+    @property
+    def connection_object(self):
+        return getattr(self._local, 'connection_object', None)
+
+    @connection_object.setter
+    def connection_object(self, value) -> None:
+        self._local.connection_object = value
+
+    def _open_connection_object(self):
+        return self._engine.connect()
+
+    def dispose(self) -> None:
+        """Closes the pooled connections."""
+        self._engine.dispose()
+
+
+# the number of jobs written at a time by `save_job_infos`
+DEFAULT_BATCH_SIZE = 1000
+# the number of rows read at a time by migrations that rewrite JOBS (see `_move_descriptions`)
+MIGRATION_BATCH_SIZE = 1000
+
+# applied to connections that write: WAL allows readers (e.g. the Streamlit app) to read while
+# the ETL writes (and vice versa); synchronous=NORMAL is safe in WAL mode and syncs far less often
+WRITE_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -20000',  # i.e. 20MB
+)
+
+
+def hash_description(description: str) -> str:
+    """Returns the key of the description in the DESCRIPTIONS table (i.e. its SHA-256 hash)."""
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+
+def _compress(description: str) -> bytes:
+    return zlib.compress(description.encode('utf-8'))
+
+
+def _decompress(data: bytes | None) -> str | None:
+    return None if data is None else zlib.decompress(data).decode('utf-8')
+
+
+def _columns(connection, table: str) -> list[str]:
+    """Returns the names of the table's columns."""
+    return [row[1] for row in connection.execute(text(f'PRAGMA table_info({table})'))]
+
+
+def _insert_descriptions(connection, descriptions: Iterable[str]) -> None:
+    """
+    Inserts the (compressed) descriptions that aren't already in the DESCRIPTIONS table; only new
+    descriptions are compressed.
+    """
+    descriptions = {hash_description(x): x for x in descriptions}
+    if not descriptions:
+        return
+    hashes = list(descriptions)
+    existing = set()
+    # SQLite limits the number of parameters in a statement
+    for index in range(0, len(hashes), 500):
+        chunk = hashes[index:index + 500]
+        parameters = {f'hash_{i}': x for i, x in enumerate(chunk)}
+        rows = connection.execute(
+            text(f'SELECT hash FROM DESCRIPTIONS WHERE hash IN '
+                 f'({", ".join(":" + x for x in parameters)})'),
+            parameters,
+        )
+        existing.update(row[0] for row in rows)
+    new = [
+        {'hash': key, 'description': _compress(description)}
+        for key, description in descriptions.items()
+        if key not in existing
+    ]
+    if new:
+        connection.execute(
+            text('INSERT INTO DESCRIPTIONS (hash, description) VALUES (:hash, :description)'),
+            new,
+        )
+
+
+def _move_descriptions(connection) -> None:
+    """
+    Moves the descriptions stored in JOBS (i.e. one copy per job per snapshot) to the
+    DESCRIPTIONS table (i.e. one compressed copy per distinct description). The rows are read in
+    batches of MIGRATION_BATCH_SIZE (by rowid), so the descriptions aren't all loaded at once.
+    """
+    columns = _columns(connection, 'JOBS')
+    if 'description_hash' not in columns:
+        connection.execute(text('ALTER TABLE JOBS ADD COLUMN description_hash TEXT'))
+    if 'description' not in columns:
+        return
+    select = text("""
+        SELECT rowid, description FROM JOBS
+        WHERE rowid > :rowid AND description IS NOT NULL
+        ORDER BY rowid
+        LIMIT :limit
+    """)
+    last_rowid = -2 ** 63  # i.e. the smallest rowid
+    while True:
+        rows = connection.execute(
+            select,
+            {'rowid': last_rowid, 'limit': MIGRATION_BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            break
+        _insert_descriptions(connection, {description for _, description in rows})
+        connection.execute(
+            text('UPDATE JOBS SET description_hash = :hash WHERE rowid = :rowid'),
+            [{'hash': hash_description(x), 'rowid': rowid} for rowid, x in rows],
+        )
+        last_rowid = rows[-1][0]
+    connection.execute(text('ALTER TABLE JOBS DROP COLUMN description'))
+
+
+def _search_text(description: str | None) -> str | None:
+    """Returns the text of the (HTML) description that is indexed (i.e. without tags)."""
+    if description is None:
+        return None
+    return html.unescape(re.sub(r'<[^>]+>', ' ', description))
+
+
+def _index_jobs(connection, rows: Iterable[dict]) -> None:
+    """
+    Adds the jobs (dictionaries containing rowid, company, title, location and description) to
+    the JOB_SEARCH index.
+    """
+    connection.execute(
+        text("""
+            INSERT INTO JOB_SEARCH (rowid, company, title, location, description)
+            VALUES (:rowid, :company, :title, :location, :description)
+        """),
+        [{**row, 'description': _search_text(row['description'])} for row in rows],
+    )
+
+
+def _index_latest_snapshot(connection) -> None:
+    """(Re)builds the JOB_SEARCH index from the jobs of the latest snapshot."""
+    connection.execute(text('DELETE FROM JOB_SEARCH'))
+    rows = connection.execute(text("""
+        SELECT JOBS.rowid, JOBS.company, JOBS.title, JOBS.location, DESCRIPTIONS.description
+        FROM JOBS
+        LEFT JOIN DESCRIPTIONS ON DESCRIPTIONS.hash = JOBS.description_hash
+        WHERE JOBS.last_seen = (SELECT MAX(snapshot) FROM SNAPSHOTS)
+    """)).fetchall()
+    if rows:
+        _index_jobs(connection, [
+            {
+                'rowid': rowid,
+                'company': company,
+                'title': title,
+                'location': location,
+                'description': _decompress(description),
+            }
+            for rowid, company, title, location, description in rows
+        ])
+
+
+def _compute_changes(connection, snapshot: str) -> None:
+    """
+    (Re)computes the JOB_CHANGES of the snapshot, i.e. the jobs that are new, removed or whose
+    description changed compared to the previous snapshot. Each company is compared to the
+    previous snapshot containing the company, so a company that failed to be scraped in a
+    snapshot (and therefore isn't in the snapshot) doesn't appear as removed and then new.
+    """
+    # a job that was seen before the snapshot was seen in every snapshot from its first_seen to
+    # its last_seen, so the latest snapshot before `snapshot` containing it is the earlier of its
+    # last_seen and the snapshot preceding `snapshot`
+    previous = """
+        WITH CURRENT_JOBS AS (
+            SELECT * FROM JOBS WHERE first_seen <= :snapshot AND last_seen >= :snapshot
+        ),
+        PREVIOUS AS (
+            SELECT
+                CURRENT.company,
+                (
+                    SELECT MAX(MIN(
+                        last_seen,
+                        (SELECT MAX(snapshot) FROM SNAPSHOTS WHERE snapshot < :snapshot)
+                    ))
+                    FROM JOBS
+                    WHERE company = CURRENT.company AND first_seen < :snapshot
+                ) AS snapshot
+            FROM (SELECT DISTINCT company FROM CURRENT_JOBS) AS CURRENT
+        )
+    """
+    parameters = {'snapshot': snapshot}
+    connection.execute(text('DELETE FROM JOB_CHANGES WHERE snapshot = :snapshot'), parameters)
+    connection.execute(
+        text(f"""
+            INSERT INTO JOB_CHANGES (
+                snapshot, previous_snapshot, change_type, company, title, location, url
+            )
+            {previous}
+            SELECT
+                :snapshot,
+                PREVIOUS.snapshot,
+                CASE WHEN PREVIOUS_JOBS.rowid IS NULL THEN :new ELSE :changed END,
+                CURRENT_JOBS.company,
+                CURRENT_JOBS.title,
+                CURRENT_JOBS.location,
+                CURRENT_JOBS.url
+            FROM CURRENT_JOBS
+            JOIN PREVIOUS ON PREVIOUS.company = CURRENT_JOBS.company
+            LEFT JOIN JOBS AS PREVIOUS_JOBS
+                ON PREVIOUS_JOBS.url = CURRENT_JOBS.url
+                AND PREVIOUS_JOBS.first_seen <= PREVIOUS.snapshot
+                AND PREVIOUS_JOBS.last_seen >= PREVIOUS.snapshot
+            WHERE PREVIOUS_JOBS.rowid IS NULL
+                OR PREVIOUS_JOBS.description_hash IS NOT CURRENT_JOBS.description_hash
+        """),
+        {**parameters, 'new': NEW, 'changed': CHANGED},
+    )
+    connection.execute(
+        text(f"""
+            INSERT INTO JOB_CHANGES (
+                snapshot, previous_snapshot, change_type, company, title, location, url
+            )
+            {previous}
+            SELECT
+                :snapshot,
+                PREVIOUS.snapshot,
+                :removed,
+                JOBS.company,
+                JOBS.title,
+                JOBS.location,
+                JOBS.url
+            FROM PREVIOUS
+            JOIN JOBS
+                ON JOBS.company = PREVIOUS.company
+                AND JOBS.first_seen <= PREVIOUS.snapshot
+                AND JOBS.last_seen >= PREVIOUS.snapshot
+            WHERE NOT EXISTS (
+                SELECT 1 FROM JOBS AS SNAPSHOT_JOBS
+                WHERE SNAPSHOT_JOBS.url = JOBS.url
+                    AND SNAPSHOT_JOBS.first_seen <= :snapshot
+                    AND SNAPSHOT_JOBS.last_seen >= :snapshot
+            )
+        """),
+        {**parameters, 'removed': REMOVED},
+    )
+
+
+def _compute_all_changes(connection) -> None:
+    """Computes the JOB_CHANGES of every snapshot."""
+    snapshots = connection.execute(text('SELECT snapshot FROM SNAPSHOTS ORDER BY snapshot'))
+    for (snapshot,) in snapshots.fetchall():
+        _compute_changes(connection, snapshot)
+
+
+def _store_intervals(connection) -> None:
+    """
+    Converts JOBS from one row per job per snapshot to one row per job per run of consecutive
+    snapshots containing the job (see migration 7). The rows of a job (i.e. the same company,
+    title, location, url and description) in consecutive snapshots are merged into a single row
+    whose first_seen/last_seen are the first/last snapshots of the run.
+    """
+    if 'first_seen' in _columns(connection, 'JOBS'):
+        return
+    connection.execute(text('DROP TABLE IF EXISTS JOB_INTERVALS'))
+    connection.execute(text("""
+        CREATE TABLE JOB_INTERVALS (
+            company TEXT,
+            title TEXT,
+            location TEXT,
+            url TEXT,
+            description_hash TEXT,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL
+        )
+    """))
+    # consecutive snapshots of a job have consecutive numbers, so `number - ROW_NUMBER()` is the
+    # same for all of the snapshots of a run (i.e. "gaps and islands")
+    connection.execute(text("""
+        INSERT INTO JOB_INTERVALS (
+            company, title, location, url, description_hash, first_seen, last_seen
+        )
+        WITH NUMBERED_SNAPSHOTS AS (
+            SELECT snapshot, ROW_NUMBER() OVER (ORDER BY snapshot) AS number FROM SNAPSHOTS
+        ),
+        VERSIONS AS (
+            SELECT
+                JOBS.company, JOBS.title, JOBS.location, JOBS.url, JOBS.description_hash,
+                JOBS.snapshot, NUMBERED_SNAPSHOTS.number, MIN(JOBS.rowid) AS position
+            FROM JOBS
+            JOIN NUMBERED_SNAPSHOTS ON NUMBERED_SNAPSHOTS.snapshot = JOBS.snapshot
+            GROUP BY
+                JOBS.company, JOBS.title, JOBS.location, JOBS.url, JOBS.description_hash,
+                JOBS.snapshot
+        ),
+        RUNS AS (
+            SELECT
+                *,
+                number - ROW_NUMBER() OVER (
+                    PARTITION BY company, title, location, url, description_hash
+                    ORDER BY number
+                ) AS run
+            FROM VERSIONS
+        )
+        SELECT
+            company, title, location, url, description_hash, MIN(snapshot), MAX(snapshot)
+        FROM RUNS
+        GROUP BY company, title, location, url, description_hash, run
+        ORDER BY MIN(position)
+    """))
+    connection.execute(text('DROP TABLE JOBS'))
+    connection.execute(text('ALTER TABLE JOB_INTERVALS RENAME TO JOBS'))
+
+
+def _remove_jobs(connection, snapshot: str, company: str | None = None) -> int:
+    """
+    Removes the jobs (of the company, or of all companies if None) from the snapshot and returns
+    the number of jobs removed. The snapshot is removed from the interval of each job: jobs only
+    seen in the snapshot are deleted, intervals starting/ending at the snapshot start/end at the
+    next/previous snapshot, and intervals spanning the snapshot are split in two.
+    """
+    condition = 'first_seen <= :snapshot AND last_seen >= :snapshot'
+    parameters = {
+        'snapshot': snapshot,
+        'previous': connection.execute(
+            text('SELECT MAX(snapshot) FROM SNAPSHOTS WHERE snapshot < :snapshot'),
+            {'snapshot': snapshot},
+        ).scalar(),
+        'next': connection.execute(
+            text('SELECT MIN(snapshot) FROM SNAPSHOTS WHERE snapshot > :snapshot'),
+            {'snapshot': snapshot},
+        ).scalar(),
+    }
+    if company is not None:
+        condition += ' AND company = :company'
+        parameters['company'] = company
+    count = connection.execute(
+        text(f'SELECT COUNT(*) FROM JOBS WHERE {condition}'),
+        parameters,
+    ).scalar()
+    if count == 0:
+        return 0
+    connection.execute(
+        text(f"""
+            DELETE FROM JOBS
+            WHERE {condition} AND first_seen = :snapshot AND last_seen = :snapshot
+        """),
+        parameters,
+    )
+    # the part of a spanning interval before the snapshot is inserted as a new row, so that the
+    # original row (which may be in the search index) keeps the part containing later snapshots
+    connection.execute(
+        text(f"""
+            INSERT INTO JOBS (
+                company, title, location, url, description_hash, first_seen, last_seen
+            )
+            SELECT company, title, location, url, description_hash, first_seen, :previous
+            FROM JOBS
+            WHERE {condition} AND first_seen < :snapshot AND last_seen > :snapshot
+        """),
+        parameters,
+    )
+    connection.execute(
+        text(f"""
+            UPDATE JOBS SET
+                first_seen = CASE WHEN last_seen > :snapshot THEN :next ELSE first_seen END,
+                last_seen = CASE WHEN last_seen > :snapshot THEN last_seen ELSE :previous END
+            WHERE {condition}
+        """),
+        parameters,
+    )
+    return count
+
+
+# Each migration is a list of steps (statements, or functions taking the connection) that
+# upgrades the schema by one version; the version of a database is stored in
+# `PRAGMA user_version` (see `migrate`). Steps must be idempotent (e.g. IF NOT EXISTS), since
+# databases created before migrations existed (by pandas) already contain the JOBS table, and
+# since a migration that fails part-way is applied again.
+MIGRATIONS = (
+    # 1: the JOBS table (one row per job per snapshot)
+    (
+        """
+        CREATE TABLE IF NOT EXISTS JOBS (
+            snapshot TEXT,
+            company TEXT,
+            title TEXT,
+            location TEXT,
+            url TEXT,
+            description TEXT
+        )
+        """,
+    ),
+    # 2: indexes, so that loading a snapshot (or a company's latest snapshot) doesn't scan the
+    # jobs of every snapshot; and the SNAPSHOTS table (one row per snapshot), so the latest
+    # snapshot is found without scanning JOBS
+    (
+        'CREATE INDEX IF NOT EXISTS IX_JOBS_SNAPSHOT ON JOBS (snapshot)',
+        'CREATE INDEX IF NOT EXISTS IX_JOBS_COMPANY_SNAPSHOT ON JOBS (company, snapshot)',
+        'CREATE INDEX IF NOT EXISTS IX_JOBS_URL ON JOBS (url)',
+        """
+        CREATE TABLE IF NOT EXISTS SNAPSHOTS (
+            snapshot TEXT PRIMARY KEY,
+            num_jobs INTEGER NOT NULL
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO SNAPSHOTS (snapshot, num_jobs)
+        SELECT snapshot, COUNT(*) FROM JOBS GROUP BY snapshot
+        """,
+    ),
+    # 3: descriptions are stored once (compressed) in the DESCRIPTIONS table, keyed by their hash
+    # (see `hash_description`), rather than once per job per snapshot; JOBS references the hash
+    (
+        """
+        CREATE TABLE IF NOT EXISTS DESCRIPTIONS (
+            hash TEXT PRIMARY KEY,
+            description BLOB NOT NULL
+        )
+        """,
+        _move_descriptions,
+    ),
+    # 4: a full-text search index (see `search_job_infos`) over the jobs of the latest snapshot;
+    # the rowid of each row is the rowid of the job in JOBS (the index is built by migration 7)
+    (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS JOB_SEARCH USING fts5(
+            company, title, location, description,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """,
+    ),
+    # 5: an index used to filter the jobs of a snapshot by company and to list them in order of
+    # company and title (see `query_job_infos`)
+    (
+        """
+        CREATE INDEX IF NOT EXISTS IX_JOBS_SNAPSHOT_COMPANY_TITLE
+        ON JOBS (snapshot, company, title)
+        """,
+    ),
+    # 6: the jobs that are new, removed or changed in each snapshot (see `_compute_changes`;
+    # the changes of existing snapshots are computed by migration 7); the (url, snapshot) index
+    # (which replaces the url index) is used to find the previous version of each job
+    (
+        'CREATE INDEX IF NOT EXISTS IX_JOBS_URL_SNAPSHOT ON JOBS (url, snapshot)',
+        'DROP INDEX IF EXISTS IX_JOBS_URL',
+        """
+        CREATE TABLE IF NOT EXISTS JOB_CHANGES (
+            snapshot TEXT NOT NULL,
+            previous_snapshot TEXT,
+            change_type TEXT NOT NULL,
+            company TEXT,
+            title TEXT,
+            location TEXT,
+            url TEXT
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS IX_JOB_CHANGES_SNAPSHOT_URL
+        ON JOB_CHANGES (snapshot, url, change_type)
+        """,
+    ),
+    # 7: JOBS stores one row per job per run of consecutive snapshots containing the job (i.e.
+    # first_seen/last_seen), rather than one row per job per snapshot, so it grows with the
+    # number of distinct jobs rather than with the number of snapshots (see `_store_intervals`).
+    # The jobs of a snapshot are the rows whose interval contains the snapshot; the jobs of the
+    # latest snapshot are the rows whose last_seen is the latest snapshot.
+    (
+        _store_intervals,
+        """
+        CREATE INDEX IF NOT EXISTS IX_JOBS_LAST_SEEN_COMPANY_TITLE
+        ON JOBS (last_seen, company, title)
+        """,
+        'CREATE INDEX IF NOT EXISTS IX_JOBS_COMPANY_LAST_SEEN ON JOBS (company, last_seen)',
+        'CREATE INDEX IF NOT EXISTS IX_JOBS_URL_LAST_SEEN ON JOBS (url, last_seen)',
+        _index_latest_snapshot,
+        _compute_all_changes,
+    ),
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+# the migrations that free most of the pages of JOBS (i.e. 3 moves the descriptions out of JOBS
+# and 7 stores one row per run of snapshots); the database is VACUUMed after applying them, since
+# SQLite doesn't shrink the file (or defragment the tables) otherwise
+VACUUM_MIGRATIONS = frozenset({3, 7})
+
+INSERT_JOB = """
+    INSERT INTO JOBS (
+        rowid, company, title, location, url, description_hash, first_seen, last_seen
+    )
+    VALUES (
+        :rowid, :company, :title, :location, :url, :description_hash, :snapshot, :snapshot
+    )
+"""
+# the weights of the JOB_SEARCH columns (company, title, location, description) when ranking
+SEARCH_WEIGHTS = (5.0, 10.0, 2.0, 1.0)
+SELECT_JOBS = """
+    SELECT JOBS.company, JOBS.title, JOBS.location, JOBS.url, DESCRIPTIONS.description
+    FROM JOBS
+    LEFT JOIN DESCRIPTIONS ON DESCRIPTIONS.hash = JOBS.description_hash
+"""
+
+
+def _migrate(connection) -> None:
+    """Applies the migrations that haven't been applied to the connection's database."""
+    version = connection.execute(text('PRAGMA user_version')).scalar()
+    for index in range(version, SCHEMA_VERSION):
+        for step in MIGRATIONS[index]:
+            if callable(step):
+                step(connection)
+            else:
+                connection.execute(text(step))
+        connection.execute(text(f'PRAGMA user_version = {index + 1}'))
+        connection.commit()
+    # VACUUM can't run within a transaction, so it runs once all migrations have been committed
+    if VACUUM_MIGRATIONS.intersection(range(version, SCHEMA_VERSION)):
+        connection.execute(text('VACUUM'))
+        connection.commit()
+
+
+def migrate(database: Database) -> None:
+    """
+    This function creates the tables and indexes (or upgrades the schema of a database created
+    by a previous version) so that the database is at SCHEMA_VERSION. The functions in this module
+    call `migrate` before reading or writing, so it doesn't need to be called explicitly.
+    """
     with database:
-        database.insert_records(dataframe=df, table='JOBS')
+        _migrate(database.connection_object)
+
+
+def _batches(jobs: Iterable[JobInfo], batch_size: int) -> Iterator[list[JobInfo]]:
+    """Yields lists of (at most) `batch_size` jobs."""
+    jobs = iter(jobs)
+    while batch := list(islice(jobs, batch_size)):
+        yield batch
+
+
+def _job_key(company, title, location, url, description_hash) -> tuple:
+    """The columns identifying a version of a job (i.e. a row of JOBS)."""
+    return company, title, location, url, description_hash
 
 
-def load_job_infos(database: Database, latest_snapshots: bool = True) -> list[JobInfo]:
+def _save_batch(
+        connection,
+        batch: list[JobInfo],
+        snapshot: str,
+        previous_snapshot: str | None,
+        next_rowid: int) -> list[int]:
+    """
+    Saves the jobs under the snapshot and returns the rowid of each job. A job that is identical
+    to a job of the previous snapshot extends that job's interval (i.e. its last_seen) to the
+    snapshot; other jobs are inserted with rowids starting at `next_rowid`.
+    """
+    _insert_descriptions(connection, (x.description for x in batch if x.description))
+    hashes = [hash_description(x.description) if x.description else None for x in batch]
+    # the rowids of the jobs of the previous snapshot, by key (a list, since a snapshot can
+    # contain identical jobs)
+    previous_rowids = {}
+    urls = list({x.url for x in batch})
+    # SQLite limits the number of parameters in a statement
+    for index in range(0, len(urls) if previous_snapshot else 0, 500):
+        parameters = {f'url_{i}': x for i, x in enumerate(urls[index:index + 500])}
+        rows = connection.execute(
+            text(f"""
+                SELECT rowid, company, title, location, url, description_hash FROM JOBS
+                WHERE url IN ({", ".join(":" + x for x in parameters)})
+                    AND last_seen = :previous_snapshot
+                ORDER BY rowid
+            """),
+            {**parameters, 'previous_snapshot': previous_snapshot},
+        )
+        for rowid, *key in rows:
+            previous_rowids.setdefault(_job_key(*key), []).append(rowid)
+    rowids = []
+    extended = []
+    inserted = []
+    for job, description_hash in zip(batch, hashes):
+        key = _job_key(job.company, job.title, job.location, job.url, description_hash)
+        if previous_rowids.get(key):
+            rowid = previous_rowids[key].pop(0)
+            extended.append({'rowid': rowid, 'snapshot': snapshot})
+        else:
+            rowid = next_rowid + len(inserted)
+            inserted.append({
+                'rowid': rowid,
+                'snapshot': snapshot,
+                'company': job.company,
+                'title': job.title,
+                'location': job.location,
+                'url': job.url,
+                'description_hash': description_hash,
+            })
+        rowids.append(rowid)
+    if extended:
+        connection.execute(
+            text('UPDATE JOBS SET last_seen = :snapshot WHERE rowid = :rowid'),
+            extended,
+        )
+    if inserted:
+        connection.execute(text(INSERT_JOB), inserted)
+    return rowids
+
+
+def save_job_infos(
+        database: Database,
+        jobs: Iterable[JobInfo],
+        snapshot: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        discard_companies: Collection[str] = ()) -> int:
+    """
+    This function saves the jobs under the snapshot and returns the number of jobs saved.
+
+    All jobs are written in a single transaction, so readers see either none or all of the jobs
+    of the snapshot. `jobs` can be any iterable, including a generator that yields jobs as they
+    are scraped (e.g. `JobScraperBase.iter_jobs`); the jobs are saved in batches of `batch_size`
+    as they arrive, so they don't all need to be held in memory.
+
+    A job is stored once per run of consecutive snapshots containing it (rather than once per
+    snapshot): a job that is identical (i.e. same company, title, location, url and description)
+    to a job of the previous snapshot extends that job's last_seen to the snapshot. Each distinct
+    description is only stored once (compressed). If the snapshot is the latest snapshot, the
+    jobs replace the jobs of previous snapshots in the search index (see `search_job_infos`). The
+    jobs that are new, removed or changed compared to the previous snapshot are stored (see
+    `load_job_changes`).
+
+    Args:
+        database:
+            the database object
+        jobs:
+            the jobs to save
+        snapshot:
+            the snapshot timestamp (see `datetime_now_utc`)
+        batch_size:
+            the number of jobs saved at a time
+        discard_companies:
+            the companies whose jobs are removed from the snapshot before the transaction is
+            committed (e.g. companies that failed part-way through being scraped). This is only
+            read once `jobs` has been consumed, so it can be filled while the jobs are generated.
+    """
+    count = 0
+    with database:
+        connection = database.connection_object
+        for pragma in WRITE_PRAGMAS:
+            connection.execute(text(pragma))
+        _migrate(connection)
+        try:
+            latest_snapshot = connection.execute(
+                text('SELECT MAX(snapshot) FROM SNAPSHOTS')
+            ).scalar()
+            index = latest_snapshot is None or snapshot >= latest_snapshot
+            previous_snapshot = connection.execute(
+                text('SELECT MAX(snapshot) FROM SNAPSHOTS WHERE snapshot < :snapshot'),
+                {'snapshot': snapshot},
+            ).scalar()
+            is_new_snapshot = connection.execute(
+                text('SELECT COUNT(*) = 0 FROM SNAPSHOTS WHERE snapshot = :snapshot'),
+                {'snapshot': snapshot},
+            ).scalar()
+            if is_new_snapshot:
+                # the intervals of jobs seen before and after an older snapshot that is saved
+                # now (i.e. out of order) are split, since the jobs aren't in that snapshot
+                _remove_jobs(connection, snapshot)
+            # rowids are assigned explicitly so that the jobs can be added to the search index
+            next_rowid = connection.execute(
+                text('SELECT COALESCE(MAX(rowid), 0) + 1 FROM JOBS')
+            ).scalar()
+            for batch in _batches(jobs, batch_size):
+                rowids = _save_batch(connection, batch, snapshot, previous_snapshot, next_rowid)
+                extended = [x for x in rowids if x < next_rowid]
+                if index:
+                    # jobs whose interval was extended may already be indexed
+                    if extended:
+                        connection.execute(
+                            text('DELETE FROM JOB_SEARCH WHERE rowid = :rowid'),
+                            [{'rowid': x} for x in extended],
+                        )
+                    _index_jobs(connection, [
+                        {
+                            'rowid': rowid,
+                            'company': job.company,
+                            'title': job.title,
+                            'location': job.location,
+                            'description': job.description,
+                        }
+                        for rowid, job in zip(rowids, batch)
+                    ])
+                next_rowid += len(rowids) - len(extended)
+                count += len(batch)
+            for company in discard_companies:
+                parameters = {'snapshot': snapshot, 'company': company}
+                connection.execute(
+                    text("""
+                        DELETE FROM JOB_SEARCH WHERE rowid IN (
+                            SELECT rowid FROM JOBS
+                            WHERE first_seen <= :snapshot AND last_seen >= :snapshot
+                                AND company = :company
+                        )
+                    """),
+                    parameters,
+                )
+                count -= _remove_jobs(connection, snapshot, company=company)
+            if count > 0:
+                connection.execute(
+                    text("""
+                        INSERT INTO SNAPSHOTS (snapshot, num_jobs) VALUES (:snapshot, :count)
+                        ON CONFLICT (snapshot) DO UPDATE SET num_jobs = num_jobs + :count
+                    """),
+                    {'snapshot': snapshot, 'count': count},
+                )
+                _compute_changes(connection, snapshot)
+                if index and latest_snapshot is not None and latest_snapshot < snapshot:
+                    # the index only contains the jobs of the latest snapshot, i.e. the jobs of
+                    # the previous latest snapshot that weren't extended are removed
+                    connection.execute(
+                        text("""
+                            DELETE FROM JOB_SEARCH WHERE rowid IN (
+                                SELECT rowid FROM JOBS WHERE last_seen = :latest_snapshot
+                            )
+                        """),
+                        {'latest_snapshot': latest_snapshot},
+                    )
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+    return count
+
+
+def load_job_infos(
+        database: Database,
+        latest_snapshots: bool = True,
+        include_descriptions: bool = True,
+        snapshot: str | None = None) -> list[JobInfo]:
     """
     This function queries the database and returns a list of JobInfos.
 
@@ -25,15 +767,410 @@ def load_job_infos(database: Database, latest_snapshots: bool = True) -> list[Jo
             the database object
         latest_snapshots:
             If `True`, return the JobInfos corresponding to records with the latest snapshot
-            timestamp.
-            If `False`, return a list of JobInfo objects corresponding to all records; Note that if
-            there are multiple snapshots for the same company/title, this will result in a
-            non-sensical list with duplicated jobs.
+            timestamp (or with `snapshot`).
+            If `False`, return a list of JobInfo objects corresponding to all records (i.e. the
+            jobs of each snapshot, in order of snapshot); Note that if there are multiple
+            snapshots for the same company/title, this will result in a non-sensical list with
+            duplicated jobs.
+        include_descriptions:
+            If `False`, the descriptions aren't loaded (i.e. `JobInfo.description` is None), which
+            is much faster and uses much less memory when listing jobs; the description of a job
+            can then be loaded on demand with `load_job_description`.
+        snapshot:
+            the snapshot (see `load_latest_snapshot`) whose jobs are returned if `latest_snapshots`
+            is True; None uses the latest snapshot. The jobs of a snapshot are the jobs whose
+            first_seen/last_seen interval contains the snapshot.
     """
+    if include_descriptions:
+        query = SELECT_JOBS
+    else:
+        query = 'SELECT JOBS.company, JOBS.title, JOBS.location, JOBS.url, NULL FROM JOBS'
     if latest_snapshots:
-        query = 'SELECT * FROM JOBS WHERE snapshot = (SELECT MAX(snapshot) FROM JOBS)'
+        condition, parameters = _as_of_condition(snapshot)
+        query += f' WHERE {condition} ORDER BY JOBS.rowid'
+    else:
+        # each job is returned once for each snapshot in its interval
+        query += """
+            JOIN SNAPSHOTS
+                ON SNAPSHOTS.snapshot >= JOBS.first_seen AND SNAPSHOTS.snapshot <= JOBS.last_seen
+            ORDER BY SNAPSHOTS.snapshot, JOBS.rowid
+        """
+        parameters = {}
+    with database:
+        _migrate(database.connection_object)
+        rows = database.connection_object.execute(text(query), parameters).fetchall()
+    return [
+        JobInfo(
+            company=company,
+            title=title,
+            location=location,
+            url=url,
+            description=_decompress(description),
+        )
+        for company, title, location, url, description in rows
+    ]
+
+
+def load_job_description(database: Database, url: str) -> str | None:
+    """
+    This function returns the description of the job (from the latest snapshot that contains the
+    job), or None if the job (or its description) doesn't exist.
+
+    Args:
+        database:
+            the database object
+        url:
+            the url of the job (i.e. JobInfo.url)
+    """
+    query = """
+        SELECT DESCRIPTIONS.description
+        FROM JOBS
+        JOIN DESCRIPTIONS ON DESCRIPTIONS.hash = JOBS.description_hash
+        WHERE JOBS.url = :url
+        ORDER BY JOBS.last_seen DESC
+        LIMIT 1
+    """
+    with database:
+        _migrate(database.connection_object)
+        description = database.connection_object.execute(text(query), {'url': url}).scalar()
+    return _decompress(description)
+
+
+def load_job_descriptions(database: Database, company: str) -> dict[str, str]:
+    """
+    This function returns the descriptions of the company's jobs from the latest snapshot that
+    contains the company, as a dictionary where the key is the job url and the value is the
+    description. This allows scrapers to only scrape the descriptions of new jobs (see
+    `JobScraperBase.scrape(known_descriptions=...)`).
+
+    Args:
+        database:
+            the database object
+        company:
+            the name of the company (i.e. JobInfo.company)
+    """
+    query = """
+        SELECT JOBS.url, DESCRIPTIONS.description
+        FROM JOBS
+        JOIN DESCRIPTIONS ON DESCRIPTIONS.hash = JOBS.description_hash
+        WHERE JOBS.company = :company
+            AND JOBS.last_seen = (SELECT MAX(last_seen) FROM JOBS WHERE company = :company)
+    """
+    with database:
+        _migrate(database.connection_object)
+        rows = database.connection_object.execute(text(query), {'company': company}).fetchall()
+    return {url: _decompress(description) for url, description in rows}
+
+
+def _search_query(keywords: str) -> str:
+    """
+    Converts keywords (e.g. entered by a user) into an FTS5 query that matches jobs containing
+    all of the keywords (in any column). Keywords match as prefixes, so that e.g. 'engineer'
+    matches 'engineers' and 'engineering', and partially typed keywords match.
+    """
+    return ' '.join('"' + x.replace('"', '""') + '"*' for x in keywords.split())
+
+
+def search_job_infos(
+        database: Database,
+        query: str,
+        limit: int | None = 100,
+        include_descriptions: bool = False,
+        raw_query: bool = False) -> list[JobInfo]:
+    """
+    This function searches the titles, companies, locations and descriptions of the jobs of the
+    latest snapshot, and returns the matching jobs ranked by relevance (best match first). Matches
+    in titles rank higher than matches in descriptions (see SEARCH_WEIGHTS).
+
+    Args:
+        database:
+            the database object
+        query:
+            the keywords to search for (e.g. 'data scientist'); jobs must contain all of the
+            keywords (as prefixes of words). If `raw_query` is True, `query` is an FTS5 query (e.g.
+            'title:(data AND scientist) NOT senior' or '"machine learning"').
+        limit:
+            the maximum number of jobs returned; None returns all matching jobs
+        include_descriptions:
+            If `True`, the descriptions of the jobs are loaded (see `load_job_infos`).
+        raw_query:
+            If `True`, `query` uses FTS5 query syntax.
+    """
+    if not raw_query:
+        query = _search_query(query)
+        if not query:
+            return []
+    description = 'DESCRIPTIONS.description' if include_descriptions else 'NULL'
+    weights = ', '.join(str(x) for x in SEARCH_WEIGHTS)
+    sql = f"""
+        SELECT JOBS.company, JOBS.title, JOBS.location, JOBS.url, {description}
+        FROM JOB_SEARCH
+        JOIN JOBS ON JOBS.rowid = JOB_SEARCH.rowid
+        LEFT JOIN DESCRIPTIONS ON DESCRIPTIONS.hash = JOBS.description_hash
+        WHERE JOB_SEARCH MATCH :query
+        ORDER BY bm25(JOB_SEARCH, {weights})
+        LIMIT :limit
+    """
+    with database:
+        _migrate(database.connection_object)
+        rows = database.connection_object.execute(
+            text(sql),
+            {'query': query, 'limit': -1 if limit is None else limit},
+        ).fetchall()
+    return [
+        JobInfo(
+            company=company,
+            title=title,
+            location=location,
+            url=url,
+            description=_decompress(description),
+        )
+        for company, title, location, url, description in rows
+    ]
+
+
+def _snapshot_condition(snapshot: str | None, table: str) -> tuple[str, dict]:
+    """
+    Returns the condition (and its parameters) selecting the rows of the table (e.g. JOB_CHANGES)
+    that belong to the snapshot (or to the latest snapshot if None).
+    """
+    if snapshot is None:
+        return f'{table}.snapshot = (SELECT MAX(snapshot) FROM SNAPSHOTS)', {}
+    return f'{table}.snapshot = :snapshot', {'snapshot': snapshot}
+
+
+def _as_of_condition(snapshot: str | None) -> tuple[str, dict]:
+    """
+    Returns the condition (and its parameters) selecting the jobs (i.e. rows of JOBS) of the
+    snapshot (or of the latest snapshot if None), i.e. the jobs whose interval contains the
+    snapshot. No job is seen after the latest snapshot, so the jobs of the latest snapshot are
+    selected by their last_seen alone.
+    """
+    if snapshot is None:
+        return 'JOBS.last_seen = (SELECT MAX(snapshot) FROM SNAPSHOTS)', {}
+    return 'JOBS.first_seen <= :snapshot AND JOBS.last_seen >= :snapshot', {'snapshot': snapshot}
+
+
+def _job_filters(
+        snapshot: str | None,
+        companies: Collection[str] | None,
+        title: str | None,
+        location: str | None,
+        search: str | None,
+        change_types: Collection[str] | None = None) -> tuple[str, dict]:
+    """
+    Returns the WHERE clause (and its parameters) selecting the jobs of the snapshot that match
+    the filters (see `query_job_infos`).
+    """
+    condition, parameters = _as_of_condition(snapshot)
+    conditions = [condition]
+    if companies:
+        names = {f'company_{i}': x for i, x in enumerate(companies)}
+        conditions.append(f'JOBS.company IN ({", ".join(":" + x for x in names)})')
+        parameters.update(names)
+    # LIKE is case-insensitive; wildcards in the filters are matched literally
+    for column, value in (('title', title), ('location', location)):
+        if value:
+            conditions.append(f"JOBS.{column} LIKE :{column} ESCAPE '\\'")
+            escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            parameters[column] = f'%{escaped}%'
+    if search:
+        conditions.append('JOB_SEARCH MATCH :search')
+        parameters['search'] = _search_query(search)
+    if change_types:
+        changes_condition, changes_parameters = _snapshot_condition(snapshot, 'JOB_CHANGES')
+        parameters.update(changes_parameters)
+        names = {f'change_type_{i}': x for i, x in enumerate(change_types)}
+        conditions.append(f"""
+            EXISTS (
+                SELECT 1 FROM JOB_CHANGES
+                WHERE {changes_condition}
+                    AND JOB_CHANGES.url = JOBS.url
+                    AND JOB_CHANGES.change_type IN ({", ".join(":" + x for x in names)})
+            )
+        """)
+        parameters.update(names)
+    return 'WHERE ' + ' AND '.join(conditions), parameters
+
+
+def query_job_infos(
+        database: Database,
+        companies: Collection[str] | None = None,
+        title: str | None = None,
+        location: str | None = None,
+        search: str | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+        include_descriptions: bool = False,
+        snapshot: str | None = None,
+        change_types: Collection[str] | None = None) -> list[JobInfo]:
+    """
+    This function returns the jobs of the latest snapshot (or of `snapshot`) that match all of
+    the filters, one page (i.e. `limit` jobs starting at `offset`) at a time. Jobs are ordered by
+    company and title, or by relevance if `search` is specified. Use `count_job_infos` to get the
+    number of jobs that match the filters.
+
+    Args:
+        database:
+            the database object
+        companies:
+            if specified, only jobs of these companies are returned
+        title:
+            if specified, only jobs whose title contains this text (case-insensitive) are returned
+        location:
+            if specified, only jobs whose location contains this text (case-insensitive) are
+            returned
+        search:
+            if specified, only jobs that contain all of the keywords (in any field, see
+            `search_job_infos`) are returned
+        limit:
+            the maximum number of jobs returned; None returns all matching jobs
+        offset:
+            the number of matching jobs skipped (e.g. `page * limit`)
+        include_descriptions:
+            If `True`, the descriptions of the jobs are loaded (see `load_job_infos`).
+        snapshot:
+            the snapshot (see `load_latest_snapshot`); None uses the latest snapshot. Note that
+            only the latest snapshot is indexed for `search`.
+        change_types:
+            if specified, only jobs that are new or changed in the snapshot (i.e. NEW and/or
+            CHANGED, see `load_job_changes`) are returned, e.g. the jobs that are new since the
+            last run
+    """
+    search = search if search and search.strip() else None
+    where, parameters = _job_filters(snapshot, companies, title, location, search, change_types)
+    description = 'DESCRIPTIONS.description' if include_descriptions else 'NULL'
+    if search:
+        weights = ', '.join(str(x) for x in SEARCH_WEIGHTS)
+        source = 'JOB_SEARCH JOIN JOBS ON JOBS.rowid = JOB_SEARCH.rowid'
+        order = f'bm25(JOB_SEARCH, {weights})'
     else:
-        query = 'SELECT * FROM JOBS'
+        source = 'JOBS'
+        order = 'JOBS.company, JOBS.title, JOBS.rowid'
+    sql = f"""
+        SELECT JOBS.company, JOBS.title, JOBS.location, JOBS.url, {description}
+        FROM {source}
+        LEFT JOIN DESCRIPTIONS ON DESCRIPTIONS.hash = JOBS.description_hash
+        {where}
+        ORDER BY {order}
+        LIMIT :limit OFFSET :offset
+    """
+    parameters.update({'limit': -1 if limit is None else limit, 'offset': offset})
+    with database:
+        _migrate(database.connection_object)
+        rows = database.connection_object.execute(text(sql), parameters).fetchall()
+    return [
+        JobInfo(
+            company=company,
+            title=title,
+            location=location,
+            url=url,
+            description=_decompress(description),
+        )
+        for company, title, location, url, description in rows
+    ]
+
+
+def count_job_infos(
+        database: Database,
+        companies: Collection[str] | None = None,
+        title: str | None = None,
+        location: str | None = None,
+        search: str | None = None,
+        snapshot: str | None = None,
+        change_types: Collection[str] | None = None) -> int:
+    """
+    This function returns the number of jobs of the latest snapshot (or of `snapshot`) that match
+    all of the filters (see `query_job_infos`).
+    """
+    search = search if search and search.strip() else None
+    where, parameters = _job_filters(snapshot, companies, title, location, search, change_types)
+    source = 'JOB_SEARCH JOIN JOBS ON JOBS.rowid = JOB_SEARCH.rowid' if search else 'JOBS'
+    with database:
+        _migrate(database.connection_object)
+        return database.connection_object.execute(
+            text(f'SELECT COUNT(*) FROM {source} {where}'),
+            parameters,
+        ).scalar()
+
+
+def load_companies(database: Database, snapshot: str | None = None) -> list[str]:
+    """This function returns the (sorted) companies of the latest snapshot (or of `snapshot`)."""
+    condition, parameters = _as_of_condition(snapshot)
+    query = f'SELECT DISTINCT JOBS.company FROM JOBS WHERE {condition} ORDER BY JOBS.company'
+    with database:
+        _migrate(database.connection_object)
+        rows = database.connection_object.execute(text(query), parameters)
+        return [row[0] for row in rows]
+
+
+def load_latest_snapshot(database: Database) -> str | None:
+    """
+    This function returns the latest snapshot (or None if no jobs have been saved). This is a
+    cheap query, so it can be used to check whether a new snapshot has been saved (e.g. to
+    invalidate cached query results).
+    """
+    with database:
+        _migrate(database.connection_object)
+        return database.connection_object.execute(
+            text('SELECT MAX(snapshot) FROM SNAPSHOTS')
+        ).scalar()
+
+
+def load_job_changes(
+        database: Database,
+        snapshot: str | None = None,
+        change_types: Collection[str] = CHANGE_TYPES,
+        companies: Collection[str] | None = None) -> list[JobChange]:
+    """
+    This function returns the jobs that are new, removed or whose description changed in the
+    latest snapshot (or in `snapshot`), compared to the previous snapshot containing each
+    company. The changes are computed when the snapshot is saved, so this is an indexed lookup.
+
+    Args:
+        database:
+            the database object
+        snapshot:
+            the snapshot (see `load_latest_snapshot`); None uses the latest snapshot
+        change_types:
+            the types of changes returned (i.e. values in `job_change.CHANGE_TYPES`)
+        companies:
+            if specified, only changes of jobs of these companies are returned
+    """
+    condition, parameters = _snapshot_condition(snapshot, 'JOB_CHANGES')
+    names = {f'change_type_{i}': x for i, x in enumerate(change_types)}
+    conditions = [condition, f'change_type IN ({", ".join(":" + x for x in names)})']
+    parameters.update(names)
+    if companies:
+        company_names = {f'company_{i}': x for i, x in enumerate(companies)}
+        conditions.append(f'company IN ({", ".join(":" + x for x in company_names)})')
+        parameters.update(company_names)
+    query = f"""
+        SELECT snapshot, previous_snapshot, change_type, company, title, location, url
+        FROM JOB_CHANGES
+        WHERE {' AND '.join(conditions)}
+        ORDER BY company, title
+    """
+    with database:
+        _migrate(database.connection_object)
+        rows = database.connection_object.execute(text(query), parameters).fetchall()
+    return [JobChange(*row) for row in rows]
+
+
+def count_job_changes(database: Database, snapshot: str | None = None) -> dict[str, int]:
+    """
+    This function returns the number of jobs of each type of change (i.e. NEW, REMOVED, CHANGED)
+    in the latest snapshot (or in `snapshot`); see `load_job_changes`.
+    """
+    condition, parameters = _snapshot_condition(snapshot, 'JOB_CHANGES')
+    query = f"""
+        SELECT change_type, COUNT(*) FROM JOB_CHANGES
+        WHERE {condition}
+        GROUP BY change_type
+    """
     with database:
-        df = database.query(sql=query)
-    return from_dataframe(df=df)
+        _migrate(database.connection_object)
+        rows = database.connection_object.execute(text(query), parameters).fetchall()
+    counts = dict.fromkeys(CHANGE_TYPES, 0)
+    counts.update(dict(rows))
+    return counts
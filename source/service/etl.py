@@ -1,8 +1,132 @@
-from helpsk.database import Sqlite
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+import queue
+from helpsk.database import Database
 
+from source.domain.browser_pool import close_default_pools
+from source.domain.fetch_mode_store import FetchModeStore, set_default_fetch_mode_store
+from source.domain.http_cache import HttpCache, set_default_cache
+from source.domain.http_client import close_default_client
+from source.domain.jobs_scraper import JobScraperBase
+from source.domain.parse_pool import create_parse_pool, set_default_parse_pool
 from source.domain.scrapers import AnacondaJobScraper, ChimeAnalyticsJobScraper, \
     ChimeDataScienceJobScraper, VercelJobScraper
-from source.service.database import save_job_infos, datetime_now_utc
+from source.entities.job_info import JobInfo
+from source.service.database import DEFAULT_BATCH_SIZE, PooledSqlite, load_job_descriptions, \
+    save_job_infos, datetime_now_utc
+
+
+# maximum number of companies scraped at the same time
+DEFAULT_MAX_WORKERS = 8
+
+
+def iter_scrape_all(
+        scrapers: list[JobScraperBase],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        load_known_descriptions: Callable[[str], dict[str, str]] | None = None,
+        ) -> Iterator[tuple[str, JobInfo | Exception]]:
+    """
+    Scrapes the companies concurrently (at most `max_workers` at a time) and yields a tuple of
+    (company, job) as soon as each job has been scraped (see `JobScraperBase.iter_jobs`), rather
+    than once all companies have been scraped.
+
+    If a company fails, a tuple of (company, exception) is yielded and no more jobs of that
+    company are yielded; jobs of the company that were yielded before it failed are not retracted.
+    A failure when scraping one company does not affect the other companies.
+
+    If provided, `load_known_descriptions` is called with the company's name (in the company's
+    worker thread, when the company starts being scraped) and returns the descriptions that have
+    already been scraped (see `JobScraperBase.iter_jobs`), so that only the descriptions of the
+    companies being scraped are held in memory.
+    """
+    events = queue.Queue()
+    done = object()
+
+    def scrape(scraper: JobScraperBase) -> None:
+        print(f'Scraping {scraper.company} ...')
+        try:
+            count = 0
+            known_descriptions = None
+            if load_known_descriptions:
+                known_descriptions = load_known_descriptions(scraper.company)
+            jobs = scraper.iter_jobs(known_descriptions=known_descriptions)
+            for job in jobs:
+                events.put((scraper.company, job))
+                count += 1
+            print(f'Scraped {scraper.company}: {count}')
+        except Exception as exception:
+            print(f'Failed to scrape {scraper.company}: {exception!r}')
+            events.put((scraper.company, exception))
+        finally:
+            events.put(done)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for scraper in scrapers:
+            executor.submit(scrape, scraper)
+        remaining = len(scrapers)
+        while remaining > 0:
+            event = events.get()
+            if event is done:
+                remaining -= 1
+            else:
+                yield event
+
+
+def run(
+        database: Database,
+        scrapers: list[JobScraperBase],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        incremental: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        ) -> dict[str, Exception]:
+    """
+    Scrapes the companies concurrently and saves the jobs of all companies under the same
+    snapshot. Returns a dictionary of the exception raised by each company that failed (key is the
+    company).
+
+    Jobs are saved (in batches of `batch_size`) as they are scraped rather than once all companies
+    have been scraped, in a single transaction. The jobs of a company that fails are removed from
+    the snapshot before the transaction is committed, so the snapshot only contains companies
+    that were scraped completely.
+
+    If `incremental` is True, only the descriptions of jobs that weren't in the company's latest
+    snapshot are scraped; the descriptions of the other jobs are carried forward, unless their
+    pages have changed according to the HTTP cache (see `JobScraperBase.scrape`). Pages rendered
+    with JavaScript can't be revalidated, so changes to their descriptions aren't detected.
+
+    Each company's descriptions are loaded when the company starts being scraped, by the
+    scraper's worker thread (while the jobs of other companies are being saved), so the database
+    must use a connection per thread (i.e. a PooledSqlite).
+    """
+    if incremental and not isinstance(database, PooledSqlite):
+        raise ValueError('incremental runs require a PooledSqlite database')
+    snapshot = datetime_now_utc()
+    failures = {}
+
+    def load_known_descriptions(company: str) -> dict[str, str]:
+        return load_job_descriptions(database=database, company=company)
+
+    def scraped_jobs() -> Iterator[JobInfo]:
+        events = iter_scrape_all(
+            scrapers=scrapers,
+            max_workers=max_workers,
+            load_known_descriptions=load_known_descriptions if incremental else None,
+        )
+        for company, result in events:
+            if isinstance(result, Exception):
+                failures[company] = result
+            else:
+                yield result
+
+    save_job_infos(
+        database=database,
+        jobs=scraped_jobs(),
+        snapshot=snapshot,
+        batch_size=batch_size,
+        discard_companies=failures,
+    )
+    # retain the order of the scrapers
+    return {s.company: failures[s.company] for s in scrapers if s.company in failures}
 
 
 def main():
@@ -12,19 +136,31 @@ def main():
         ChimeDataScienceJobScraper(),
         VercelJobScraper()
     ]
-
-    snapshot = datetime_now_utc()
-    db = Sqlite(path='data/jobs.db')
-
-    for scraper in scrapers:
-        print(f'Scraping {scraper.company} ...')
-        jobs = scraper.scrape()
-        print(f'Scraped {scraper.company}: {len(jobs)}')
-        save_job_infos(
-            database=db,
-            jobs=jobs,
-            snapshot=snapshot
-        )
+    db = PooledSqlite(path='data/jobs.db')
+    # pages that haven't changed since the last run are revalidated rather than re-downloaded
+    cache = HttpCache(path='data/http_cache.db')
+    set_default_cache(cache)
+    # whether each site needs JavaScript is detected once and reused in subsequent runs
+    fetch_mode_store = FetchModeStore(path='data/fetch_modes.db')
+    set_default_fetch_mode_store(fetch_mode_store)
+    # job descriptions are parsed (on all cores) while other job descriptions are downloading
+    parse_pool = create_parse_pool()
+    set_default_parse_pool(parse_pool)
+    try:
+        failures = run(database=db, scrapers=scrapers)
+    finally:
+        # close the connections and browsers that were pooled/reused across all scrapers
+        close_default_client()
+        close_default_pools()
+        db.dispose()
+        set_default_cache(None)
+        cache.close()
+        set_default_fetch_mode_store(None)
+        fetch_mode_store.close()
+        set_default_parse_pool(None)
+        parse_pool.shutdown(cancel_futures=True)
+    if failures:
+        print(f'Failed to scrape: {", ".join(failures)}')
 
 
 if __name__ == '__main__':
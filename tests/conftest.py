@@ -1,3 +1,5 @@
+import asyncio
+import threading
 from typing import Optional
 import pytest
 import os
@@ -66,3 +68,137 @@ def fake_job_object_dataframe(fake_job_info_list) -> pd.DataFrame:
         url=[j.url for j in fake_job_info_list],
         description=[j.description for j in fake_job_info_list],
     ))
+
+
+# fakes of the headless browsers and Selenium drivers that render pages (see `browser_pool`)
+class FakeProcess:
+    def __init__(self):
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+
+class FakeResponse:
+    def __init__(self, status: int = 200, headers: dict | None = None):
+        self.status = status
+        self.headers = headers or {}
+
+
+class FakePage:
+    def __init__(self, fail_urls: set | None = None, statuses: dict | None = None):
+        self.fail_urls = fail_urls or set()
+        # url -> the statuses of successive navigations to the url (200 once exhausted)
+        self.statuses = statuses if statuses is not None else {}
+        self.urls = []
+        self.closed = False
+        self.listeners = {}
+        # selectors that match an element on the page
+        self.selectors = {'html'}
+
+    def on(self, event, listener):
+        self.listeners.setdefault(event, []).append(listener)
+
+    def remove_listener(self, event, listener):
+        self.listeners[event].remove(listener)
+        if not self.listeners[event]:
+            del self.listeners[event]
+
+    def emit(self, event, request):
+        for listener in self.listeners.get(event, []):
+            listener(request)
+
+    async def setRequestInterception(self, value):  # noqa
+        self.request_interception = value
+
+    async def evaluate(self, script, selector):
+        return selector in self.selectors
+
+    async def goto(self, url, **kwargs):
+        if url in self.fail_urls:
+            raise RuntimeError(f'failed to load {url}')
+        await asyncio.sleep(0.01)
+        self.urls.append(url)
+        statuses = self.statuses.get(url)
+        return FakeResponse(statuses.pop(0) if statuses else 200)
+
+    async def content(self):
+        return f'<html>{self.urls[-1]}</html>'
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, fail_urls: set | None = None, statuses: dict | None = None):
+        self.fail_urls = fail_urls
+        self.statuses = statuses
+        self.process = FakeProcess()
+        self.pages = []
+        self.closed = False
+
+    async def newPage(self):  # noqa
+        page = FakePage(fail_urls=self.fail_urls, statuses=self.statuses)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeLauncher:
+    def __init__(self, fail_urls: set | None = None, statuses: dict | None = None):
+        self.fail_urls = fail_urls
+        # shared by the pages of all browsers (see `FakePage`)
+        self.statuses = statuses if statuses is not None else {}
+        self.browsers = []
+
+    async def __call__(self):
+        browser = FakeBrowser(fail_urls=self.fail_urls, statuses=self.statuses)
+        self.browsers.append(browser)
+        return browser
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+        self.crashed = False
+        self.urls = []
+        self.cdp_commands = []
+
+    @property
+    def current_url(self):
+        if self.crashed:
+            raise RuntimeError('driver crashed')
+        return self.urls[-1] if self.urls else 'data:,'
+
+    def get(self, url):
+        self.urls.append(url)
+
+    def find_elements(self, by, selector):
+        return ['element'] if selector == 'html' else []
+
+    def execute_script(self, script):
+        return len(self.urls)
+
+    def execute_cdp_cmd(self, command, args):
+        self.cdp_commands.append((command, args))
+
+    @property
+    def page_source(self):
+        return f'<html>{self.urls[-1]}</html>'
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeDriverFactory:
+    def __init__(self):
+        self.drivers = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        driver = FakeDriver()
+        with self._lock:
+            self.drivers.append(driver)
+        return driver
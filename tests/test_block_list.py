@@ -0,0 +1,29 @@
+from source.domain.block_list import DEFAULT_BLOCK_LIST, NO_BLOCKING, BlockList
+
+
+def test_block_list_blocks():
+    assert DEFAULT_BLOCK_LIST.blocks('https://cdn.example.com/logo.png', 'image')
+    assert DEFAULT_BLOCK_LIST.blocks('https://cdn.example.com/font.woff2', 'font')
+    assert not DEFAULT_BLOCK_LIST.blocks('https://cdn.example.com/app.js', 'script')
+    assert not DEFAULT_BLOCK_LIST.blocks('https://careers.chime.com/c/jobs', 'document')
+    # domains (and subdomains) are blocked regardless of resource type
+    assert DEFAULT_BLOCK_LIST.blocks('https://www.google-analytics.com/analytics.js', 'script')
+    assert DEFAULT_BLOCK_LIST.blocks('https://google-analytics.com/collect', 'xhr')
+    assert not DEFAULT_BLOCK_LIST.blocks('https://notgoogle-analytics.com/app.js', 'script')
+    assert not NO_BLOCKING.blocks('https://cdn.example.com/logo.png', 'image')
+    assert not NO_BLOCKING.blocks('https://www.google-analytics.com/analytics.js', 'script')
+
+    block_list = BlockList(resource_types=frozenset({'stylesheet'}), domains=frozenset())
+    assert block_list.blocks('https://cdn.example.com/style.css', 'stylesheet')
+    assert not block_list.blocks('https://cdn.example.com/logo.png', 'image')
+
+
+def test_block_list_url_patterns():
+    block_list = BlockList(resource_types=frozenset({'font'}), domains=frozenset({'hotjar.com'}))
+    patterns = block_list.url_patterns()
+    assert patterns[:2] == ['*://hotjar.com/*', '*://*.hotjar.com/*']
+    assert '*.woff' in patterns
+    assert '*.woff2' in patterns
+    assert '*.woff2?*' in patterns
+    assert '*.png' not in patterns
+    assert NO_BLOCKING.url_patterns() == []
@@ -0,0 +1,171 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+import pytest
+from pytest_httpserver import HTTPServer
+
+from source.domain.browser_pool import BrowserPool, DriverPool
+from source.domain.html_scraper import render
+from tests.conftest import FakeBrowser, FakeDriverFactory, FakeLauncher, FakePage, \
+    setup_mock_server
+
+
+def test_browser_pool_reuses_pages(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    urls = [
+        httpserver.url_for('/careers/analytics-engineer-amer-4486497004'),
+        httpserver.url_for('/careers/field-marketing-manager-west-us-4623565004'),
+        httpserver.url_for('/careers/instructional-designer-europe-uk-us-4651728004'),
+    ]
+    launcher = FakeLauncher()
+    with BrowserPool(size=1, pages_per_browser=2, launch=launcher) as pool:
+        htmls = render(urls * 2, browser_pool=pool, ready_selector='html')
+        assert htmls == [f'<html>{x}</html>' for x in urls * 2]
+        html = render(urls[0], browser_pool=pool, ready_selector='html')
+        assert html == f'<html>{urls[0]}</html>'
+        assert len(launcher.browsers) == 1
+        browser = launcher.browsers[0]
+        # at most `pages_per_browser` pages are open and pages are reset before they are reused
+        assert len(browser.pages) == 2
+        assert all(x.urls[-1] == 'about:blank' for x in browser.pages)
+        assert sum(len(x.urls) for x in browser.pages) == 2 * 7
+        assert not browser.closed
+    assert browser.closed
+
+
+def test_browser_pool_recycles_browsers(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers/analytics-engineer-amer-4486497004')
+    launcher = FakeLauncher()
+    with BrowserPool(size=1, max_pages_per_browser=2, launch=launcher) as pool:
+        for _ in range(5):
+            assert render(url, browser_pool=pool, ready_selector='html') == f'<html>{url}</html>'
+        assert len(launcher.browsers) == 3
+        assert [x.closed for x in launcher.browsers] == [True, True, False]
+        assert pool.browsers == [launcher.browsers[2]]
+
+
+def test_browser_pool_replaces_dead_browsers(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers/analytics-engineer-amer-4486497004')
+    launcher = FakeLauncher()
+    with BrowserPool(size=1, launch=launcher) as pool:
+        render(url, browser_pool=pool, ready_selector='html')
+        launcher.browsers[0].process.returncode = 1  # i.e. the browser crashed
+        assert render(url, browser_pool=pool, ready_selector='html') == f'<html>{url}</html>'
+        assert len(launcher.browsers) == 2
+        assert launcher.browsers[0].closed
+        assert pool.browsers == [launcher.browsers[1]]
+
+
+def test_browser_pool_closes_failed_pages(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers/analytics-engineer-amer-4486497004')
+    launcher = FakeLauncher(fail_urls={url})
+    with BrowserPool(size=1, launch=launcher) as pool:
+        with pytest.raises(RuntimeError):
+            render(url, browser_pool=pool)
+        with pytest.raises(RuntimeError):
+            render(url, browser_pool=pool)
+        pages = launcher.browsers[0].pages
+        # pages that failed aren't reused
+        assert len(pages) == 2
+        assert all(x.closed for x in pages)
+
+
+class SlowResetFakePage(FakePage):
+    async def goto(self, url, **kwargs):
+        if url == 'about:blank':
+            await asyncio.sleep(0.3)
+        await super().goto(url, **kwargs)
+
+
+def test_browser_pool_resets_pages_outside_lock():
+    async def launch():
+        browser = FakeBrowser()
+
+        async def new_page():
+            page = SlowResetFakePage()
+            browser.pages.append(page)
+            return page
+
+        browser.newPage = new_page
+        return browser
+
+    with BrowserPool(size=1, pages_per_browser=2, launch=launch) as pool:
+        async def use_page(delay):
+            await asyncio.sleep(delay)
+            async with pool.page():
+                return time.monotonic()
+
+        async def use_pages():
+            start = time.monotonic()
+            checked_out = await asyncio.gather(use_page(0), use_page(0.1))
+            return [x - start for x in checked_out]
+
+        # the second page is checked out while the first page is being reset
+        _, second = pool.run(use_pages())
+        assert second < 0.25
+        assert all(x.urls[-1] == 'about:blank' for x in pool.browsers[0].pages)
+
+
+def test_driver_pool_reuses_and_recycles_drivers(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers')
+    factory = FakeDriverFactory()
+    with DriverPool(size=1, max_pages_per_driver=2, create_driver=factory) as pool:
+        for _ in range(3):
+            html = render(url, use_selenium=True, driver_pool=pool, ready_selector='html')
+            assert html == f'<html>{url}</html>'
+        assert len(factory.drivers) == 2
+        assert factory.drivers[0].urls == [url, url]
+        assert factory.drivers[0].quit_called
+        assert not factory.drivers[1].quit_called
+    assert factory.drivers[1].quit_called
+
+
+def test_driver_pool_replaces_unhealthy_drivers():
+    factory = FakeDriverFactory()
+    pool = DriverPool(size=1, create_driver=factory)
+    with pool.driver() as driver:
+        pass
+    driver.crashed = True
+    with pool.driver() as new_driver:
+        assert new_driver is not driver
+    assert driver.quit_called
+    with pytest.raises(ValueError):
+        with pool.driver() as failed_driver:
+            raise ValueError()
+    # drivers that raised aren't reused
+    assert failed_driver.quit_called
+    with pool.driver() as driver:
+        assert driver is not failed_driver
+    pool.close()
+    assert all(x.quit_called for x in factory.drivers)
+    with pytest.raises(RuntimeError):
+        with pool.driver():
+            pass
+
+
+def test_driver_pool_limits_drivers():
+    factory = FakeDriverFactory()
+    pool = DriverPool(size=2, create_driver=factory)
+    in_use = []
+    max_in_use = []
+    lock = threading.Lock()
+
+    def use_driver(_):
+        with pool.driver():
+            with lock:
+                in_use.append(1)
+                max_in_use.append(len(in_use))
+            time.sleep(0.02)
+            with lock:
+                in_use.pop()
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(use_driver, range(12)))
+    pool.close()
+    assert max(max_in_use) <= 2
+    assert len(factory.drivers) <= 2
@@ -1,4 +1,6 @@
 import os
+import threading
+import pytest
 from time import sleep
 import pandas as pd
 from helpsk.database import Sqlite
@@ -7,9 +9,13 @@ from helpsk.validation import dataframes_match
 
 from tests.conftest import create_fake_job_info_list
 
-from source.entities.job_info import JobInfo, from_dataframe, to_dataframe
-from source.service.database import save_job_infos, load_job_infos, \
-    datetime_now_utc
+from source.entities.job_change import CHANGED, NEW, REMOVED, JobChange
+from source.entities.job_info import JobInfo, to_dataframe
+from source.service import database
+from source.service.database import SCHEMA_VERSION, hash_description, migrate, save_job_infos, \
+    load_job_description, load_job_infos, load_job_descriptions, search_job_infos, \
+    query_job_infos, count_job_infos, load_companies, load_latest_snapshot, PooledSqlite, \
+    load_job_changes, count_job_changes, datetime_now_utc
 
 
 def test_save_load_job_infos(
@@ -38,17 +44,19 @@ def test_save_load_job_infos(
         found_jobs = load_job_infos(db, latest_snapshots=False)
         assert all(a == e for a, e in zip(found_jobs, fake_job_info_list))
 
-        # Load all records from database, which contains snapshot column.
+        # Load all records from database, which contain the snapshots each job was seen in.
         with db:
             found_records = db.query('SELECT * FROM JOBS')
 
-        assert (found_records['snapshot'] == first_snapshot).all()
+        assert (found_records['first_seen'] == first_snapshot).all()
+        assert (found_records['last_seen'] == first_snapshot).all()
+        # descriptions are stored in the DESCRIPTIONS table and referenced by their hash
+        assert found_records['description_hash'].tolist() == \
+            [hash_description(j.description) for j in fake_job_info_list]
         assert dataframes_match(dataframes=[
-            found_records.drop(columns='snapshot'),
-            fake_job_object_dataframe
+            found_records.drop(columns=['first_seen', 'last_seen', 'description_hash']),
+            fake_job_object_dataframe.drop(columns='description'),
         ])
-        found_jobs = from_dataframe(df=found_records)
-        assert all(a == e for a, e in zip(found_jobs, fake_job_info_list))
 
         # insert new set of JobInfo objects
         second_fake_list = create_fake_job_info_list(length=5)
@@ -73,15 +81,450 @@ def test_save_load_job_infos(
         # create expected dataframe
         expected_df = pd.concat([fake_job_object_dataframe, to_dataframe(second_fake_list)]).\
             reset_index(drop=True)
-        expected_df['snapshot'] = [first_snapshot] * len(fake_job_object_dataframe) + \
+        expected_snapshots = [first_snapshot] * len(fake_job_object_dataframe) + \
             [second_snapshot] * len(second_fake_list)
-        expected_df = relocate(df=expected_df, column='snapshot', before='company')
 
-        assert set(found_records['snapshot'].unique()) == set([first_snapshot, second_snapshot])
-        assert dataframes_match(dataframes=[found_records, expected_df])
-        found_jobs = from_dataframe(df=found_records)
+        assert found_records['first_seen'].tolist() == expected_snapshots
+        assert found_records['last_seen'].tolist() == expected_snapshots
+        assert dataframes_match(dataframes=[
+            found_records.drop(columns=['first_seen', 'last_seen', 'description_hash']),
+            expected_df.drop(columns='description'),
+        ])
+        found_jobs = load_job_infos(db, latest_snapshots=False)
         assert all(a == e for a, e in zip(found_jobs[:3], fake_job_info_list))
         assert all(a == e for a, e in zip(found_jobs[3:], second_fake_list))
 
     finally:
         os.remove(db_path)
+
+
+def test_load_job_descriptions():
+    db_path = 'tests/test.db'
+    try:
+        db = Sqlite(path=db_path)
+        assert load_job_descriptions(db, company='a') == {}
+
+        first_jobs = create_fake_job_info_list(length=3)
+        for job in first_jobs:
+            job.company = 'a'
+        save_job_infos(database=db, jobs=first_jobs, snapshot='2023-01-01 00:00:00')
+        assert load_job_descriptions(db, company='a') == \
+            {j.url: j.description for j in first_jobs}
+        assert load_job_descriptions(db, company='b') == {}
+
+        # the latest snapshot containing the company is used
+        second_jobs = create_fake_job_info_list(length=2)
+        for job in second_jobs:
+            job.company = 'a'
+        save_job_infos(database=db, jobs=second_jobs, snapshot='2023-01-02 00:00:00')
+        other_jobs = create_fake_job_info_list(length=2)
+        for job in other_jobs:
+            job.company = 'b'
+        save_job_infos(database=db, jobs=other_jobs, snapshot='2023-01-03 00:00:00')
+        assert load_job_descriptions(db, company='a') == \
+            {j.url: j.description for j in second_jobs}
+        assert load_job_descriptions(db, company='b') == \
+            {j.url: j.description for j in other_jobs}
+    finally:
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+
+def test_save_job_infos_single_transaction():
+    db_path = 'tests/test.db'
+    try:
+        db = Sqlite(path=db_path)
+        jobs = create_fake_job_info_list(length=5)
+        for job, company in zip(jobs, ['a', 'b', 'a', 'b', 'c']):
+            job.company = company
+
+        def failing_jobs():
+            yield from jobs[:3]
+            raise ValueError('failed')
+
+        # nothing is saved if the jobs fail part-way, even if some batches have been inserted
+        with pytest.raises(ValueError):
+            save_job_infos(database=db, jobs=failing_jobs(), snapshot='2023-01-01 00:00:00',
+                           batch_size=2)
+        assert load_job_infos(db) == []
+
+        # companies discarded while the jobs are generated are removed before committing
+        discard_companies = set()
+
+        def generate_jobs():
+            yield from jobs[:2]
+            discard_companies.add('b')
+            yield from jobs[2:]
+
+        count = save_job_infos(database=db, jobs=generate_jobs(),
+                               snapshot='2023-01-02 00:00:00', batch_size=2,
+                               discard_companies=discard_companies)
+        assert count == 3
+        assert load_job_infos(db) == [jobs[0], jobs[2], jobs[4]]
+        with db:
+            assert db.query('PRAGMA journal_mode')['journal_mode'][0] == 'wal'
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_migrate_legacy_database(monkeypatch):
+    db_path = 'tests/test.db'
+    try:
+        # databases created before migrations existed only contain the JOBS table (created by
+        # pandas)
+        db = Sqlite(path=db_path)
+        legacy_jobs = create_fake_job_info_list(length=3)
+        for snapshot, job in zip(['2023-01-01 00:00:00', '2023-01-02 00:00:00'] * 2, legacy_jobs):
+            df = to_dataframe([job])
+            df['snapshot'] = snapshot
+            with db:
+                db.insert_records(dataframe=relocate(df, column='snapshot', before='company'),
+                                  table='JOBS')
+
+        # the rows are moved in batches
+        monkeypatch.setattr(database, 'MIGRATION_BATCH_SIZE', 2)
+        assert load_job_infos(db) == [legacy_jobs[1]]
+        with db:
+            assert db.query('PRAGMA user_version')['user_version'][0] == SCHEMA_VERSION
+            # the pages freed by the migrations are reclaimed
+            assert db.query('PRAGMA freelist_count')['freelist_count'][0] == 0
+            snapshots = db.query('SELECT * FROM SNAPSHOTS ORDER BY snapshot')
+            indexes = set(db.query("SELECT name FROM sqlite_master WHERE type = 'index'")['name'])
+            jobs = db.query('SELECT * FROM JOBS')
+        assert snapshots['snapshot'].tolist() == ['2023-01-01 00:00:00', '2023-01-02 00:00:00']
+        assert snapshots['num_jobs'].tolist() == [2, 1]
+        assert {
+            'IX_JOBS_LAST_SEEN_COMPANY_TITLE',
+            'IX_JOBS_COMPANY_LAST_SEEN',
+            'IX_JOBS_URL_LAST_SEEN',
+        } <= indexes
+        assert 'description' not in jobs.columns
+        assert 'snapshot' not in jobs.columns
+        assert jobs['description_hash'].tolist() == \
+            [hash_description(x.description) for x in legacy_jobs]
+        assert load_job_infos(db, latest_snapshots=False) == \
+            [legacy_jobs[0], legacy_jobs[2], legacy_jobs[1]]
+        assert load_job_infos(db, snapshot='2023-01-01 00:00:00') == \
+            [legacy_jobs[0], legacy_jobs[2]]
+        assert search_job_infos(db, legacy_jobs[1].title) == \
+            [JobInfo(**{**vars(legacy_jobs[1]), 'description': None})]
+        assert count_job_changes(db) == {NEW: 1, REMOVED: 0, CHANGED: 0}
+
+        # migrating an up-to-date database does nothing
+        migrate(db)
+        new_jobs = create_fake_job_info_list(length=2)
+        save_job_infos(database=db, jobs=new_jobs, snapshot='2023-01-03 00:00:00')
+        assert load_job_infos(db) == new_jobs
+        with db:
+            snapshots = db.query('SELECT * FROM SNAPSHOTS ORDER BY snapshot')
+            # the latest snapshot is loaded via the index rather than by scanning JOBS
+            plan = db.query("""
+                EXPLAIN QUERY PLAN
+                SELECT * FROM JOBS
+                WHERE last_seen = (SELECT MAX(snapshot) FROM SNAPSHOTS)
+                ORDER BY rowid
+            """)
+        assert snapshots['num_jobs'].tolist() == [2, 1, 2]
+        assert not any(x.startswith('SCAN JOBS') for x in plan['detail'])
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_save_job_infos_stores_descriptions_once():
+    db_path = 'tests/test.db'
+    try:
+        db = Sqlite(path=db_path)
+        jobs = create_fake_job_info_list(length=3)
+        jobs[2].description = jobs[0].description
+        for snapshot in ['2023-01-01 00:00:00', '2023-01-02 00:00:00']:
+            save_job_infos(database=db, jobs=jobs, snapshot=snapshot)
+        with db:
+            descriptions = db.query('SELECT * FROM DESCRIPTIONS')
+        assert sorted(descriptions['hash']) == \
+            sorted({hash_description(x.description) for x in jobs})
+        assert load_job_infos(db) == jobs
+        assert load_job_infos(db, latest_snapshots=False) == jobs + jobs
+        with db:
+            # the jobs are stored once, with the interval of snapshots they were seen in
+            assert db.query('SELECT COUNT(*) AS n FROM JOBS')['n'][0] == len(jobs)
+        assert load_job_descriptions(db, company=jobs[0].company)[jobs[0].url] == \
+            jobs[0].description
+        assert load_job_description(db, url=jobs[1].url) == jobs[1].description
+        assert load_job_description(db, url='unknown') is None
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_load_job_infos_without_descriptions():
+    db_path = 'tests/test.db'
+    try:
+        db = Sqlite(path=db_path)
+        first_jobs = create_fake_job_info_list(length=2)
+        save_job_infos(database=db, jobs=first_jobs, snapshot='2023-01-01 00:00:00')
+        second_jobs = create_fake_job_info_list(length=3)
+        # the description of the job changed in the second snapshot
+        second_jobs[0].url = first_jobs[0].url
+        save_job_infos(database=db, jobs=second_jobs, snapshot='2023-01-02 00:00:00')
+
+        jobs = load_job_infos(db, include_descriptions=False)
+        assert all(x.description is None for x in jobs)
+        assert [(x.company, x.title, x.location, x.url) for x in jobs] == \
+            [(x.company, x.title, x.location, x.url) for x in second_jobs]
+        assert len(load_job_infos(db, latest_snapshots=False, include_descriptions=False)) == 5
+        # the description is loaded from the latest snapshot containing the job
+        assert load_job_description(db, url=first_jobs[0].url) == second_jobs[0].description
+        assert load_job_description(db, url=first_jobs[1].url) == first_jobs[1].description
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_search_job_infos():
+    db_path = 'tests/test.db'
+    try:
+        db = Sqlite(path=db_path)
+        first_jobs = [
+            JobInfo('Vercel', 'Data Scientist', 'Remote', 'url-1', '<p>SQL &amp; Python</p>'),
+            JobInfo('Chime', 'Analytics Engineer', 'US', 'url-2', '<p>Data pipelines</p>'),
+        ]
+        save_job_infos(database=db, jobs=first_jobs, snapshot='2023-01-01 00:00:00')
+        assert search_job_infos(db, 'python') == [
+            JobInfo('Vercel', 'Data Scientist', 'Remote', 'url-1', None),
+        ]
+        # matches in titles rank higher than matches in descriptions
+        assert [x.url for x in search_job_infos(db, 'data')] == ['url-1', 'url-2']
+        # all keywords must match (as prefixes)
+        assert [x.url for x in search_job_infos(db, 'analytics python')] == []
+        assert [x.url for x in search_job_infos(db, 'engineer analy')] == ['url-2']
+        # tags and entities aren't indexed, and keywords with FTS5 syntax are searched literally
+        assert search_job_infos(db, 'amp') == []
+        assert search_job_infos(db, 'full-stack "') == []
+        assert search_job_infos(db, 'title:analytics', raw_query=True)[0].url == 'url-2'
+        assert search_job_infos(db, 'data', limit=1, include_descriptions=True) == \
+            first_jobs[:1]
+
+        # only the jobs of the latest snapshot are searched
+        second_jobs = [
+            JobInfo('Chime', 'Senior Analytics Engineer', 'US', 'url-3', '<p>dbt</p>'),
+            JobInfo('Otter', 'Data Engineer', 'Remote', 'url-4', None),
+        ]
+        discard_companies = ['Otter']
+        save_job_infos(database=db, jobs=second_jobs, snapshot='2023-01-02 00:00:00',
+                       discard_companies=discard_companies)
+        assert [x.url for x in search_job_infos(db, 'engineer')] == ['url-3']
+        # saving an older snapshot doesn't change the index
+        save_job_infos(database=db, jobs=first_jobs, snapshot='2022-12-31 00:00:00')
+        assert [x.url for x in search_job_infos(db, 'engineer')] == ['url-3']
+        with db:
+            assert db.query('SELECT COUNT(*) AS n FROM JOB_SEARCH')['n'][0] == 1
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_query_job_infos():
+    db_path = 'tests/test.db'
+    try:
+        db = Sqlite(path=db_path)
+        save_job_infos(
+            database=db,
+            jobs=[JobInfo('Old', 'Data Scientist', 'Remote', 'url-0', '<p>old</p>')],
+            snapshot='2023-01-01 00:00:00',
+        )
+        jobs = [
+            JobInfo('Vercel', 'Data Scientist', 'Remote', 'url-1', '<p>Python</p>'),
+            JobInfo('Chime', 'Senior Data Scientist', 'San Francisco', 'url-2', '<p>SQL</p>'),
+            JobInfo('Chime', 'Analytics Engineer', 'Remote (US)', 'url-3', '<p>Python</p>'),
+            JobInfo('Anaconda', '100% Remote Engineer', 'Remote', 'url-4', '<p>Conda</p>'),
+        ]
+        save_job_infos(database=db, jobs=jobs, snapshot='2023-01-02 00:00:00')
+
+        def urls(**kwargs):
+            return [x.url for x in query_job_infos(db, **kwargs)]
+
+        assert load_companies(db) == ['Anaconda', 'Chime', 'Vercel']
+        # jobs of the latest snapshot are ordered by company and title
+        assert urls() == ['url-4', 'url-3', 'url-2', 'url-1']
+        assert count_job_infos(db) == 4
+        assert urls(companies=['Chime', 'Vercel']) == ['url-3', 'url-2', 'url-1']
+        assert urls(title='data scientist') == ['url-2', 'url-1']
+        assert urls(title='100%') == ['url-4']
+        assert urls(title='%') == ['url-4']
+        assert urls(location='remote', companies=['Chime']) == ['url-3']
+        assert count_job_infos(db, location='remote', companies=['Chime']) == 1
+        assert sorted(urls(search='python')) == ['url-1', 'url-3']
+        assert urls(search='python', title='engineer') == ['url-3']
+        assert count_job_infos(db, search='python') == 2
+        assert urls(search='  ') == urls()
+        # pagination
+        assert urls(limit=3) == ['url-4', 'url-3', 'url-2']
+        assert urls(limit=3, offset=3) == ['url-1']
+        assert urls(limit=3, offset=6) == []
+        assert query_job_infos(db, title='analytics')[0].description is None
+        assert query_job_infos(db, title='analytics', include_descriptions=True) == [jobs[2]]
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_pooled_sqlite_snapshots():
+    db_path = 'tests/test.db'
+    db = PooledSqlite(path=db_path)
+    try:
+        assert load_latest_snapshot(db) is None
+        first_jobs = create_fake_job_info_list(length=2)
+        save_job_infos(database=db, jobs=first_jobs, snapshot='2023-01-01 00:00:00')
+        second_jobs = create_fake_job_info_list(length=3)
+        save_job_infos(database=db, jobs=second_jobs, snapshot='2023-01-02 00:00:00')
+        assert load_latest_snapshot(db) == '2023-01-02 00:00:00'
+        # queries can be pinned to a snapshot (e.g. the snapshot results were cached for)
+        assert count_job_infos(db, snapshot='2023-01-01 00:00:00') == 2
+        assert sorted(x.url for x in query_job_infos(db, snapshot='2023-01-01 00:00:00')) == \
+            sorted(x.url for x in first_jobs)
+        assert load_companies(db, snapshot='2023-01-01 00:00:00') == \
+            sorted({x.company for x in first_jobs})
+        assert count_job_infos(db) == 3
+
+        # each thread uses its own connection from the shared pool
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(load_job_infos(db)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [second_jobs] * 4
+        assert not db.is_connected()
+    finally:
+        db.dispose()
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_job_changes():
+    db_path = 'tests/test.db'
+    try:
+        db = Sqlite(path=db_path)
+        first_jobs = [
+            JobInfo('A', 'Data Scientist', 'Remote', 'a-1', 'a-1 v1'),
+            JobInfo('A', 'Data Engineer', 'Remote', 'a-2', 'a-2 v1'),
+            JobInfo('B', 'Analyst', 'Remote', 'b-1', 'b-1 v1'),
+        ]
+        save_job_infos(database=db, jobs=first_jobs, snapshot='2023-01-01 00:00:00')
+        # every job is new in the first snapshot
+        assert count_job_changes(db) == {NEW: 3, REMOVED: 0, CHANGED: 0}
+
+        second_jobs = [
+            JobInfo('A', 'Data Scientist', 'Remote', 'a-1', 'a-1 v2'),
+            JobInfo('A', 'ML Engineer', 'Remote', 'a-3', 'a-3 v1'),
+        ]
+        # B failed to scrape, so its jobs aren't in the second snapshot
+        save_job_infos(database=db, jobs=second_jobs, snapshot='2023-01-02 00:00:00')
+        assert count_job_changes(db) == {NEW: 1, REMOVED: 1, CHANGED: 1}
+        assert load_job_changes(db) == [
+            JobChange('2023-01-02 00:00:00', '2023-01-01 00:00:00', REMOVED, 'A',
+                      'Data Engineer', 'Remote', 'a-2'),
+            JobChange('2023-01-02 00:00:00', '2023-01-01 00:00:00', CHANGED, 'A',
+                      'Data Scientist', 'Remote', 'a-1'),
+            JobChange('2023-01-02 00:00:00', '2023-01-01 00:00:00', NEW, 'A',
+                      'ML Engineer', 'Remote', 'a-3'),
+        ]
+        assert [x.url for x in load_job_changes(db, change_types=[NEW, CHANGED])] == \
+            ['a-1', 'a-3']
+        assert load_job_changes(db, companies=['B']) == []
+        assert len(load_job_changes(db, snapshot='2023-01-01 00:00:00')) == 3
+        assert [x.url for x in query_job_infos(db, change_types=[NEW])] == ['a-3']
+        assert count_job_infos(db, change_types=[NEW, CHANGED]) == 2
+
+        # B is compared to the latest snapshot containing B
+        third_jobs = [JobInfo('B', 'Analyst', 'Remote', 'b-1', 'b-1 v1')]
+        save_job_infos(database=db, jobs=third_jobs, snapshot='2023-01-03 00:00:00')
+        assert count_job_changes(db) == {NEW: 0, REMOVED: 0, CHANGED: 0}
+
+        # the changes of existing snapshots are computed when the database is migrated
+        with db:
+            db.execute_statement('DELETE FROM JOB_CHANGES')
+            db.execute_statement('PRAGMA user_version = 6')
+        assert count_job_changes(db, snapshot='2023-01-02 00:00:00') == \
+            {NEW: 1, REMOVED: 1, CHANGED: 1}
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_save_job_infos_stores_intervals():
+    db_path = 'tests/test.db'
+    try:
+        db = Sqlite(path=db_path)
+        a_1 = JobInfo('A', 'Data Scientist', 'Remote', 'a-1', 'a-1 v1')
+        a_1_changed = JobInfo('A', 'Data Scientist', 'Remote', 'a-1', 'a-1 v2')
+        a_2 = JobInfo('A', 'Data Engineer', 'Remote', 'a-2', 'a-2 v1')
+        b_1 = JobInfo('B', 'Analyst', 'Remote', 'b-1', 'b-1 v1')
+        snapshots = {
+            '2023-01-01 00:00:00': [a_1, a_2, b_1],
+            # a-2 is removed
+            '2023-01-02 00:00:00': [a_1, b_1],
+            # a-2 is posted again
+            '2023-01-03 00:00:00': [a_1, a_2, b_1],
+            # a-1's description changed
+            '2023-01-04 00:00:00': [a_1_changed, a_2, b_1],
+        }
+        for snapshot, jobs in snapshots.items():
+            save_job_infos(database=db, jobs=jobs, snapshot=snapshot)
+
+        def intervals():
+            with db:
+                rows = db.query('SELECT url, first_seen, last_seen FROM JOBS ORDER BY rowid')
+            return [tuple(x) for x in rows.itertuples(index=False)]
+
+        # each job is stored once per run of consecutive snapshots containing it
+        assert intervals() == [
+            ('a-1', '2023-01-01 00:00:00', '2023-01-03 00:00:00'),
+            ('a-2', '2023-01-01 00:00:00', '2023-01-01 00:00:00'),
+            ('b-1', '2023-01-01 00:00:00', '2023-01-04 00:00:00'),
+            ('a-2', '2023-01-03 00:00:00', '2023-01-04 00:00:00'),
+            ('a-1', '2023-01-04 00:00:00', '2023-01-04 00:00:00'),
+        ]
+        for snapshot, jobs in snapshots.items():
+            assert sorted(load_job_infos(db, snapshot=snapshot), key=lambda x: x.url) == jobs
+            assert count_job_infos(db, snapshot=snapshot) == len(jobs)
+        # jobs are loaded in the order they were first stored
+        assert load_job_infos(db) == [b_1, a_2, a_1_changed]
+        assert len(load_job_infos(db, latest_snapshots=False)) == 11
+        assert count_job_changes(db, snapshot='2023-01-03 00:00:00') == \
+            {NEW: 1, REMOVED: 0, CHANGED: 0}
+        assert count_job_changes(db) == {NEW: 0, REMOVED: 0, CHANGED: 1}
+
+        # saving an older snapshot splits the intervals of the jobs that aren't in it
+        save_job_infos(database=db, jobs=[a_1, a_2], snapshot='2023-01-01 12:00:00')
+        assert sorted(load_job_infos(db, snapshot='2023-01-01 12:00:00'), key=lambda x: x.url) \
+            == [a_1, a_2]
+        for snapshot, jobs in snapshots.items():
+            assert sorted(load_job_infos(db, snapshot=snapshot), key=lambda x: x.url) == jobs
+
+        # discarded companies are removed from the snapshot (i.e. their intervals aren't extended)
+        save_job_infos(database=db, jobs=[a_1_changed, a_2, b_1],
+                       snapshot='2023-01-05 00:00:00', discard_companies=['A'])
+        assert load_job_infos(db) == [b_1]
+        assert load_job_infos(db, snapshot='2023-01-04 00:00:00') == [b_1, a_2, a_1_changed]
+        assert load_job_descriptions(db, company='A') == \
+            {'a-1': a_1_changed.description, 'a-2': a_2.description}
+        assert [x.url for x in search_job_infos(db, 'data')] == []
+        assert [x.url for x in search_job_infos(db, 'analyst')] == ['b-1']
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,155 @@
+import os
+import threading
+import pytest
+from helpsk.database import Sqlite
+
+from tests.conftest import create_fake_job_info_list
+from source.service.database import PooledSqlite, load_job_infos
+from source.service.etl import iter_scrape_all, run
+
+
+class FakeJobScraper:
+    """Mimics the interface of JobScraperBase used by the ETL."""
+    def __init__(self, company: str, num_jobs: int = 2, barrier: threading.Barrier = None,
+                 fail: bool = False, fail_after: int | None = None) -> None:
+        self.company = company
+        self.jobs = create_fake_job_info_list(num_jobs)
+        for job in self.jobs:
+            job.company = company
+        self._barrier = barrier
+        self._fail = fail
+        # the number of jobs yielded by `iter_jobs` before failing
+        self._fail_after = fail_after
+        self.known_descriptions = None
+
+    def scrape(self, known_descriptions=None):
+        self.known_descriptions = known_descriptions
+        if self._barrier:
+            # each scraper waits on the others, which only succeeds if they run concurrently
+            self._barrier.wait(timeout=5)
+        if self._fail:
+            raise ValueError(f'{self.company} failed')
+        return self.jobs
+
+    def iter_jobs(self, known_descriptions=None):
+        if self._fail_after is None:
+            yield from self.scrape(known_descriptions=known_descriptions)
+            return
+        self.known_descriptions = known_descriptions
+        if self._barrier:
+            self._barrier.wait(timeout=5)
+        yield from self.jobs[:self._fail_after]
+        raise ValueError(f'{self.company} failed')
+
+
+def test_iter_scrape_all():
+    barrier = threading.Barrier(3)
+    scrapers = [
+        FakeJobScraper(company='a', num_jobs=2, barrier=barrier),
+        FakeJobScraper(company='b', num_jobs=3, barrier=barrier, fail_after=1),
+        FakeJobScraper(company='c', num_jobs=3, barrier=barrier),
+    ]
+    events = list(iter_scrape_all(scrapers=scrapers, max_workers=3))
+    jobs = {}
+    failures = {}
+    for company, result in events:
+        if isinstance(result, Exception):
+            failures[company] = result
+        else:
+            # no jobs are yielded after the company fails
+            assert company not in failures
+            jobs.setdefault(company, []).append(result)
+    assert jobs == {'a': scrapers[0].jobs, 'b': scrapers[1].jobs[:1], 'c': scrapers[2].jobs}
+    assert list(failures.keys()) == ['b']
+
+
+def test_iter_scrape_all_loads_known_descriptions_lazily():
+    scrapers = [FakeJobScraper(company='a'), FakeJobScraper(company='b')]
+    loaded = []
+
+    def load_known_descriptions(company):
+        loaded.append((company, [x.known_descriptions for x in scrapers]))
+        return {f'{company}-url': 'description'}
+
+    events = iter_scrape_all(
+        scrapers=scrapers,
+        max_workers=1,
+        load_known_descriptions=load_known_descriptions,
+    )
+    assert len(list(events)) == 4
+    # each company's descriptions are loaded when the company starts being scraped
+    assert loaded == [('a', [None, None]), ('b', [{'a-url': 'description'}, None])]
+    assert scrapers[1].known_descriptions == {'b-url': 'description'}
+
+
+def test_run():
+    db_path = 'tests/test_etl.db'
+    try:
+        db = PooledSqlite(path=db_path)
+        scrapers = [
+            FakeJobScraper(company='a', num_jobs=2),
+            FakeJobScraper(company='b', fail=True),
+            FakeJobScraper(company='c', num_jobs=3),
+        ]
+        failures = run(database=db, scrapers=scrapers, max_workers=2)
+        assert list(failures.keys()) == ['b']
+
+        # jobs are saved in the order they are scraped, which is interleaved across companies
+        jobs = load_job_infos(db)
+        assert sorted(jobs, key=lambda j: j.url) == \
+            sorted(scrapers[0].jobs + scrapers[2].jobs, key=lambda j: j.url)
+        with db:
+            snapshots = db.query('SELECT snapshot FROM SNAPSHOTS')
+        assert len(snapshots) == 1
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_run_removes_partially_scraped_companies():
+    db_path = 'tests/test_etl.db'
+    try:
+        db = PooledSqlite(path=db_path)
+        scrapers = [
+            FakeJobScraper(company='a', num_jobs=3),
+            FakeJobScraper(company='b', num_jobs=3, fail_after=2),
+        ]
+        # a batch size of 1 ensures b's jobs are saved before b fails
+        failures = run(database=db, scrapers=scrapers, max_workers=1, batch_size=1)
+        assert list(failures.keys()) == ['b']
+        assert load_job_infos(db) == scrapers[0].jobs
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_run_incremental():
+    db_path = 'tests/test_etl.db'
+    try:
+        db = PooledSqlite(path=db_path)
+        scraper = FakeJobScraper(company="O'Reilly", num_jobs=2)
+        run(database=db, scrapers=[scraper])
+        # nothing has been saved before the first run
+        assert scraper.known_descriptions == {}
+
+        run(database=db, scrapers=[scraper])
+        assert scraper.known_descriptions == {j.url: j.description for j in scraper.jobs}
+
+        run(database=db, scrapers=[scraper], incremental=False)
+        assert scraper.known_descriptions is None
+
+        # b's descriptions are loaded (by b's thread) while O'Reilly's jobs are being saved
+        other = FakeJobScraper(company='b', num_jobs=2)
+        run(database=db, scrapers=[other])
+        run(database=db, scrapers=[scraper, other], max_workers=1, batch_size=1)
+        assert other.known_descriptions == {j.url: j.description for j in other.jobs}
+        # the descriptions are loaded by the scrapers' threads, which need their own connections
+        with pytest.raises(ValueError):
+            run(database=Sqlite(path=db_path), scrapers=[scraper])
+        run(database=Sqlite(path=db_path), scrapers=[scraper], incremental=False)
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
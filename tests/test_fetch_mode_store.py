@@ -0,0 +1,30 @@
+import os
+import pytest
+
+from source.domain.fetch_mode_store import JAVASCRIPT, STATIC, FetchModeStore
+
+
+def test_fetch_mode_store(tmp_path):
+    path = os.path.join(tmp_path, 'fetch_modes.db')
+    with FetchModeStore(path=path) as store:
+        assert store.get('careers.chime.com:job_objects') is None
+        store.set('careers.chime.com:job_objects', JAVASCRIPT)
+        store.set('vercel.com:job_objects', STATIC)
+        assert store.get('careers.chime.com:job_objects') == JAVASCRIPT
+        assert store.get('vercel.com:job_objects') == STATIC
+        store.set('vercel.com:job_objects', JAVASCRIPT)
+        assert store.get('vercel.com:job_objects') == JAVASCRIPT
+        with pytest.raises(ValueError):
+            store.set('vercel.com:job_objects', 'selenium')
+    # decisions are persisted across runs
+    with FetchModeStore(path=path) as store:
+        assert store.get('careers.chime.com:job_objects') == JAVASCRIPT
+        store.clear()
+        assert store.get('careers.chime.com:job_objects') is None
+
+
+def test_fetch_mode_store_ttl(tmp_path):
+    with FetchModeStore(path=os.path.join(tmp_path, 'fetch_modes.db'), ttl=0) as store:
+        store.set('careers.chime.com:job_objects', JAVASCRIPT)
+        # expired decisions are detected again
+        assert store.get('careers.chime.com:job_objects') is None
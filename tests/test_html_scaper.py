@@ -1,8 +1,21 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import gc
+import time
+import weakref
 import pytest
 from http.server import HTTPServer
 from bs4 import BeautifulSoup
-from tests.conftest import setup_mock_server
-from source.domain.html_scraper import RequestException, get, render
+from tests.conftest import FakeBrowser, FakeDriver, FakeDriverFactory, FakeLauncher, FakePage, \
+    setup_mock_server
+from source.domain import html_scraper
+from source.domain.block_list import BlockList
+from source.domain.browser_pool import BrowserPool, DriverPool
+from source.domain.html_scraper import NETWORK_IDLE_TIME, BatchResult, RequestException, get, \
+    iter_get, render
+from source.domain.http_cache import HttpCache
+from source.domain.rate_limiter import RateLimiter
+from source.domain.retry import NO_RETRY, RetryPolicy
 
 
 def test_get_type_not_supported():
@@ -84,6 +97,118 @@ def test_get_multiple_urls(httpserver: HTTPServer):
     assert soup.select('title')[0].text == 'Instructional Designer, Europe – Vercel'
 
 
+def test_get_retry_after(httpserver: HTTPServer):
+    httpserver.expect_oneshot_request('/careers').respond_with_data(
+        '', status=429, headers={'Retry-After': '1'}
+    )
+    httpserver.expect_request('/careers').respond_with_data('careers')
+    rate_limiter = RateLimiter(requests_per_second=100)
+    start = time.monotonic()
+    assert get(httpserver.url_for('/careers'), rate_limiter=rate_limiter) == 'careers'
+    assert time.monotonic() - start >= 0.99
+
+
+def test_get_retry_backoff_does_not_block_host(httpserver: HTTPServer):
+    httpserver.expect_oneshot_request('/flaky').respond_with_data('', status=503)
+    httpserver.expect_request('/flaky').respond_with_data('flaky')
+    httpserver.expect_request('/careers').respond_with_data('careers')
+    rate_limiter = RateLimiter(requests_per_second=100, burst=10)
+    retry_policy = RetryPolicy(backoff_base=1, jitter=False)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        flaky = executor.submit(get, httpserver.url_for('/flaky'), rate_limiter=rate_limiter,
+                                retry_policy=retry_policy)
+        # wait until the flaky request is waiting to be retried
+        while len(httpserver.log) == 0:
+            time.sleep(0.01)
+        start = time.monotonic()
+        # only the request being retried waits for the backoff; other requests to the host don't
+        assert get(httpserver.url_for('/careers'), rate_limiter=rate_limiter) == 'careers'
+        assert time.monotonic() - start < 0.5
+        assert flaky.result() == 'flaky'
+
+
+def test_get_retry_policy(httpserver: HTTPServer):
+    httpserver.expect_oneshot_request('/careers').respond_with_data('', status=503)
+    httpserver.expect_request('/careers').respond_with_data('careers')
+    assert get(httpserver.url_for('/careers')) == 'careers'
+
+    httpserver.expect_oneshot_request('/careers').respond_with_data('', status=503)
+    with pytest.raises(RequestException):
+        get(httpserver.url_for('/careers'), retry_policy=NO_RETRY)
+
+    # 404 is not retried
+    httpserver.expect_oneshot_request('/careers').respond_with_data('', status=404)
+    with pytest.raises(RequestException):
+        get(httpserver.url_for('/careers'))
+    assert get(httpserver.url_for('/careers')) == 'careers'
+
+
+def test_get_multiple_urls_partial(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    urls = [
+        httpserver.url_for('/careers/analytics-engineer-amer-4486497004'),
+        httpserver.url_for('/invalid'),
+        httpserver.url_for('/careers/field-marketing-manager-west-us-4623565004'),
+    ]
+    result = get(urls, retry_policy=NO_RETRY, partial=True)
+    assert isinstance(result, BatchResult)
+    assert list(result.successes) == [urls[0], urls[2]]
+    assert 'Analytics Engineer' in result.successes[urls[0]]
+    assert 'Field Marketing Manager, West' in result.successes[urls[2]]
+    assert list(result.failures) == [urls[1]]
+    assert isinstance(result.failures[urls[1]], RequestException)
+
+
+def test_get_multiple_urls_max_concurrency(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    urls = [
+        '/careers/analytics-engineer-amer-4486497004',
+        '/careers/field-marketing-manager-west-us-4623565004',
+        '/careers/instructional-designer-europe-uk-us-4651728004',
+    ]
+    urls = [httpserver.url_for(url) for url in urls]
+    rate_limiter = RateLimiter(requests_per_second=20)
+    start = time.monotonic()
+    htmls = get(urls, max_concurrency=1, rate_limiter=rate_limiter)
+    assert time.monotonic() - start >= 2 / 20 - 0.01
+    assert 'Analytics Engineer' in htmls[0]
+    assert 'Field Marketing Manager, West' in htmls[1]
+    assert 'Instructional Designer, Europe' in htmls[2]
+
+
+def test_iter_get(httpserver: HTTPServer):
+    httpserver.expect_request('/a').respond_with_data('a')
+    httpserver.expect_request('/b').respond_with_data('b')
+    httpserver.expect_request('/invalid').respond_with_data('', status=404)
+    urls = [httpserver.url_for(x) for x in ('/a', '/b', '/invalid')]
+    # (url, html) tuples are yielded as requests complete; failures are yielded as exceptions
+    results = list(iter_get(urls, retry_policy=NO_RETRY))
+    assert sorted(url for url, _ in results) == sorted(urls)
+    results = dict(results)
+    assert results[urls[0]] == 'a'
+    assert results[urls[1]] == 'b'
+    assert isinstance(results[urls[2]], RequestException)
+
+
+def test_iter_completed_releases_consumed_futures():
+    futures = {}
+    for url in ('a', 'b', 'c'):
+        future = Future()
+        future.set_result(f'<html>{url}</html>')
+        futures[future] = url
+    references = [weakref.ref(future) for future in futures]
+    del future
+    results = html_scraper._iter_completed(futures)
+    url, html = next(results)
+    assert html == f'<html>{url}</html>'
+    # the consumed future (and its html) is no longer referenced by the iterator
+    assert len(futures) == 2
+    gc.collect()
+    assert sum(reference() is None for reference in references) == 1
+    assert sorted([url] + [url for url, _ in results]) == ['a', 'b', 'c']
+    assert not futures
+
+
 def test_render_single_url(httpserver: HTTPServer):
     setup_mock_server(httpserver)
     url = httpserver.url_for('/careers/analytics-engineer-amer-4486497004')
@@ -107,3 +232,336 @@ def test_render_multiple_urls(httpserver: HTTPServer):
     assert 'Field Marketing Manager, West – Vercel' in htmls[1]
     assert 'Senior Manager, Customer Success Management – Vercel' in htmls[2]
     assert 'Instructional Designer, Europe – Vercel' in htmls[3]
+
+
+def test_render_status_from_navigation():
+    url = 'http://fake.com/careers'
+    invalid = 'http://fake.com/invalid'
+    launcher = FakeLauncher(statuses={url: [503], invalid: [404]})
+    retry_policy = RetryPolicy(backoff_base=0.01, jitter=False)
+    rate_limiter = RateLimiter(requests_per_second=1000)
+    acquired = []
+    acquire = rate_limiter.acquire
+
+    async def recording_acquire(url):
+        acquired.append(url)
+        await acquire(url)
+
+    rate_limiter.acquire = recording_acquire
+    with BrowserPool(size=1, launch=launcher) as pool:
+        # the page is only downloaded by the browser; failed navigations are retried
+        html = render(url, browser_pool=pool, retry_policy=retry_policy,
+                      rate_limiter=rate_limiter, ready_selector='html')
+        assert html == f'<html>{url}</html>'
+        assert acquired == [url, url]
+        # the status of the navigation's response is checked (the browser doesn't raise on 404s)
+        with pytest.raises(RequestException, match='status-code: 404'):
+            render(invalid, browser_pool=pool, retry_policy=retry_policy,
+                   ready_selector='html')
+    # (pages are reset to `about:blank` when returned to the pool)
+    urls = [x for x in launcher.browsers[0].pages[0].urls if x != 'about:blank']
+    assert urls == [url, url, invalid]
+
+
+class SlowFakeDriver(FakeDriver):
+    def __init__(self, fail_urls: set):
+        super().__init__()
+        self.fail_urls = fail_urls
+
+    def get(self, url):
+        time.sleep(0.1)
+        if url in self.fail_urls:
+            raise RuntimeError(f'failed to load {url}')
+        super().get(url)
+
+
+def test_render_multiple_urls_selenium_concurrently(httpserver: HTTPServer):
+    httpserver.expect_request('/job', query_string=None).respond_with_data('<html></html>')
+    urls = [httpserver.url_for(f'/job?id={x}') for x in range(8)]
+    pool = DriverPool(size=4, create_driver=lambda: SlowFakeDriver(fail_urls={urls[3]}))
+    start = time.monotonic()
+    with pool:
+        result = render(
+            urls,
+            use_selenium=True,
+            driver_pool=pool,
+            partial=True,
+            ready_selector='html',
+        )
+    # 8 urls rendered by 4 drivers at the same time take ~2 * 0.1 seconds (rather than 8 * 0.1)
+    assert time.monotonic() - start < 0.6
+    assert list(result.successes) == [x for x in urls if x != urls[3]]
+    assert all(html == f'<html>{url}</html>' for url, html in result.successes.items())
+    assert list(result.failures) == [urls[3]]
+    with DriverPool(size=4, create_driver=lambda: SlowFakeDriver(fail_urls={urls[3]})) as pool:
+        with pytest.raises(RuntimeError):
+            render(urls, use_selenium=True, driver_pool=pool, ready_selector='html')
+
+
+class DynamicFakePage(FakePage):
+    """
+    A page that sends requests that take `network_time` seconds to complete (or never complete if
+    None) and renders the `.jobs` element after `render_time` seconds (or never if None).
+    """
+    def __init__(self, network_time: float | None, render_time: float | None):
+        super().__init__()
+        self.network_time = network_time
+        self.render_time = render_time
+
+    async def goto(self, url, **kwargs):
+        await super().goto(url, **kwargs)
+        if url == 'about:blank':
+            return
+        requests = [object() for _ in range(3)]
+        for request in requests:
+            self.emit('request', request)
+
+        async def finish_requests():
+            await asyncio.sleep(self.network_time)
+            for request in requests:
+                self.emit('requestfinished', request)
+
+        async def render_jobs():
+            await asyncio.sleep(self.render_time)
+            self.selectors.add('.jobs')
+
+        if self.network_time is not None:
+            asyncio.ensure_future(finish_requests())
+        if self.render_time is not None:
+            asyncio.ensure_future(render_jobs())
+
+
+class SequentialRequestsFakePage(FakePage):
+    """
+    A page that sends `num_requests` requests one after the other (e.g. a request for the site's
+    configuration followed by a request for the jobs), each taking `request_time` seconds, and
+    then renders the jobs.
+    """
+    def __init__(self, num_requests: int, request_time: float):
+        super().__init__()
+        self.num_requests = num_requests
+        self.request_time = request_time
+
+    async def goto(self, url, **kwargs):
+        await super().goto(url, **kwargs)
+        if url == 'about:blank':
+            return
+
+        async def send_requests():
+            for _ in range(self.num_requests):
+                request = object()
+                self.emit('request', request)
+                await asyncio.sleep(self.request_time)
+                self.emit('requestfinished', request)
+            self.selectors.add('.jobs')
+
+        asyncio.ensure_future(send_requests())
+
+    async def content(self):
+        return '<html>jobs</html>' if '.jobs' in self.selectors else '<html></html>'
+
+
+def page_launcher(create_page):
+    """Returns a function that launches a FakeBrowser whose pages are created by `create_page`."""
+    async def launch():
+        browser = FakeBrowser()
+
+        async def new_page():
+            page = create_page()
+            browser.pages.append(page)
+            return page
+
+        browser.newPage = new_page
+        return browser
+    return launch
+
+
+def test_render_returns_when_ready_selector_matches(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers')
+    launch = page_launcher(lambda: DynamicFakePage(network_time=None, render_time=0.1))
+    with BrowserPool(size=1, launch=launch) as pool:
+        start = time.monotonic()
+        html = render(url, browser_pool=pool, ready_selector='.jobs')
+        # the network is never idle, but the page is returned as soon as the jobs have rendered
+        assert time.monotonic() - start < 1
+        assert html == f'<html>{url}</html>'
+        # listeners are removed before the page is returned to the pool
+        assert pool.browsers[0].pages[0].listeners == {}
+
+
+def test_render_returns_when_network_idle(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers')
+    launch = page_launcher(lambda: DynamicFakePage(network_time=0.2, render_time=None))
+    with BrowserPool(size=1, launch=launch) as pool:
+        start = time.monotonic()
+        html = render(url, browser_pool=pool)
+        elapsed = time.monotonic() - start
+        assert 0.2 + NETWORK_IDLE_TIME <= elapsed < 0.2 + NETWORK_IDLE_TIME + 1
+        assert html == f'<html>{url}</html>'
+
+
+def test_render_network_idle_waits_for_later_requests(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers')
+    # the jobs are requested once a first request has completed; fewer than `max_in_flight`
+    # requests are in flight at any time, but each request resets the idle clock
+    launch = page_launcher(lambda: SequentialRequestsFakePage(num_requests=2, request_time=0.3))
+    with BrowserPool(size=1, launch=launch) as pool:
+        assert render(url, browser_pool=pool) == '<html>jobs</html>'
+
+
+def test_render_page_not_ready(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers')
+    launch = page_launcher(lambda: DynamicFakePage(network_time=None, render_time=None))
+    with BrowserPool(size=1, launch=launch) as pool:
+        with pytest.raises(RequestException):
+            render(
+                url,
+                browser_pool=pool,
+                ready_selector='.jobs',
+                retry_policy=RetryPolicy(timeout=0.3),
+            )
+    # an idle network doesn't short-circuit waiting for the selector (e.g. the jobs are loaded
+    # after a delay)
+    launch = page_launcher(lambda: DynamicFakePage(network_time=0.05, render_time=None))
+    with BrowserPool(size=1, launch=launch) as pool:
+        with pytest.raises(RequestException):
+            render(
+                url,
+                browser_pool=pool,
+                ready_selector='.jobs',
+                retry_policy=RetryPolicy(timeout=NETWORK_IDLE_TIME + 0.5),
+            )
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type, navigation=False):
+        self.url = url
+        self.resourceType = resource_type
+        self.navigation = navigation
+        self.outcome = None
+
+    def isNavigationRequest(self):  # noqa
+        return self.navigation
+
+    async def abort(self):
+        self.outcome = 'aborted'
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+
+class RequestingFakePage(FakePage):
+    """A page that requests a number of resources when it is loaded."""
+    def __init__(self):
+        super().__init__()
+        self.request_interception = False
+        self.requests = []
+
+    async def goto(self, url, **kwargs):
+        await super().goto(url, **kwargs)
+        if url == 'about:blank':
+            return
+        self.requests = [
+            FakeRequest(url, 'document', navigation=True),
+            FakeRequest('https://cdn.example.com/app.js', 'script'),
+            FakeRequest('https://cdn.example.com/logo.png', 'image'),
+            FakeRequest('https://cdn.example.com/font.woff2', 'font'),
+            FakeRequest('https://www.google-analytics.com/analytics.js', 'script'),
+        ]
+        for request in self.requests:
+            self.emit('request', request)
+        await asyncio.sleep(0.01)
+
+
+def test_render_block_list(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers')
+
+    launch = page_launcher(RequestingFakePage)
+    with BrowserPool(size=1, launch=launch) as pool:
+        render(url, browser_pool=pool, ready_selector='html', block_list=BlockList())
+        page = pool.browsers[0].pages[0]
+        assert [x.outcome for x in page.requests] == [
+            'continued', 'continued', 'aborted', 'aborted', 'aborted'
+        ]
+        # interception is disabled before the page is returned to the pool
+        assert not page.request_interception
+        assert page.listeners == {}
+        # without a block list, requests aren't intercepted
+        render(url, browser_pool=pool, ready_selector='html')
+        assert all(x.outcome is None for x in page.requests)
+
+
+def test_render_block_list_selenium(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers')
+    factory = FakeDriverFactory()
+    block_list = BlockList(resource_types=frozenset({'font'}), domains=frozenset({'hotjar.com'}))
+    with DriverPool(size=1, create_driver=factory) as pool:
+        render(url, use_selenium=True, driver_pool=pool, ready_selector='html',
+               block_list=block_list)
+        render(url, use_selenium=True, driver_pool=pool, ready_selector='html')
+    commands = [x for x in factory.drivers[0].cdp_commands if x[0] == 'Network.setBlockedURLs']
+    assert commands[0][1]['urls'] == block_list.url_patterns()
+    # the blocked urls are reset for pages rendered without a block list
+    assert commands[1][1]['urls'] == []
+
+
+def test_render_cache_expires(httpserver: HTTPServer, tmp_path, monkeypatch):
+    # the document (and its validators) doesn't change when the jobs loaded by JavaScript do
+    httpserver.expect_request('/careers').respond_with_data(
+        '<html></html>',
+        headers={'ETag': '"shell"'},
+    )
+    url = httpserver.url_for('/careers')
+    jobs = ['job-a']
+
+    async def content(page):
+        return f'<html>{jobs[-1]}</html>'
+
+    monkeypatch.setattr(FakePage, 'content', content)
+    launcher = FakeLauncher()
+    with HttpCache(path=str(tmp_path / 'cache.db')) as cache, \
+            BrowserPool(size=1, launch=launcher) as pool:
+        assert render(url, browser_pool=pool, cache=cache) == '<html>job-a</html>'
+        jobs.append('job-b')
+        # the cached html is returned without requesting or rendering the page
+        assert render(url, browser_pool=pool, cache=cache) == '<html>job-a</html>'
+        page = launcher.browsers[0].pages[0]
+        # (pages are reset to `about:blank` when returned to the pool)
+        assert [x for x in page.urls if x != 'about:blank'] == [url]
+        # once expired, the page is rendered again rather than revalidated via the ETag
+        monkeypatch.setattr(html_scraper, 'RENDER_CACHE_TTL', 0)
+        assert render(url, browser_pool=pool, cache=cache) == '<html>job-b</html>'
+        assert [x for x in page.urls if x != 'about:blank'] == [url, url]
+    # the page is only downloaded by the browser
+    assert len(httpserver.log) == 0
+
+
+def test_render_selenium_retry_policy(httpserver: HTTPServer):
+    httpserver.expect_oneshot_request('/careers').respond_with_data('', status=503)
+    httpserver.expect_request('/careers').respond_with_data('<html></html>')
+    url = httpserver.url_for('/careers')
+    factory = FakeDriverFactory()
+    retry_policy = RetryPolicy(backoff_base=0.01, jitter=False)
+    with DriverPool(size=1, create_driver=factory) as pool:
+        html = render(url, use_selenium=True, driver_pool=pool, ready_selector='html',
+                      retry_policy=retry_policy)
+        assert html == f'<html>{url}</html>'
+        # the status is checked with (cheap) HEAD requests; the driver downloads the page
+        assert [request.method for request, _ in httpserver.log] == ['HEAD', 'HEAD']
+        # pages that don't exist raise (after the retries) without using a driver
+        with pytest.raises(RequestException):
+            render(httpserver.url_for('/invalid'), use_selenium=True, driver_pool=pool,
+                   ready_selector='html', retry_policy=retry_policy)
+        # sites that block clients that aren't browsers are loaded by the driver
+        httpserver.expect_request('/forbidden').respond_with_data('', status=403)
+        forbidden = httpserver.url_for('/forbidden')
+        html = render(forbidden, use_selenium=True, driver_pool=pool, ready_selector='html',
+                      retry_policy=retry_policy)
+        assert html == f'<html>{forbidden}</html>'
+    assert factory.drivers[0].urls == [url, forbidden]
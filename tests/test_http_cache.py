@@ -0,0 +1,134 @@
+import asyncio
+import os
+import time
+import zlib
+from pytest_httpserver import HTTPServer
+
+from source.domain.html_scraper import get
+from source.domain.http_cache import HttpCache
+
+
+def test_http_cache(tmp_path):
+    with HttpCache(path=os.path.join(tmp_path, 'cache.db')) as cache:
+        assert cache.get('http://a.com') is None
+        cache.put('http://a.com', '<p>a</p>', etag='"1"', last_modified=None)
+        entry = cache.get('http://a.com')
+        assert entry.body == '<p>a</p>'
+        assert entry.conditional_headers() == {'If-None-Match': '"1"'}
+        assert not entry.is_fresh(ttl=0)
+        assert entry.is_fresh(ttl=60)
+
+        stored_at = entry.stored_at
+        time.sleep(0.01)
+        cache.touch('http://a.com')
+        assert cache.get('http://a.com').stored_at > stored_at
+
+        cache.put('http://a.com', '<p>b</p>', last_modified='Wed, 21 Oct 2015 07:28:00 GMT')
+        entry = cache.get('http://a.com')
+        assert entry.body == '<p>b</p>'
+        assert entry.conditional_headers() == {
+            'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'
+        }
+        cache.clear()
+        assert cache.get('http://a.com') is None
+        assert cache.size() == 0
+
+
+def test_http_cache_eviction(tmp_path):
+    body = os.urandom(1000).hex()  # incompressible
+    with HttpCache(path=os.path.join(tmp_path, 'cache.db')) as cache:
+        size = len(zlib.compress(body.encode('utf-8')))
+        cache.max_size = size * 2
+        cache.put('a', body)
+        cache.put('b', body)
+        time.sleep(0.01)
+        cache.get('a')  # `b` is now the least recently used
+        cache.put('c', body)
+        assert cache.size() <= cache.max_size
+        assert cache.get('a') is not None
+        assert cache.get('b') is None
+        assert cache.get('c') is not None
+
+
+def test_http_cache_size_and_access_times(tmp_path):
+    path = os.path.join(tmp_path, 'cache.db')
+    with HttpCache(path=path) as cache:
+        assert cache._connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        cache.put('a', 'a' * 100)
+        cache.put('b', 'b' * 100)
+        size = cache.size()
+        cache.put('a', 'a' * 1000)  # replaces the entry; the previous size is subtracted
+        expected = size + len(zlib.compress(b'a' * 1000)) - len(zlib.compress(b'a' * 100))
+        assert cache.size() == expected
+
+        # reads don't write to the database; the access times are written with the next put
+        changes = cache._connection.total_changes
+        cache.get('a')
+        cache.get('b')
+        assert cache._connection.total_changes == changes
+        accessed_at = cache._accessed['b']
+        cache.put('c', 'c')
+        assert not cache._accessed
+        assert cache._connection.execute(
+            "SELECT accessed_at FROM HTTP_CACHE WHERE key = 'b'"
+        ).fetchone()[0] == accessed_at
+        size = cache.size()
+        cache.get('c')
+    # the size is restored when the cache is reopened; pending access times were written on close
+    with HttpCache(path=path) as cache:
+        assert cache.size() == size
+        assert cache._connection.execute(
+            "SELECT accessed_at FROM HTTP_CACHE WHERE key = 'c'"
+        ).fetchone()[0] > accessed_at
+
+
+class LoopRecordingCache(HttpCache):
+    """Records whether each read/write of the cache ran on an event loop thread."""
+    def __init__(self, path):
+        super().__init__(path=path)
+        self.on_loop = []
+
+    def _record(self):
+        try:
+            asyncio.get_running_loop()
+            self.on_loop.append(True)
+        except RuntimeError:
+            self.on_loop.append(False)
+
+    def get(self, key):
+        self._record()
+        return super().get(key)
+
+    def put(self, key, body, etag=None, last_modified=None):
+        self._record()
+        super().put(key, body, etag=etag, last_modified=last_modified)
+
+
+def test_get_cache_io_off_event_loop(httpserver: HTTPServer, tmp_path):
+    httpserver.expect_request('/careers').respond_with_data('careers')
+    url = httpserver.url_for('/careers')
+    with LoopRecordingCache(path=os.path.join(tmp_path, 'cache.db')) as cache:
+        assert get(url, cache=cache) == 'careers'
+        assert cache.on_loop == [False, False]
+
+
+def test_get_conditional_requests(httpserver: HTTPServer, tmp_path):
+    httpserver.expect_request('/careers', headers={'If-None-Match': '"v1"'}).\
+        respond_with_data('', status=304)
+    httpserver.expect_request('/careers').\
+        respond_with_data('careers v1', headers={'ETag': '"v1"'})
+    url = httpserver.url_for('/careers')
+
+    with HttpCache(path=os.path.join(tmp_path, 'cache.db')) as cache:
+        assert get(url, cache=cache) == 'careers v1'
+        assert cache.get(url).etag == '"v1"'
+        # second request is conditional; the 304 response is served from the cache
+        assert get(url, cache=cache) == 'careers v1'
+        assert get([url, url], cache=cache) == ['careers v1', 'careers v1']
+        statuses = [response.status_code for _, response in httpserver.log]
+        assert statuses == [200, 304, 304, 304]
+
+        # fresh entries are served without any request
+        cache.ttl = 60
+        assert get(url, cache=cache) == 'careers v1'
+        assert len(httpserver.log) == 4
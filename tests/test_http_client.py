@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+from pytest_httpserver import HTTPServer
+
+from source.domain.html_scraper import get
+from source.domain.http_client import HttpClient, close_default_client, get_default_client
+from tests.conftest import setup_mock_server
+
+
+def test_http_client_lifecycle(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers/analytics-engineer-amer-4486497004')
+    client = HttpClient(limit_per_host=2)
+    assert not client.is_open()
+    with client:
+        assert client.is_open()
+        session = client.session
+        assert 'Analytics Engineer' in get(url, client=client)
+        htmls = get([url, url], client=client)
+        assert len(htmls) == 2
+        # the same session (and connection pool) is used across calls
+        assert client.session is session
+        assert session.connector.limit_per_host == 2
+    assert not client.is_open()
+    assert session.closed
+
+
+def test_default_client(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for('/careers/analytics-engineer-amer-4486497004')
+    try:
+        client = get_default_client()
+        assert get_default_client() is client
+        assert 'Analytics Engineer' in get(url)
+        assert get_default_client() is client
+        close_default_client()
+        assert not client.is_open()
+        assert get_default_client() is not client
+    finally:
+        close_default_client()
+
+
+def test_client_shared_across_threads(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    urls = [
+        httpserver.url_for('/careers/analytics-engineer-amer-4486497004'),
+        httpserver.url_for('/careers/field-marketing-manager-west-us-4623565004'),
+    ]
+    with HttpClient() as client:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda x: get(x, client=client), urls * 4))
+    assert len(results) == 8
+    assert all('Analytics Engineer' in x for x in results[0::2])
+    assert all('Field Marketing Manager' in x for x in results[1::2])
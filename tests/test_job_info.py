@@ -13,3 +13,12 @@ def test_to_from_dataframe(
 
     actual_jobs = from_dataframe(df=actual_df)
     assert all(a == e for a, e in zip(actual_jobs, fake_job_info_list))
+
+
+def test_from_dataframe_other_columns(fake_job_info_list: list[JobInfo]):
+    df = to_dataframe(jobs=fake_job_info_list)
+    df.insert(0, 'snapshot', '2023-01-01 00:00:00')
+    # columns are matched by name rather than position
+    df = df[list(reversed(df.columns))]
+    assert from_dataframe(df=df) == fake_job_info_list
+    assert from_dataframe(df=df.iloc[0:0]) == []
@@ -1,11 +1,22 @@
+import asyncio
+import os
+import time
+from urllib.parse import urlparse
+import pytest
 from pytest_httpserver import HTTPServer
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import yaml
 
+from source.domain.browser_pool import BrowserPool
+from source.domain.fetch_mode_store import JAVASCRIPT, STATIC, FetchModeStore
+from source.domain.html_scraper import RequestException
+from source.domain.http_cache import HttpCache
 from source.domain.jobs_scraper import JobInfo, JobScraperBase
+from source.domain.parse_pool import create_parse_pool, set_default_parse_pool
+from source.domain.retry import NO_RETRY
 from source.domain.scrapers import AnacondaJobScraper, ChimeAnalyticsJobScraper, \
     ChimeDataScienceJobScraper, VercelJobScraper  # , OtterAIJobScraper
-from tests.conftest import setup_mock_server
+from tests.conftest import FakeLauncher, FakePage, setup_mock_server
 
 
 class VercelMockJobScraper(JobScraperBase):
@@ -238,6 +249,423 @@ def test_mock_vercel(httpserver: HTTPServer):
     assert all([x.description is not None for x in jobs])
 
 
+class VercelLocalJobScraper(VercelJobScraper):
+    """VercelJobScraper pointed at the mock server."""
+    def __init__(self, url) -> None:
+        super().__init__()
+        self._url = url
+
+    @property
+    def url(self):
+        return self._url
+
+
+def test_mock_vercel_job_objects_parsed_once(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    url = httpserver.url_for("/careers")
+
+    # VercelJobScraper passes BeautifulSoup Tags to the _extract_* methods, whereas
+    # VercelMockJobScraper uses the string-based (compatibility) path; results should match
+    scraper = VercelLocalJobScraper(url)
+    job_objects = scraper._scrape_job_objects()
+    assert all(isinstance(x, Tag) for x in job_objects)
+    jobs = scraper.scrape()
+
+    expected_jobs = VercelMockJobScraper(url).scrape()
+    assert len(jobs) == len(expected_jobs)
+    assert [x.title for x in jobs] == [x.title for x in expected_jobs]
+    assert [x.location for x in jobs] == [x.location for x in expected_jobs]
+    assert [x.url for x in jobs] == [x.url for x in expected_jobs]
+    assert [x.description for x in jobs] == [x.description for x in expected_jobs]
+
+
+def test_mock_vercel_refetch_failed_job_descriptions(httpserver: HTTPServer):
+    class NoRetryVercelJobScraper(VercelLocalJobScraper):
+        @property
+        def retry_policy(self):
+            return NO_RETRY
+
+    failed_path = '/careers/data-scientist-us-4554464004'
+    httpserver.expect_oneshot_request(failed_path).respond_with_data('', status=503)
+    setup_mock_server(httpserver)
+
+    jobs = NoRetryVercelJobScraper(httpserver.url_for('/careers')).scrape()
+    assert len(jobs) == 54
+    assert all(x.description for x in jobs)
+    # the job description that failed is the only one that is requested twice
+    paths = [request.path for request, _ in httpserver.log]
+    assert paths.count(failed_path) == 2
+    assert all(paths.count(x) == 1 for x in paths if x != failed_path)
+
+    httpserver.clear_log()
+    httpserver.expect_oneshot_request(failed_path).respond_with_data('', status=503)
+    httpserver.expect_oneshot_request(failed_path).respond_with_data('', status=503)
+    with pytest.raises(RequestException):
+        NoRetryVercelJobScraper(httpserver.url_for('/careers')).scrape()
+
+
+def test_mock_vercel_known_descriptions(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    scraper = VercelLocalJobScraper(httpserver.url_for('/careers'))
+    expected_jobs = scraper.scrape()
+    httpserver.clear_log()
+
+    known_descriptions = {
+        x.url: f'known description {i}' for i, x in enumerate(expected_jobs[:50])
+    }
+    jobs = scraper.scrape(known_descriptions=known_descriptions)
+    assert [x.url for x in jobs] == [x.url for x in expected_jobs]
+    assert [x.description for x in jobs[:50]] == list(known_descriptions.values())
+    assert [x.description for x in jobs[50:]] == [x.description for x in expected_jobs[50:]]
+    # only the careers page and the job descriptions that weren't known are requested
+    paths = [request.path for request, _ in httpserver.log]
+    assert len(paths) == 1 + 4
+    assert all(x.url.endswith(p) for x, p in zip(expected_jobs[50:], paths[1:]))
+
+
+def test_mock_vercel_known_descriptions_revalidated(httpserver: HTTPServer, tmp_path):
+    setup_mock_server(httpserver)
+    with HttpCache(path=os.path.join(tmp_path, 'cache.db')) as cache:
+        class CachedVercelJobScraper(VercelLocalJobScraper):
+            @property
+            def http_cache(self):
+                return cache
+
+        scraper = CachedVercelJobScraper(httpserver.url_for('/careers'))
+        expected_jobs = scraper.scrape()
+        known_descriptions = {x.url: f'known description {i}' for i, x in enumerate(expected_jobs)}
+
+        # the mock server doesn't send validators; the pages of the first two jobs are cached as
+        # if it had
+        for job in expected_jobs[:2]:
+            cache.put(job.url, cache.get(job.url).body, etag='"v1"')
+        # the page of the first job has changed since it was cached; the second hasn't
+        changed_path = urlparse(expected_jobs[0].url).path
+        with open(f'tests/test_files/vercel_clone{changed_path}.html') as handle:
+            changed_html = handle.read().replace('About Vercel:', 'About Vercel (updated):')
+        httpserver.expect_oneshot_request(changed_path).respond_with_data(changed_html)
+        unchanged_path = urlparse(expected_jobs[1].url).path
+        httpserver.expect_oneshot_request(unchanged_path, headers={'If-None-Match': '"v1"'}).\
+            respond_with_data('', status=304)
+        httpserver.clear_log()
+        jobs = scraper.scrape(known_descriptions=known_descriptions)
+        assert [x.url for x in jobs] == [x.url for x in expected_jobs]
+        assert 'About Vercel (updated):' in jobs[0].description
+        assert [x.description for x in jobs[1:]] == list(known_descriptions.values())[1:]
+        # pages without validators aren't downloaded again
+        requests = [(request.path, response.status_code) for request, response in httpserver.log]
+        assert sorted(requests) == sorted([
+            ('/careers', 200),
+            (changed_path, 200),
+            (unchanged_path, 304),
+        ])
+
+
+def test_mock_vercel_iter_jobs(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    scraper = VercelLocalJobScraper(httpserver.url_for('/careers'))
+    expected_jobs = scraper.scrape()
+
+    # jobs are yielded as their descriptions arrive, so only the set of jobs is deterministic
+    jobs = list(scraper.iter_jobs())
+    assert sorted(jobs, key=lambda x: x.url) == sorted(expected_jobs, key=lambda x: x.url)
+
+    # jobs with known descriptions are yielded before any description is scraped
+    known_descriptions = {x.url: f'known description {i}' for i, x in enumerate(expected_jobs)}
+    known_descriptions.pop(expected_jobs[0].url)
+    httpserver.clear_log()
+    jobs = scraper.iter_jobs(known_descriptions=known_descriptions)
+    first_jobs = [next(jobs) for _ in range(len(known_descriptions))]
+    assert [x.description for x in first_jobs] == list(known_descriptions.values())
+    assert [request.path for request, _ in httpserver.log] == ['/careers']
+    assert list(jobs) == [expected_jobs[0]]
+
+
+def test_mock_vercel_ascrape(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    scraper = VercelLocalJobScraper(httpserver.url_for('/careers'))
+    expected_jobs = scraper.scrape()
+
+    async def collect():
+        return [job async for job in scraper.ascrape()]
+
+    jobs = asyncio.run(collect())
+    assert sorted(jobs, key=lambda x: x.url) == sorted(expected_jobs, key=lambda x: x.url)
+
+
+class SlowJobScraper(VercelLocalJobScraper):
+    """Yields a job every 0.2 seconds, indefinitely."""
+    closed = False
+
+    def iter_jobs(self, known_descriptions=None):
+        try:
+            while True:
+                time.sleep(0.2)
+                yield JobInfo(company='Slow', title='title', location='location', url='url')
+        finally:
+            self.closed = True
+
+
+def test_ascrape_cancelled():
+    scraper = SlowJobScraper('http://localhost/careers')
+
+    async def consume():
+        async for _ in scraper.ascrape():
+            pass
+
+    async def cancel():
+        task = asyncio.ensure_future(consume())
+        # the consumer is cancelled while the worker thread is scraping the next job
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    # the jobs are closed once the job being scraped is done
+    start = time.monotonic()
+    while not scraper.closed and time.monotonic() - start < 1:
+        time.sleep(0.01)
+    assert scraper.closed
+
+
+class ProcessIdVercelJobScraper(VercelLocalJobScraper):
+    """Replaces each description with the id of the process that extracted it."""
+    def _extract_job_description(self, html: str) -> str:
+        return str(os.getpid())
+
+
+def test_mock_vercel_parse_pool(httpserver: HTTPServer):
+    setup_mock_server(httpserver)
+    scraper = VercelLocalJobScraper(httpserver.url_for('/careers'))
+    expected_jobs = scraper.scrape()
+    assert scraper.parse_pool is None
+
+    with create_parse_pool(workers=2) as pool:
+        set_default_parse_pool(pool)
+        try:
+            assert scraper.parse_pool is pool
+            jobs = scraper.scrape()
+            process_ids = {
+                x.description
+                for x in ProcessIdVercelJobScraper(scraper.url).scrape()
+            }
+        finally:
+            set_default_parse_pool(None)
+    assert jobs == expected_jobs
+    # the descriptions were extracted in the pool's worker processes
+    assert str(os.getpid()) not in process_ids
+
+
+class JavaScriptVercelJobScraper(VercelLocalJobScraper):
+    """
+    Simulates a site whose careers page is rendered by JavaScript: the static html of `url`
+    contains no jobs, whereas the "rendered" html is the html of `rendered_url`.
+    """
+    def __init__(self, url, rendered_url, store) -> None:
+        super().__init__(url)
+        self.rendered_url = rendered_url
+        self.store = store
+        self.rendered = []
+
+    @property
+    def detect_javascript(self):
+        return True
+
+    @property
+    def fetch_mode_store(self):
+        return self.store
+
+    def _render(self, url, use_selenium, ready_selector):
+        self.rendered.append(url)
+        return self._get(self.rendered_url)
+
+    def _create_job_url(self, job_path: str) -> str:
+        return self.rendered_url + job_path.replace('/careers', '')
+
+
+def test_mock_vercel_detect_javascript(httpserver: HTTPServer, tmp_path):
+    setup_mock_server(httpserver)
+    httpserver.expect_request('/careers-shell').respond_with_data('<html><body></body></html>')
+    shell_url = httpserver.url_for('/careers-shell')
+    careers_url = httpserver.url_for('/careers')
+    with FetchModeStore(path=os.path.join(tmp_path, 'fetch_modes.db')) as store:
+        # the static html has no jobs, so the careers page is rendered; the job descriptions
+        # don't need JavaScript
+        scraper = JavaScriptVercelJobScraper(shell_url, rendered_url=careers_url, store=store)
+        jobs = scraper.scrape()
+        assert len(jobs) == 54
+        assert all(x.description for x in jobs)
+        assert scraper.rendered == [shell_url]
+        assert store.get(scraper._fetch_mode_key(shell_url, 'job_objects')) == JAVASCRIPT
+        assert store.get(scraper._fetch_mode_key(jobs[0].url, 'job_descriptions')) == STATIC
+
+        # subsequent runs render the careers page without trying the static html first
+        httpserver.clear_log()
+        scraper = JavaScriptVercelJobScraper(shell_url, rendered_url=careers_url, store=store)
+        assert len(scraper.scrape(known_descriptions={x.url: 'known' for x in jobs})) == 54
+        assert scraper.rendered == [shell_url]
+        assert '/careers-shell' not in [request.path for request, _ in httpserver.log]
+
+    with FetchModeStore(path=os.path.join(tmp_path, 'fetch_modes_static.db')) as store:
+        class StoreVercelJobScraper(VercelLocalJobScraper):
+            @property
+            def detect_javascript(self):
+                return True
+
+            @property
+            def fetch_mode_store(self):
+                return store
+
+        scraper = StoreVercelJobScraper(careers_url)
+        assert len(scraper.scrape()) == 54
+        assert store.get(scraper._fetch_mode_key(careers_url, 'job_objects')) == STATIC
+
+    # detection is opt-in, so the static html is used
+    assert not VercelLocalJobScraper(careers_url).detect_javascript
+    with pytest.raises(AssertionError):
+        VercelLocalJobScraper(shell_url).scrape()
+
+
+class BrowserVercelJobScraper(VercelLocalJobScraper):
+    """
+    Renders pages with `browser_pool` (e.g. a pool of fake browsers whose pages contain the html
+    of the mock careers page); the jobs are on `jobs_url`.
+    """
+    def __init__(self, url, jobs_url, store, browser_pool) -> None:
+        super().__init__(url)
+        self.jobs_url = jobs_url
+        self.store = store
+        self._browser_pool = browser_pool
+
+    @property
+    def detect_javascript(self):
+        return True
+
+    @property
+    def fetch_mode_store(self):
+        return self.store
+
+    @property
+    def browser_pool(self):
+        return self._browser_pool
+
+    def _create_job_url(self, job_path: str) -> str:
+        return self.jobs_url + job_path.replace('/careers', '')
+
+
+def test_mock_vercel_detect_javascript_request_fails(
+        httpserver: HTTPServer,
+        tmp_path,
+        monkeypatch):
+    setup_mock_server(httpserver)
+    # e.g. a site that blocks clients that don't run JavaScript
+    httpserver.expect_request('/careers-forbidden').respond_with_data('', status=403)
+    forbidden_url = httpserver.url_for('/careers-forbidden')
+    careers_url = httpserver.url_for('/careers')
+    with open('tests/test_files/vercel_clone/vercel_careers_clone.html') as handle:
+        careers_html = handle.read()
+
+    async def content(page):
+        return careers_html
+
+    monkeypatch.setattr(FakePage, 'content', content)
+    launcher = FakeLauncher()
+    with FetchModeStore(path=os.path.join(tmp_path, 'fetch_modes.db')) as store, \
+            BrowserPool(size=1, launch=launcher) as pool:
+        # the static html can't be requested, so the careers page is rendered by the browser
+        # (which isn't blocked); the mode isn't stored since the failure may be transient
+        scraper = BrowserVercelJobScraper(forbidden_url, careers_url, store, pool)
+        assert len(scraper.scrape()) == 54
+        page_urls = [x for x in launcher.browsers[0].pages[0].urls if x != 'about:blank']
+        assert page_urls == [forbidden_url]
+        assert store.get(scraper._fetch_mode_key(forbidden_url, 'job_objects')) is None
+    paths = [request.path for request, _ in httpserver.log]
+    assert paths.count('/careers-forbidden') == 1
+
+
+class ShellDescriptionsVercelJobScraper(VercelLocalJobScraper):
+    """
+    Simulates a site whose job description pages in `shell_urls` are rendered by JavaScript: their
+    static html (which arrives before the other pages) contains no description.
+    """
+    def __init__(self, url, shell_urls, store) -> None:
+        super().__init__(url)
+        self.shell_urls = shell_urls
+        self.store = store
+        self.rendered = []
+
+    @property
+    def detect_javascript(self):
+        return True
+
+    @property
+    def fetch_mode_store(self):
+        return self.store
+
+    def _iter_get(self, urls):
+        results = sorted(super()._iter_get(urls), key=lambda x: x[0] not in self.shell_urls)
+        for url, result in results:
+            yield url, '<html><body></body></html>' if url in self.shell_urls else result
+
+    def _iter_render(self, urls, use_selenium, ready_selector):
+        self.rendered.extend(urls)
+        return super()._iter_get(urls)
+
+
+def test_mock_vercel_detect_javascript_descriptions(httpserver: HTTPServer, tmp_path):
+    setup_mock_server(httpserver)
+    careers_url = httpserver.url_for('/careers')
+    expected_jobs = VercelLocalJobScraper(careers_url).scrape()
+    urls = [x.url for x in expected_jobs]
+    with FetchModeStore(path=os.path.join(tmp_path, 'fetch_modes.db')) as store:
+        # a single page without a description (e.g. an unusual posting) is rendered, but
+        # doesn't change how the site's other pages are scraped
+        scraper = ShellDescriptionsVercelJobScraper(careers_url, {urls[0]}, store)
+        assert scraper.scrape() == expected_jobs
+        assert scraper.rendered == [urls[0]]
+        key = scraper._fetch_mode_key(urls[0], 'job_descriptions')
+        assert store.get(key) == STATIC
+
+    with FetchModeStore(path=os.path.join(tmp_path, 'fetch_modes_javascript.db')) as store:
+        # once more than one page has no description, all descriptions are rendered
+        scraper = ShellDescriptionsVercelJobScraper(careers_url, set(urls), store)
+        assert scraper.scrape() == expected_jobs
+        assert sorted(scraper.rendered) == sorted(urls)
+        assert store.get(key) == JAVASCRIPT
+
+
+class ForbiddenDescriptionsVercelJobScraper(ShellDescriptionsVercelJobScraper):
+    """The static requests of the job description pages in `shell_urls` fail (e.g. with 403s)."""
+    def _iter_get(self, urls):
+        for url, result in VercelLocalJobScraper._iter_get(self, urls):
+            if url in self.shell_urls:
+                result = RequestException('status-code: 403')
+            yield url, result
+
+
+def test_mock_vercel_detect_javascript_descriptions_requests_fail(
+        httpserver: HTTPServer,
+        tmp_path):
+    setup_mock_server(httpserver)
+    careers_url = httpserver.url_for('/careers')
+    expected_jobs = VercelLocalJobScraper(careers_url).scrape()
+    urls = [x.url for x in expected_jobs]
+    with FetchModeStore(path=os.path.join(tmp_path, 'fetch_modes.db')) as store:
+        # failed requests count towards rendering the descriptions; the mode isn't stored since
+        # the failures may be transient
+        scraper = ForbiddenDescriptionsVercelJobScraper(careers_url, set(urls), store)
+        assert scraper.scrape() == expected_jobs
+        assert sorted(scraper.rendered) == sorted(urls)
+        assert store.get(scraper._fetch_mode_key(urls[0], 'job_descriptions')) is None
+
+        # once a page has a description, the site is static and failures are failures
+        scraper = ForbiddenDescriptionsVercelJobScraper(careers_url, {urls[-1]}, store)
+        with pytest.raises(RequestException):
+            scraper.scrape()
+        assert scraper.rendered == []
+
+
 def job_to_dict(job: JobInfo) -> list[dict]:
     return dict(
         title=job.title,
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+from source.domain.rate_limiter import RateLimiter, get_rate_limiter, parse_retry_after
+
+
+def test_rate_limiter_sync():
+    limiter = RateLimiter(requests_per_second=20, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire_sync('http://a.com/job-1')
+    # 2 requests are allowed immediately and the remaining 4 are spaced out by 1/20 seconds
+    assert time.monotonic() - start >= 4 / 20 - 0.01
+    # other hosts have their own bucket
+    start = time.monotonic()
+    limiter.acquire_sync('http://b.com/job-1')
+    assert time.monotonic() - start < 0.05
+
+
+def test_rate_limiter_async():
+    limiter = RateLimiter(requests_per_second=20)
+
+    async def acquire_all():
+        await asyncio.gather(*[limiter.acquire(f'http://a.com/job-{i}') for i in range(5)])
+
+    start = time.monotonic()
+    asyncio.run(acquire_all())
+    assert time.monotonic() - start >= 4 / 20 - 0.01
+
+
+def test_rate_limiter_block():
+    limiter = RateLimiter(requests_per_second=1000)
+    limiter.block('http://a.com/careers', seconds=0.2)
+    start = time.monotonic()
+    limiter.acquire_sync('http://a.com/job-1')
+    assert time.monotonic() - start >= 0.19
+    start = time.monotonic()
+    limiter.acquire_sync('http://b.com/job-1')
+    assert time.monotonic() - start < 0.05
+
+
+def test_get_rate_limiter():
+    assert get_rate_limiter(2) is get_rate_limiter(2)
+    assert get_rate_limiter(2) is not get_rate_limiter(3)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('invalid') is None
+    assert parse_retry_after('5') == 5
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+    retry_at = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(retry_at, usegmt=True)) == 0
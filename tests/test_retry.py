@@ -0,0 +1,23 @@
+from source.domain.retry import NO_RETRY, RetryPolicy
+
+
+def test_backoff():
+    policy = RetryPolicy(backoff_base=1, backoff_max=5, jitter=False)
+    assert [policy.backoff(x) for x in range(5)] == [1, 2, 4, 5, 5]
+    policy = RetryPolicy(backoff_base=1, backoff_max=5, jitter=True)
+    for attempt in range(5):
+        assert all(0 <= policy.backoff(attempt) <= min(5, 2 ** attempt) for _ in range(20))
+
+
+def test_delay():
+    policy = RetryPolicy(max_attempts=3, backoff_base=1, jitter=False, max_retry_after=10)
+    assert policy.delay(status=500, retry_after=None, attempt=0) == 1
+    assert policy.delay(status=500, retry_after=None, attempt=1) == 2
+    # no attempts left
+    assert policy.delay(status=500, retry_after=None, attempt=2) is None
+    # status not retried
+    assert policy.delay(status=404, retry_after=None, attempt=0) is None
+    # Retry-After takes precedence over the backoff unless it is longer than max_retry_after
+    assert policy.delay(status=429, retry_after=7, attempt=0) == 7
+    assert policy.delay(status=429, retry_after=11, attempt=0) is None
+    assert NO_RETRY.delay(status=500, retry_after=None, attempt=0) is None